@@ -0,0 +1,59 @@
+import asyncio
+import hmac
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from backend.config import config
+from backend.core.profiling import collapsed, profiler, slow_requests
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Fail closed: without ADMIN_TOKEN configured the admin endpoints answer 403."""
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="admin endpoints are disabled (ADMIN_TOKEN)")
+    if not hmac.compare_digest(x_admin_token or "", config.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="admin token required (X-Admin-Token)")
+
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def get_profile(
+    seconds: float = Query(10.0, gt=0, description="Sampling duration (s)"),
+    interval_ms: float = Query(None, ge=1, le=1000, description="Sampling interval (ms)"),
+    threads: str = Query("loop", pattern="^(loop|all)$", description="loop: the event loop thread only"),
+):
+    """Sample stacks for `seconds` and return them in collapsed-stack format (flamegraph.pl, speedscope)."""
+    if not config.PROFILING_ENABLED:
+        raise HTTPException(status_code=503, detail="profiling is disabled (PROFILING_ENABLED)")
+    if seconds > config.PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be <= {config.PROFILE_MAX_SECONDS:g}")
+    if profiler.running:
+        raise HTTPException(status_code=409, detail="a profile is already running")
+    interval = (interval_ms or config.PROFILE_INTERVAL_MS) / 1000
+    thread_ids = [threading.get_ident()] if threads == "loop" else None
+    try:
+        stacks = await asyncio.to_thread(profiler.run, seconds, interval, thread_ids)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    name = time.strftime("profile-%Y%m%dT%H%M%S.collapsed", time.gmtime())
+    return PlainTextResponse(collapsed(stacks), headers={
+        "Content-Disposition": f'attachment; filename="{name}"',
+        "X-Profile-Samples": str(profiler.samples),
+    })
+
+
+@router.get("/slow-requests")
+async def get_slow_requests(limit: int = Query(50, ge=1, le=1000)) -> Dict[str, Any]:
+    """Newest requests slower than SLOW_REQUEST_THRESHOLD_MS with their phase timings."""
+    return {
+        "enabled": slow_requests.enabled,
+        "threshold_ms": slow_requests.threshold_ms,
+        "captured": slow_requests.captured,
+        "requests": slow_requests.recent(limit),
+    }
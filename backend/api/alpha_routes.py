@@ -1,11 +1,21 @@
-from typing import List, Dict
+import time
+from typing import List, Dict, Optional
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from decimal import Decimal
 
-from backend.services.alpha_token_service import fetch_alpha_tokens
-from backend.services.alpha_price_service import fetch_alpha_price
+from backend.services.alpha_token_service import get_token_snapshot, search_alpha_tokens
+from backend.config import config
+from backend.core.json_codec import FastJSONResponse
+from backend.core.middleware import charge_up_front
+from backend.services.alpha_price_service import fetch_alpha_price_with_source, fetch_alpha_prices
+from backend.services.candle_rollup import candle_rollups
+from backend.services.price_broadcaster import broadcaster
+from backend.services.symbol_mapping import resolve_symbol, valid_symbol
+from backend.services.trade_store import get_trade_store
 
 router = APIRouter(prefix="/api/alpha", tags=["alpha"])
 
@@ -18,18 +28,177 @@ class PriceResponse(BaseModel):
     timestamp: int
 
 
+class BatchPriceRequest(BaseModel):
+    alphaIds: List[str]
+
+
+class BatchPriceItem(BaseModel):
+    alphaId: str
+    ok: bool
+    data: Optional[PriceResponse] = None
+    source: Optional[str] = None
+    age_ms: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BatchPriceResponse(BaseModel):
+    count: int
+    results: List[BatchPriceItem]
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or any(c.removeprefix("W/") == etag for c in candidates)
+
+
 @router.get("/tokens", response_model=List[Dict[str, str]])
-async def get_tokens():
-    tokens = await fetch_alpha_tokens()
-    return tokens
+async def get_tokens(request: Request):
+    snap = await get_token_snapshot()
+    headers = {"ETag": snap.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match", ""), snap.etag):
+        return Response(status_code=304, headers=headers)
+    # Body is pre-encoded once per registry refresh
+    return Response(content=snap.body, media_type="application/json", headers=headers)
+
+
+@router.get("/tokens/search")
+async def search_tokens(
+    q: str = Query("", description="Symbol, alphaId or name (prefix or fuzzy)"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    return await search_alpha_tokens(q, limit=limit, offset=offset)
 
 
+# Price responses are encoded directly (Decimal -> string, as the response models
+# document) instead of being re-validated through pydantic on every poll.
 @router.get("/price", response_model=PriceResponse)
 async def get_price(alphaId: str = Query(..., description="Alpha token id or symbol")):
     if not alphaId:
         raise HTTPException(status_code=400, detail="alphaId is required")
     try:
-        data = await fetch_alpha_price(alphaId)
-        return data
+        data, source, age = await fetch_alpha_price_with_source(alphaId)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    headers = {
+        "X-Cache": source.upper(),
+        "Age": str(int(age)),
+        "X-Cache-Age-Ms": str(int(age * 1000)),
+    }
+    return FastJSONResponse(data, headers=headers)
+
+
+def _normalize_ids(raw: List[str]) -> List[str]:
+    ids = list(dict.fromkeys(a.strip() for a in raw if a and a.strip()))  # dedupe, keep order
+    if not ids:
+        raise HTTPException(status_code=400, detail="alphaIds is required")
+    if len(ids) > config.PRICE_BATCH_MAX_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"at most {config.PRICE_BATCH_MAX_SYMBOLS} alphaIds per batch")
+    return ids
+
+
+async def _batch(request: Request, ids: List[str]) -> FastJSONResponse:
+    # One rate limit unit per symbol, charged before any upstream call (429 when over)
+    await charge_up_front(request, len(ids))
+    results = await fetch_alpha_prices(ids)
+    return FastJSONResponse({"count": len(results), "results": results})
+
+
+@router.get("/prices", response_model=BatchPriceResponse)
+async def get_prices(request: Request, alphaIds: str = Query(..., description="Comma-separated alpha ids or symbols")):
+    return await _batch(request, _normalize_ids(alphaIds.split(",")))
+
+
+@router.post("/prices", response_model=BatchPriceResponse)
+async def post_prices(request: Request, body: BatchPriceRequest):
+    return await _batch(request, _normalize_ids(body.alphaIds))
+
+
+@router.get("/candles")
+async def get_candles(
+    alphaId: str = Query(..., description="Alpha token id or symbol"),
+    interval: str = Query("1m", description="One of CANDLE_INTERVALS, e.g. 1s, 1m, 5m"),
+    limit: int = Query(100, ge=1, le=config.CANDLE_HISTORY),
+):
+    """OHLCV/VWAP buckets from the rollups fed by the poller and the stream (oldest first)."""
+    interval = interval.strip().lower()
+    if interval not in candle_rollups.intervals:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {', '.join(candle_rollups.intervals)}")
+    try:
+        # Same path as /price: feeds the rollups unless the stream or the cache is fresh
+        data, _, _ = await fetch_alpha_price_with_source(alphaId)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    candles = candle_rollups.candles(data["symbol"], interval, limit)
+    return FastJSONResponse({"symbol": data["symbol"], "interval": interval, "candles": candles})
+
+
+@router.get("/history")
+async def get_history(
+    alphaId: str = Query(..., description="Alpha token id or symbol"),
+    start: int = Query(..., alias="from", ge=0, description="Start time (ms, inclusive)"),
+    end: Optional[int] = Query(None, alias="to", ge=0, description="End time (ms, exclusive); default now"),
+    limit: int = Query(1000, ge=0, le=config.TRADE_STORE_MAX_ROWS, description="Trades returned (aggregates cover all)"),
+):
+    """Stored trades in [from, to) with open/high/low/close, avg, vwap and volume over the range."""
+    store = get_trade_store()
+    if store is None:
+        raise HTTPException(status_code=503, detail="trade history is disabled (TRADE_STORE_ENABLED)")
+    symbol = resolve_symbol(alphaId)
+    if not symbol:
+        raise HTTPException(status_code=400, detail="alphaId is required")
+    if not valid_symbol(symbol):
+        raise HTTPException(status_code=400, detail="alphaId must resolve to a symbol of A-Z, 0-9 and _")
+    end = int(time.time() * 1000) if end is None else end
+    if end <= start:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+    # Scans mapped segment files: keep it off the event loop
+    return FastJSONResponse(await run_in_threadpool(store.query, symbol, start, end, limit))
+
+
+def _open_subscription(alpha_id: str):
+    try:
+        return broadcaster.subscribe(alpha_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OverflowError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/stream")
+async def stream_price(request: Request, alphaId: str = Query(..., description="Alpha token id or symbol")):
+    """Server-Sent Events: pushes last/avg/vwap whenever they change."""
+    sub = _open_subscription(alphaId)
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                msg = await sub.get(timeout=config.PRICE_STREAM_HEARTBEAT_SECONDS)
+                yield f"data: {msg}\n\n" if msg is not None else ": keepalive\n\n"
+        finally:
+            broadcaster.unsubscribe(sub)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+
+@router.websocket("/stream/ws")
+async def stream_price_ws(websocket: WebSocket, alphaId: str):
+    await websocket.accept()
+    try:
+        sub = broadcaster.subscribe(alphaId)
+    except (ValueError, OverflowError) as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    try:
+        while True:
+            msg = await sub.get(timeout=config.PRICE_STREAM_HEARTBEAT_SECONDS)
+            if msg is None:
+                msg = '{"type":"heartbeat"}'
+            await websocket.send_text(msg)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        broadcaster.unsubscribe(sub)
@@ -1,10 +1,23 @@
+import json
 from decimal import Decimal
-from typing import Dict
+from typing import Callable, Dict, Iterable, Iterator, List, Literal, Optional, Tuple, Union
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
-from backend.services.calculation_service import compute_diff_range
+from backend.config import config
+from backend.core.middleware import charge_up_front, rate_limit_rule
+from backend.services.calculation_service import (
+    SCENARIO_FIELDS,
+    Scenario,
+    compute_diff_range,
+    compute_diff_range_batch,
+    expand_grid,
+    grid_size,
+    grid_values,
+)
 
 router = APIRouter(prefix="/api/calc", tags=["calc"])
 
@@ -22,6 +35,35 @@ class CalcResponse(BaseModel):
     diff_upper: Decimal
 
 
+class GridRange(BaseModel):
+    start: Decimal
+    stop: Decimal
+    step: Decimal = Field(..., gt=0)
+
+
+# Each grid axis: one value, a list of values, or an inclusive range
+GridAxis = Union[GridRange, List[Decimal], Decimal]
+
+
+class CalcGrid(BaseModel):
+    price_now: GridAxis
+    per_volume: GridAxis
+    waste_lower: GridAxis
+    waste_upper: GridAxis
+    fee_amount_token: GridAxis
+
+
+class BatchCalcRequest(BaseModel):
+    scenarios: Optional[List[CalcRequest]] = None
+    grid: Optional[CalcGrid] = None
+    format: Literal["ndjson", "columnar"] = "ndjson"
+
+
+# Lower bounds of the single-scenario endpoint, applied to grid values
+_POSITIVE = {"price_now", "per_volume"}
+_NDJSON_CHUNK_ROWS = 1000
+
+
 @router.post("/price-range", response_model=CalcResponse)
 async def price_range(req: CalcRequest) -> Dict[str, Decimal]:
     try:
@@ -35,3 +77,89 @@ async def price_range(req: CalcRequest) -> Dict[str, Decimal]:
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+def _axis_values(name: str, axis: GridAxis) -> List[Decimal]:
+    if isinstance(axis, GridRange):
+        values = grid_values(axis.start, axis.stop, axis.step, max_count=config.CALC_BATCH_MAX_SCENARIOS)
+    elif isinstance(axis, list):
+        values = axis
+    else:
+        values = [axis]
+    if not values:
+        raise ValueError(f"grid.{name} has no values")
+    low = min(values)
+    if low < 0 or (name in _POSITIVE and low == 0):
+        raise ValueError(f"grid.{name} must be {'> 0' if name in _POSITIVE else '>= 0'}")
+    return values
+
+
+def _scenarios(req: BatchCalcRequest) -> Tuple[int, Callable[[], Iterable[Scenario]]]:
+    """(count, factory of a fresh scenario iterator) for either input form."""
+    if (req.scenarios is None) == (req.grid is None):
+        raise ValueError("provide exactly one of scenarios or grid")
+    if req.scenarios is not None:
+        rows = [(s.price_now, s.per_volume, s.waste_lower, s.waste_upper, s.fee_amount_token) for s in req.scenarios]
+        return len(rows), lambda: rows
+    axes = {name: _axis_values(name, getattr(req.grid, name)) for name in SCENARIO_FIELDS}
+    # Grids are expanded lazily (once for the inputs, once for the engine)
+    return grid_size(axes), lambda: expand_grid(axes)
+
+
+def _ndjson(scenarios: Callable[[], Iterable[Scenario]]) -> Iterator[str]:
+    buf: List[str] = []
+    results = compute_diff_range_batch(scenarios())
+    for i, (scenario, (lo, up, err)) in enumerate(zip(scenarios(), results)):
+        inputs = ",".join(f'"{name}":"{value}"' for name, value in zip(SCENARIO_FIELDS, scenario))
+        if err is None:
+            buf.append(f'{{"i":{i},{inputs},"diff_lower":"{lo}","diff_upper":"{up}"}}\n')
+        else:
+            buf.append(f'{{"i":{i},{inputs},"error":{json.dumps(err)}}}\n')
+        if len(buf) >= _NDJSON_CHUNK_ROWS:
+            yield "".join(buf)
+            buf.clear()
+    if buf:
+        yield "".join(buf)
+
+
+def _columnar(scenarios: Callable[[], Iterable[Scenario]]) -> Dict[str, List[Optional[str]]]:
+    cols: Dict[str, List[Optional[str]]] = {name: [] for name in SCENARIO_FIELDS}
+    inputs = [cols[name] for name in SCENARIO_FIELDS]
+    lower, upper, errors = cols["diff_lower"], cols["diff_upper"], cols["error"] = [], [], []
+    for scenario, (lo, up, err) in zip(scenarios(), compute_diff_range_batch(scenarios())):
+        for col, value in zip(inputs, scenario):
+            col.append(str(value))
+        lower.append(None if lo is None else str(lo))
+        upper.append(None if up is None else str(up))
+        errors.append(err)
+    return cols
+
+
+def _rate_limit_unit(request: Request) -> int:
+    """Scenarios per rate limit unit, widened so a CALC_BATCH_MAX_SCENARIOS batch fits the route's limit."""
+    unit = config.CALC_BATCH_RATE_LIMIT_UNIT
+    rule = rate_limit_rule(request)
+    if rule is not None:
+        units = max(1, rule.limit - rule.cost + 1)  # what one request may spend in total
+        unit = max(unit, -(-config.CALC_BATCH_MAX_SCENARIOS // units))
+    return unit
+
+
+@router.post("/price-range/batch")
+async def price_range_batch(request: Request, req: BatchCalcRequest):
+    """Many scenarios in one call: an explicit list or a grid (cartesian product of
+    per-field values/ranges). Streams NDJSON rows, or returns columnar arrays."""
+    try:
+        count, scenarios = _scenarios(req)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if count > config.CALC_BATCH_MAX_SCENARIOS:
+        raise HTTPException(status_code=400,
+                            detail=f"{count} scenarios, at most {config.CALC_BATCH_MAX_SCENARIOS} per batch")
+    await charge_up_front(request, max(1, -(-count // _rate_limit_unit(request))))
+    headers = {"X-Scenario-Count": str(count)}
+    if req.format == "columnar":
+        cols = await run_in_threadpool(_columnar, scenarios)
+        return JSONResponse({"count": count, "columns": cols}, headers=headers)
+    # Sync generator: Starlette iterates it in the threadpool, off the event loop
+    return StreamingResponse(_ndjson(scenarios), media_type="application/x-ndjson", headers=headers)
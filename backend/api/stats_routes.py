@@ -0,0 +1,90 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter
+
+from backend.core.alerts import alert_stats
+from backend.core.http_client import pool_stats, upstream_stats
+from backend.core.logging import logging_stats
+from backend.core.middleware import rate_limit_stats
+from backend.services.alpha_price_service import prefetcher, price_cache_stats, shared_prices
+from backend.services.alpha_token_service import token_registry
+from backend.services.binance_client import agg_trade_poller
+from backend.services.binance_ws_client import get_stream_client
+from backend.services.candle_rollup import candle_rollups
+from backend.services.price_broadcaster import broadcaster
+from backend.services.symbol_mapping import symbol_index
+from backend.services.trade_store import get_trade_store
+
+router = APIRouter(prefix="/api/stats", tags=["stats"])
+
+
+@router.get("/http-pool")
+async def get_http_pool_stats() -> Dict[str, Any]:
+    return pool_stats()
+
+
+@router.get("/stream")
+async def get_stream_stats() -> Dict[str, Any]:
+    client = get_stream_client()
+    return client.stats() if client is not None else {"enabled": False}
+
+
+@router.get("/price-cache")
+async def get_price_cache_stats() -> Dict[str, Any]:
+    return price_cache_stats()
+
+
+@router.get("/tokens")
+async def get_token_registry_stats() -> Dict[str, Any]:
+    return token_registry.stats()
+
+
+@router.get("/broadcast")
+async def get_broadcast_stats() -> Dict[str, Any]:
+    return broadcaster.stats()
+
+
+@router.get("/rate-limit")
+async def get_rate_limit_stats() -> Dict[str, Any]:
+    return rate_limit_stats()
+
+
+@router.get("/trade-store")
+async def get_trade_store_stats() -> Dict[str, Any]:
+    store = get_trade_store()
+    return store.stats() if store is not None else {"enabled": False}
+
+
+@router.get("/candles")
+async def get_candle_stats() -> Dict[str, Any]:
+    return candle_rollups.stats()
+
+
+@router.get("/prefetch")
+async def get_prefetch_stats() -> Dict[str, Any]:
+    return prefetcher.stats()
+
+
+@router.get("/upstream")
+async def get_upstream_stats() -> Dict[str, Any]:
+    return upstream_stats()
+
+
+@router.get("/shared-cache")
+async def get_shared_cache_stats() -> Dict[str, Any]:
+    return shared_prices.stats()
+
+
+@router.get("/agg-trades")
+async def get_agg_trade_stats() -> Dict[str, Any]:
+    return agg_trade_poller.stats()
+
+
+@router.get("/logging")
+async def get_logging_stats() -> Dict[str, Any]:
+    return {"logging": logging_stats(), "alerts": alert_stats()}
+
+
+@router.get("/symbols")
+async def get_symbol_index_stats() -> Dict[str, Any]:
+    return symbol_index.stats()
@@ -0,0 +1,89 @@
+"""
+Batch calculator benchmark: the scalar compute_diff_range loop (one call per
+scenario, as the per-POST sweeps do) vs compute_diff_range_batch, for a grid
+sweep and for unrelated random scenarios, plus N single POSTs vs one batch POST
+in-process over httpx.ASGITransport.
+
+Run: python -m backend.benchmarks.bench_calc_batch [--posts 2000]
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from decimal import Decimal
+
+import httpx
+
+from backend.config import config
+from backend.main import app
+from backend.services.calculation_service import (
+    compute_diff_range,
+    compute_diff_range_batch,
+    expand_grid,
+    grid_values,
+)
+
+GRID = {
+    "price_now": [Decimal("0.5"), Decimal("1"), Decimal("1.25")],
+    "per_volume": grid_values("50", "540", "10"),
+    "waste_lower": grid_values("0", "5", "0.05"),
+    "waste_upper": grid_values("1", "5", "0.5"),
+    "fee_amount_token": [Decimal("0"), Decimal("0.5"), Decimal("1"), Decimal("2")],
+}
+
+
+def random_scenarios(n: int, seed: int = 3):
+    rng = random.Random(seed)
+
+    def dec(places: int) -> Decimal:
+        return Decimal(rng.randint(1, 10 ** 9)).scaleb(-places)
+
+    return [(dec(8), dec(4) + 10, dec(6), dec(6), dec(8)) for _ in range(n)]
+
+
+def _rate(fn, rows) -> float:
+    start = time.perf_counter()
+    fn(rows)
+    return len(rows) / (time.perf_counter() - start)
+
+
+async def http_sweep(n: int):
+    rows = [{"price_now": "1", "per_volume": str(100 + i % 50), "waste_lower": "3",
+             "waste_upper": "5", "fee_amount_token": "2"} for i in range(n)]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        for row in rows:
+            (await client.post("/api/calc/price-range", json=row)).raise_for_status()
+        single = time.perf_counter() - start
+        start = time.perf_counter()
+        (await client.post("/api/calc/price-range/batch", json={"scenarios": rows})).raise_for_status()
+        batch = time.perf_counter() - start
+    return single, batch
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--random", type=int, default=100000)
+    parser.add_argument("--posts", type=int, default=2000)
+    args = parser.parse_args()
+
+    scalar = lambda rows: [compute_diff_range(*r) for r in rows]  # noqa: E731
+    batch = lambda rows: list(compute_diff_range_batch(rows))  # noqa: E731
+    for name, rows in (("grid", list(expand_grid(GRID))), ("random", random_scenarios(args.random))):
+        s, b = _rate(scalar, rows), _rate(batch, rows)
+        print(f"{name:<6} scenarios={len(rows)} scalar_per_s={s:,.0f} batch_per_s={b:,.0f} speedup={b / s:.1f}x")
+
+    # The limiter would reject a per-POST sweep long before it finishes
+    # (the middleware stack, and its limiter, is built on the first request)
+    config.RATE_LIMIT_MAX_REQUESTS = 10 ** 9
+    for name in ("app.request", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    single, one = asyncio.run(http_sweep(args.posts))
+    print(f"http   scenarios={args.posts} single_posts_s={single:.3f} one_batch_post_s={one:.3f} "
+          f"speedup={single / one:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Fixed-point aggregation benchmark: the Decimal reference loop
+(_aggregate_prices_decimal: Decimal(str(..)) per field, 36-digit adds) vs the
+fixed-point path (_aggregate_prices: one regex-validated column parse into
+scaled ints, exact int sums, Decimal only for the final divisions), plus the
+previous quantize (quantizer rebuilt and a localcontext entered per call) vs
+the cached quantizer, and trade-buffer ingest per new trade.
+
+Run: python -m backend.benchmarks.bench_fixed_point [--windows 50,1000]
+"""
+import argparse
+import random
+import timeit
+from decimal import Decimal, localcontext
+
+from backend.config import config
+from backend.core.precision import quantize
+from backend.services.alpha_price_service import _aggregate_prices, _aggregate_prices_decimal
+from backend.services.binance_client import AggTrade
+from backend.services.trade_buffer import TradeRingBuffer
+
+
+def legacy_quantize(val, places=None):
+    d = val if isinstance(val, Decimal) else Decimal(str(val))
+    p = config.DECIMAL_PLACES if places is None else places
+    q = Decimal('1e-' + str(p))
+    with localcontext() as ctx:
+        ctx.rounding = config.ROUNDING_MODE
+        return d.quantize(q, rounding=config.ROUNDING_MODE)
+
+
+def synthetic_trades(n: int, seed: int = 1):
+    rng = random.Random(seed)
+    return [AggTrade(i, f"{rng.uniform(0.001, 2):.8f}", f"{rng.uniform(1, 10000):.2f}", 1700000000000 + i)
+            for i in range(n)]
+
+
+def _ns_per(fn, items: int, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number / items * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--windows", default="50,1000")
+    parser.add_argument("--ingest", type=int, default=100000)
+    args = parser.parse_args()
+
+    for window in (int(w) for w in args.windows.split(",")):
+        trades = synthetic_trades(window)
+        assert _aggregate_prices(trades) == _aggregate_prices_decimal(trades)
+        number = max(1, 20000 // window)
+        ref = _ns_per(lambda: _aggregate_prices_decimal(trades), window, number)
+        fixed = _ns_per(lambda: _aggregate_prices(trades), window, number)
+        print(f"window={window:<5} decimal_ns_per_trade={ref:.0f} fixed_ns_per_trade={fixed:.0f} "
+              f"speedup={ref / fixed:.2f}x")
+
+    d = Decimal("1.234567891234")
+    old = _ns_per(lambda: legacy_quantize(d), 1, 100000)
+    new = _ns_per(lambda: quantize(d), 1, 100000)
+    print(f"quantize legacy_ns={old:.0f} cached_ns={new:.0f} speedup={old / new:.2f}x")
+
+    trades = synthetic_trades(args.ingest)
+
+    def ingest():
+        buf = TradeRingBuffer(50)
+        for i in range(0, len(trades), 10):
+            buf.add(trades[i:i + 10])
+            buf.metrics()
+
+    print(f"buffer ingest (10 new trades per poll) ns_per_trade={_ns_per(ingest, len(trades), 1):.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Token-list / agg-trades decoding benchmark: the previous path (json.loads of the
+whole payload, then a second list of dicts built from it) vs decode_list()
+with each JSON backend installed here. Reports decode time, peak traced
+memory (tracemalloc) while decoding, and the memory the result keeps alive.
+
+The token payload is synthetic unless --payload points at a recorded response
+body (e.g. saved with curl from ALPHA_TOKENS_API).
+
+Run: python -m backend.benchmarks.bench_json_decode [--tokens 10000] [--payload tokens.json]
+"""
+import argparse
+import json
+import random
+import string
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from backend.core import json_codec
+from backend.services.alpha_token_service import _TOKEN_FIELDS, _token_from_fields
+from backend.services.binance_client import AGG_TRADE_FIELDS, AggTrade
+
+
+def synthetic_token_list(n: int, seed: int = 1) -> bytes:
+    """Shaped like the Binance Alpha token list: ~30 fields per token, few of them used."""
+    rng = random.Random(seed)
+    items = []
+    for i in range(n):
+        sym = "".join(rng.choices(string.ascii_uppercase, k=rng.randint(3, 6)))
+        items.append({
+            "tokenId": f"{rng.getrandbits(64):016X}", "chainId": "56", "chainIconUrl": "https://bin.bnbstatic.com/x.png",
+            "chainName": "BSC", "contractAddress": "0x" + f"{rng.getrandbits(160):040x}", "name": f"{sym} Token",
+            "symbol": sym, "iconUrl": f"https://bin.bnbstatic.com/static/images/{sym}.png",
+            "price": f"{rng.uniform(0, 10):.8f}", "percentChange24h": f"{rng.uniform(-50, 50):.2f}",
+            "volume24h": f"{rng.uniform(0, 1e7):.8f}", "marketCap": f"{rng.uniform(0, 1e9):.8f}",
+            "fdv": f"{rng.uniform(0, 1e9):.8f}", "liquidity": f"{rng.uniform(0, 1e6):.8f}",
+            "totalSupply": str(rng.randint(1, 10 ** 12)), "circulatingSupply": str(rng.randint(1, 10 ** 12)),
+            "holders": str(rng.randint(1, 10 ** 6)), "decimals": 18, "listingCex": rng.random() < 0.1,
+            "hotTag": False, "cexCoinName": sym, "canTransfer": True, "denomination": 1, "offline": False,
+            "tradeDecimal": 8, "alphaId": f"ALPHA_{i}", "offsell": False, "priceHigh24h": f"{rng.uniform(0, 10):.8f}",
+            "priceLow24h": f"{rng.uniform(0, 10):.8f}", "count24h": str(rng.randint(0, 10 ** 5)),
+            "onlineTge": False, "onlineAirdrop": False, "score": rng.randint(0, 100), "cexOffDisplay": False,
+            "stockState": False, "listingTime": 1700000000000 + i,
+        })
+    return json.dumps({"code": "000000", "message": None, "data": items, "success": True}).encode()
+
+
+def synthetic_agg_trades(n: int, seed: int = 2) -> bytes:
+    rng = random.Random(seed)
+    data = [{"a": i, "p": f"{rng.uniform(0.001, 2):.8f}", "q": f"{rng.uniform(1, 10000):.2f}",
+             "f": i, "l": i, "T": 1700000000000 + i, "m": rng.random() < 0.5} for i in range(n)]
+    return json.dumps({"code": "000000", "data": data, "success": True}).encode()
+
+
+def legacy_tokens(body: bytes) -> List[Dict[str, str]]:
+    raw = json.loads(body)
+    data = raw.get("data") if isinstance(raw, dict) and "data" in raw else raw
+    out = []
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        symbol = item.get("symbol") or item.get("baseSymbol") or item.get("name")
+        alpha_id = item.get("alphaId") or item.get("id") or symbol
+        if symbol and alpha_id:
+            token = {"symbol": str(symbol), "alphaId": str(alpha_id)}
+            if item.get("name"):
+                token["name"] = str(item["name"])
+            out.append(token)
+    return out
+
+
+def legacy_trades(body: bytes) -> List[Dict[str, Any]]:
+    return json.loads(body).get("data")
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5) -> Tuple[float, int, int]:
+    """(best seconds, peak traced bytes, bytes still held by the result) for fn()."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    result = fn()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best, peak, retained
+
+
+def report(label: str, cases: List[Tuple[str, Callable[[], Any]]]) -> None:
+    base = None
+    for name, fn in cases:
+        secs, peak, retained = measure(fn)
+        base = base or secs
+        print(f"{label:<7} {name:<12} decode_ms={secs * 1000:8.2f} peak_mb={peak / 2 ** 20:7.2f} "
+              f"retained_mb={retained / 2 ** 20:7.2f} speedup={base / secs:.2f}x")
+
+
+def codecs() -> List[json_codec.StdlibCodec]:
+    out = []
+    for name in ("json", "orjson", "msgspec"):
+        try:
+            out.append(json_codec._CODECS[name]())
+        except ImportError:
+            print(f"({name} not installed, skipped)")
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=10000)
+    parser.add_argument("--trades", type=int, default=1000)
+    parser.add_argument("--payload", help="recorded token-list response body")
+    args = parser.parse_args()
+
+    if args.payload:
+        with open(args.payload, "rb") as f:
+            tokens_body = f.read()
+    else:
+        tokens_body = synthetic_token_list(args.tokens)
+    trades_body = synthetic_agg_trades(args.trades)
+    print(f"token payload {len(tokens_body) / 2 ** 20:.2f} MiB, trades payload {len(trades_body) / 1024:.0f} KiB")
+
+    available = codecs()
+    report("tokens", [("legacy json", lambda: legacy_tokens(tokens_body))] + [
+        (c.name, lambda c=c: c.decode_list(tokens_body, _TOKEN_FIELDS, _token_from_fields, key="data"))
+        for c in available])
+    report("trades", [("legacy json", lambda: legacy_trades(trades_body))] + [
+        (c.name, lambda c=c: c.decode_list(trades_body, AGG_TRADE_FIELDS, AggTrade, key="data"))
+        for c in available])
+
+
+if __name__ == "__main__":
+    main()
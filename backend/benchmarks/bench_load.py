@@ -0,0 +1,200 @@
+"""
+Load-test harness: the real app (in-process, over httpx.ASGITransport, with
+its lifespan) against the local fake upstream (benchmarks/fake_upstream.py,
+over real TCP), at rising concurrency, plus hot-function micro-benchmarks.
+
+Scenarios: price (GET /api/alpha/price over --symbols ids), tokens
+(GET /api/alpha/tokens), calc (POST /api/calc/price-range). Each level sends
+--requests requests from `concurrency` concurrent callers and reports
+throughput, p50/p99/mean latency, status counts and upstream calls.
+
+The rate limiter and upstream weight budget are opened up (unless set in the
+environment) so the numbers measure the app, not its throttles.
+
+Run: python -m backend.benchmarks.bench_load [--scenarios price,tokens,calc] [--concurrency 1,8,32,128]
+     [--json results.json] [--baseline previous.json --tolerance 0.25]
+With --baseline, exits 1 when throughput drops, or p99 / ns per op grow, by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+from collections import Counter
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from backend.benchmarks.fake_upstream import TOKEN_LIST_PATH, FakeBinance, FakeServer, add_fault_args, app_from_args
+
+CALC_BODY = {"price_now": "1.2345", "per_volume": "100", "waste_lower": "3", "waste_upper": "5",
+             "fee_amount_token": "2"}
+
+Request = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+def scenarios(symbols: int) -> Dict[str, Callable[[int], Request]]:
+    return {
+        "price": lambda i: ("GET", f"/api/alpha/price?alphaId=ALPHA_{i % symbols}", None),
+        "tokens": lambda i: ("GET", "/api/alpha/tokens", None),
+        "calc": lambda i: ("POST", "/api/calc/price-range", CALC_BODY),
+    }
+
+
+def _pct(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+async def run_level(client: httpx.AsyncClient, make: Callable[[int], Request], concurrency: int,
+                    requests: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    todo = iter(range(requests))
+
+    async def caller() -> None:
+        for i in todo:
+            method, url, body = make(i)
+            t0 = time.perf_counter()
+            try:
+                status = (await client.request(method, url, json=body)).status_code
+            except httpx.HTTPError:
+                status = "error"
+            latencies.append(time.perf_counter() - t0)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": sum(n for s, n in statuses.items() if not (isinstance(s, int) and s < 400)),
+        "status": {str(s): n for s, n in sorted(statuses.items(), key=str)},
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(_pct(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(_pct(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+    }
+
+
+def micro_benchmarks(number: int) -> List[Dict[str, Any]]:
+    from backend.core.precision import quantize
+    from backend.services.binance_client import AggTrade, parse_price_qty
+    from backend.services.symbol_mapping import resolve_symbol
+
+    trade = AggTrade(1, "1.23456789", "123.45", 1_700_000_000_000)
+    value = Decimal("1.234567891234")
+    cases = [
+        ("parse_price_qty", lambda: parse_price_qty(trade)),
+        ("quantize", lambda: quantize(value)),
+        ("resolve_symbol", lambda: resolve_symbol("ALPHA_7")),
+        ("resolve_symbol_suffixed", lambda: resolve_symbol("KOGEUSDT")),
+    ]
+    out = []
+    for name, fn in cases:
+        best = min(timeit.repeat(fn, number=number, repeat=3)) / number
+        out.append({"name": name, "ns_per_op": round(best * 1e9, 1), "ops_per_s": round(1 / best)})
+    return out
+
+
+async def run_all(app, fake: FakeBinance, args) -> Dict[str, Any]:
+    makers = scenarios(args.symbols)
+    load = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in args.scenarios.split(","):
+                for c in (int(x) for x in args.concurrency.split(",")):
+                    before = fake.counters["requests"]
+                    result = await run_level(client, makers[name], c, args.requests)
+                    result = {"scenario": name, **result,
+                              "upstream_calls": fake.counters["requests"] - before}
+                    load.append(result)
+                    print(f"{name:>7}  c={c:<4} {result['throughput_rps']:>9.1f} req/s  "
+                          f"p50 {result['p50_ms']:>8.3f} ms  p99 {result['p99_ms']:>8.3f} ms  "
+                          f"errors {result['errors']:>4}  upstream {result['upstream_calls']:>5}", file=sys.stderr)
+        micro = micro_benchmarks(args.micro_number)  # after the token list is loaded
+    for m in micro:
+        print(f"{m['name']:>24}  {m['ns_per_op']:>9.1f} ns/op", file=sys.stderr)
+    return {"load": load, "micro": micro}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Human-readable regressions of `results` against `baseline`."""
+    regressions = []
+    base = {(r["scenario"], r["concurrency"]): r for r in baseline.get("load", [])}
+    for r in results["load"]:
+        b = base.get((r["scenario"], r["concurrency"]))
+        if b is None:
+            continue
+        key = f"{r['scenario']} c={r['concurrency']}"
+        if r["throughput_rps"] < b["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{key}: throughput {r['throughput_rps']} < {b['throughput_rps']} req/s")
+        if r["p99_ms"] > b["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{key}: p99 {r['p99_ms']} > {b['p99_ms']} ms")
+    base_micro = {m["name"]: m for m in baseline.get("micro", [])}
+    for m in results["micro"]:
+        b = base_micro.get(m["name"])
+        if b is not None and m["ns_per_op"] > b["ns_per_op"] * (1 + tolerance):
+            regressions.append(f"{m['name']}: {m['ns_per_op']} > {b['ns_per_op']} ns/op")
+    return regressions
+
+
+def configure_env(base_url: str) -> None:
+    """Point the backend at the fake upstream; must run before backend modules are imported."""
+    os.environ["BINANCE_REST_BASE"] = base_url
+    os.environ["ALPHA_TOKENS_API"] = base_url + TOKEN_LIST_PATH
+    os.environ["USE_PROXY"] = "false"
+    for key, value in (("RATE_LIMIT_MAX_REQUESTS", "1000000000"), ("UPSTREAM_WEIGHT_PER_MINUTE", "1000000"),
+                       ("UPSTREAM_WEIGHT_BURST", "10000"), ("PREFETCH_ENABLED", "false"),
+                       ("WS_ENABLED", "false"), ("LOG_LEVEL", "WARNING")):
+        os.environ.setdefault(key, value)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", default="price,tokens,calc")
+    parser.add_argument("--concurrency", default="1,8,32,128")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per level")
+    parser.add_argument("--symbols", type=int, default=50, help="distinct ids in the price scenario")
+    parser.add_argument("--micro-number", type=int, default=20000)
+    parser.add_argument("--json", help="write results here ('-' for stdout)")
+    parser.add_argument("--baseline", help="results JSON of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    add_fault_args(parser)
+    args = parser.parse_args()
+
+    fake = app_from_args(args)
+    with FakeServer(fake) as server:
+        configure_env(server.base_url)
+        from backend.main import app
+        results = asyncio.run(run_all(app, fake, args))
+    results["meta"] = {
+        "python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count(),
+        "requests_per_level": args.requests, "symbols": args.symbols,
+        "upstream": {"latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate,
+                     "rate_429": args.rate_429},
+        "upstream_counters": fake.counters,
+    }
+    if args.json == "-":
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Middleware stack benchmark: BaseHTTPMiddleware (previous implementation) vs
+the pure ASGI middlewares, in-process over httpx.ASGITransport so only the
+app + middleware cost is measured.
+
+Run: python -m backend.benchmarks.bench_middleware [--requests 3000] [--concurrency 1]
+Latency figures are most meaningful at concurrency 1: ASGITransport runs the
+pure ASGI stack inline, while BaseHTTPMiddleware interleaves through its tasks.
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+import uuid
+from typing import Callable
+
+import httpx
+from fastapi import FastAPI, Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from backend.api.calc_routes import router as calc_router
+from backend.core.middleware import RateLimitMiddleware, RequestLoggingMiddleware
+from backend.core.rate_limit import MemoryRateLimitStore, RateLimiter, RateRule
+
+CALC_BODY = {"price_now": "1", "per_volume": "100", "waste_lower": "3", "waste_upper": "5", "fee_amount_token": "2"}
+
+
+class LegacyRequestLogging(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        req_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            logging.getLogger("app.request").info(
+                "%s %s -> %sms", request.method, request.url.path, f"{(time.perf_counter() - start) * 1000.0:.2f}")
+        response.headers.setdefault("X-Request-ID", req_id)
+        return response
+
+
+class LegacyRateLimit(BaseHTTPMiddleware):
+    def __init__(self, app, limiter: RateLimiter):
+        super().__init__(app)
+        self.limiter = limiter
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        decision = await self.limiter.acquire(request.client.host if request.client else "-", request.url.path)
+        if not decision.allowed:
+            return Response("Too Many Requests", status_code=429)
+        response = await call_next(request)
+        response.headers.setdefault("X-RateLimit-Limit", str(decision.limit))
+        response.headers.setdefault("X-RateLimit-Remaining", str(decision.remaining))
+        return response
+
+
+def build_app(legacy: bool) -> FastAPI:
+    app = FastAPI()
+    limiter = RateLimiter(MemoryRateLimitStore(), default=RateRule(10**9, 60.0), routes={})
+    if legacy:
+        app.add_middleware(LegacyRequestLogging)
+        app.add_middleware(LegacyRateLimit, limiter=limiter)
+    else:
+        app.add_middleware(RequestLoggingMiddleware)
+        app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    app.include_router(calc_router)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+
+async def drive(app: FastAPI, method: str, path: str, n: int, concurrency: int):
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue = iter(range(n))
+
+        async def worker():
+            for _ in queue:
+                t0 = time.perf_counter()
+                if method == "GET":
+                    resp = await client.get(path)
+                else:
+                    resp = await client.post(path, json=CALC_BODY)
+                latencies.append(time.perf_counter() - t0)
+                assert resp.status_code == 200, resp.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return n / elapsed, statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.99) - 1] * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    args = parser.parse_args()
+    logging.getLogger("app.request").setLevel(logging.WARNING)  # measure middleware, not log I/O
+
+    print("endpoint,stack,req_per_s,p50_ms,p99_ms")
+    for method, path in (("GET", "/health"), ("POST", "/api/calc/price-range")):
+        for legacy in (True, False):
+            rps, p50, p99 = asyncio.run(drive(build_app(legacy), method, path, args.requests, args.concurrency))
+            print(f"{path},{'base_http' if legacy else 'pure_asgi'},{rps:.0f},{p50:.3f},{p99:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Rate limiter memory benchmark: the old per-(ip, path) deque-of-timestamps
+limiter vs the GCRA store, fed by an increasing number of distinct clients.
+
+Run: python -m backend.benchmarks.bench_rate_limiter [--clients 100000] [--max-keys 20000]
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from collections import defaultdict, deque
+
+from backend.core.rate_limit import MemoryRateLimitStore, RateRule
+
+
+def old_deque_limiter(n_clients: int, hits_per_client: int, limit: int, window: float):
+    buckets = defaultdict(deque)
+    now = time.monotonic()
+    for i in range(n_clients):
+        q = buckets[(f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", "/api/alpha/price")]
+        for _ in range(hits_per_client):
+            cutoff = now - window
+            while q and q[0] < cutoff:
+                q.popleft()
+            if len(q) < limit:
+                q.append(now)
+    return buckets
+
+
+async def gcra_limiter(n_clients: int, hits_per_client: int, rule: RateRule, max_keys: int):
+    store = MemoryRateLimitStore(max_keys=max_keys)
+    for i in range(n_clients):
+        key = f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}|/api/alpha/price"
+        for _ in range(hits_per_client):
+            await store.acquire(key, rule, 1)
+    return store
+
+
+def _measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    keep = fn()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del keep
+    return current, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=100000)
+    parser.add_argument("--hits", type=int, default=10)
+    parser.add_argument("--max-keys", type=int, default=20000)
+    args = parser.parse_args()
+    rule = RateRule(60, 60.0)
+
+    print("clients,old_deque_bytes,gcra_bytes,gcra_ops_per_s")
+    for n in sorted({args.clients // 10, args.clients // 4, args.clients // 2, args.clients}):
+        old_bytes, _ = _measure(lambda: old_deque_limiter(n, args.hits, rule.limit, rule.window))
+        new_bytes, elapsed = _measure(lambda: asyncio.run(gcra_limiter(n, args.hits, rule, args.max_keys)))
+        print(f"{n},{old_bytes},{new_bytes},{n * args.hits / elapsed:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Record memory benchmark: bytes per record held in memory for aggregate trades
+and Alpha tokens, before (one dict per record, as decoded from upstream JSON)
+and after (AggTrade / AlphaToken __slots__ records, TradeColumns arrays).
+
+Sizes are measured with tracemalloc around building each representation, so
+they include the strings and ints each record keeps alive.
+
+Run: python -m backend.benchmarks.bench_records [--trades 1000000] [--tokens 10000]
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+from typing import Any, Callable, Tuple
+
+from backend.services.binance_client import AggTrade, TradeColumns
+from backend.services.token_registry import AlphaToken
+from backend.services.trade_buffer import TradeRingBuffer
+
+
+def traced(build: Callable[[], Any]) -> Tuple[Any, int]:
+    """(result, bytes still allocated by build() while the result is alive)."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def trade_values(n: int, seed: int = 1):
+    rng = random.Random(seed)
+    for i in range(n):
+        yield (10 ** 9 + i, f"{rng.uniform(0.001, 2):.8f}", f"{rng.uniform(1, 10000):.2f}", 1700000000000 + i)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trades", type=int, default=1_000_000)
+    parser.add_argument("--tokens", type=int, default=10_000)
+    args = parser.parse_args()
+    n, m = args.trades, args.tokens
+
+    def row(label: str, size: int, count: int) -> None:
+        print(f"{label:<34} total_mb={size / 2 ** 20:8.1f} bytes_per_record={size / count:7.1f}")
+
+    print(f"aggregate trades: {n}")
+    # Upstream agg-trade objects carry a, p, q, f, l, T, m
+    dicts, size = traced(lambda: [{"a": a, "p": p, "q": q, "f": a, "l": a, "T": t, "m": a % 2 == 0}
+                                  for a, p, q, t in trade_values(n)])
+    row("before: upstream dict", size, n)
+    del dicts
+    slim, size = traced(lambda: [{"a": a, "p": p, "q": q, "T": t} for a, p, q, t in trade_values(n)])
+    row("before: dict of a/p/q/T", size, n)
+    del slim
+    records, size = traced(lambda: [AggTrade(a, p, q, t) for a, p, q, t in trade_values(n)])
+    row("after: AggTrade (__slots__)", size, n)
+    cols, size = traced(lambda: TradeColumns.from_trades(records))
+    row("after: TradeColumns (int64 arrays)", size, n)
+    del cols
+    buf, size = traced(lambda: _window(records))
+    row("after: TradeRingBuffer window", size, len(buf))
+    del records, buf
+
+    print(f"alpha tokens: {m}")
+    names = [(f"TKN{i}", f"ALPHA_{i}", f"Token {i} Network") for i in range(m)]
+    dicts, size = traced(lambda: [{"symbol": s, "alphaId": a, "name": nm} for s, a, nm in names])
+    row("before: dict", size, m)
+    del dicts
+    tokens, size = traced(lambda: [AlphaToken(s, a, nm) for s, a, nm in names])
+    row("after: AlphaToken (__slots__)", size, m)
+    print("(token strings are shared with the source list here; both rows count only the containers)")
+
+
+def _window(records) -> TradeRingBuffer:
+    buf = TradeRingBuffer(len(records))
+    for i in range(0, len(records), 1000):
+        buf.add(records[i:i + 1000])
+    return buf
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Shared price cache benchmark: upstream calls and request latency for N worker
+processes polling the same symbols, with and without the shared-memory table,
+plus the raw read latency of a published slot.
+
+Each worker is a separate process running fetch_alpha_price_with_source()
+against a fake upstream (fixed latency, every call counted) for --seconds,
+issuing --rps requests/s spread over --symbols symbols.
+
+Run: python -m backend.benchmarks.bench_shared_cache [--workers 1,4,16] [--seconds 5]
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import random
+import statistics
+import tempfile
+import time
+
+
+def worker(shared: bool, path: str, args, barrier, results) -> None:
+    os.environ.update({
+        "SHARED_CACHE_ENABLED": "true" if shared else "false", "SHARED_CACHE_PATH": path,
+        "PREFETCH_ENABLED": "false", "ALPHA_TOKENS_API": "", "USE_PROXY": "false", "LOG_LEVEL": "WARNING",
+        "PRICE_CACHE_TTL_SECONDS": str(args.ttl),
+    })
+    from backend.services import alpha_price_service as svc
+    from backend.services.binance_client import AggTrade
+
+    calls = [0]
+
+    async def fake_fetch(symbol, limit=None, from_id=None):
+        calls[0] += 1
+        await asyncio.sleep(args.latency)
+        return [AggTrade(calls[0], "1.23456789", "10", int(time.time() * 1000))]
+
+    svc.fetch_agg_trades = fake_fetch
+
+    async def main():
+        await svc.shared_prices.start()
+        barrier.wait()
+        rng = random.Random(os.getpid())
+        latencies = []
+        end = time.perf_counter() + args.seconds
+        while time.perf_counter() < end:
+            t0 = time.perf_counter()
+            await svc.fetch_alpha_price_with_source(f"SYM{rng.randrange(args.symbols)}")
+            latencies.append(time.perf_counter() - t0)
+            await asyncio.sleep(max(0.0, 1 / args.rps - (time.perf_counter() - t0)))
+        await svc.shared_prices.stop()
+        return latencies
+
+    latencies = asyncio.run(main())
+    results.put((calls[0], latencies))
+
+
+def run(n: int, shared: bool, args) -> None:
+    ctx = mp.get_context("spawn")
+    path = os.path.join(tempfile.mkdtemp(prefix="shared-cache-bench-"), "prices")
+    barrier, results = ctx.Barrier(n), ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(shared, path, args, barrier, results)) for _ in range(n)]
+    for p in procs:
+        p.start()
+    out = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    calls = sum(c for c, _ in out)
+    lat = sorted(x for _, l in out for x in l)
+    p50, p99 = lat[len(lat) // 2], lat[int(len(lat) * 0.99)]
+    print(f"{n:>3} workers  shared={'on ' if shared else 'off'}  upstream calls {calls:>6} "
+          f"({calls / args.seconds:7.1f}/s)  requests {len(lat):>6}  "
+          f"p50 {p50 * 1e3:7.3f} ms  p99 {p99 * 1e3:7.3f} ms")
+
+
+def read_latency(n: int = 200_000) -> None:
+    from backend.services.shared_price_cache import SharedPriceStore
+    from decimal import Decimal
+    path = os.path.join(tempfile.mkdtemp(prefix="shared-cache-bench-"), "prices")
+    store = SharedPriceStore(path, slots=4096)
+    store.try_become_writer()
+    store.publish({"symbol": "KOGEUSDT", "price_now": Decimal("1.23456789"), "price_avg": Decimal("1.2"),
+                   "price_vwap": Decimal("1.21"), "timestamp": 1700000000000})
+    t0 = time.perf_counter()
+    for _ in range(n):
+        store.read("KOGEUSDT")
+    per = (time.perf_counter() - t0) / n
+    print(f"slot read (seqlock + snapshot dict): {per * 1e6:.2f} us")
+    store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,4,16")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--rps", type=float, default=50.0, help="requests/s per worker")
+    parser.add_argument("--ttl", type=float, default=1.0)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake upstream latency (s)")
+    args = parser.parse_args()
+    read_latency()
+    for n in (int(x) for x in args.workers.split(",")):
+        for shared in (False, True):
+            run(n, shared, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Token search micro-benchmark: precomputed index vs the linear filter the
+frontend used (label.toLowerCase().includes(q) over the whole list).
+
+Run: python -m backend.benchmarks.bench_token_search [--tokens 10000]
+"""
+import argparse
+import random
+import string
+import time
+
+from backend.services.token_registry import AlphaToken
+from backend.services.token_search import TokenSearchIndex
+
+
+def synthetic_tokens(n: int, seed: int = 1):
+    rng = random.Random(seed)
+    tokens = []
+    for i in range(n):
+        sym = "".join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(3, 8)))
+        name = sym.title() + " " + rng.choice(["Protocol", "Token", "Network", "Finance", "AI", "Labs"])
+        tokens.append(AlphaToken(sym, f"ALPHA_{i}", name))
+    return tokens
+
+
+def linear_filter(tokens, q, limit):
+    ql = q.strip().lower()
+    out = [t for t in tokens if ql in f"{t.symbol} ({t.alpha_id})".lower()]
+    return out[:limit]
+
+
+def _time_per_query(fn, queries, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for q in queries:
+            fn(q)
+    return (time.perf_counter() - start) / (rounds * len(queries))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    tokens = synthetic_tokens(args.tokens)
+    rng = random.Random(2)
+    sample = rng.sample(tokens, 50)
+    queries = [t.symbol[:2] for t in sample] + [t.symbol for t in sample] + \
+              [t.alpha_id for t in sample[:10]] + [t.name.split()[0][1:] for t in sample[:20]]
+
+    start = time.perf_counter()
+    index = TokenSearchIndex(tokens)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    linear = _time_per_query(lambda q: linear_filter(tokens, q, 20), queries, args.rounds)
+    indexed = _time_per_query(lambda q: index.search(q, limit=20), queries, args.rounds)
+    print(f"tokens={args.tokens} queries={len(queries)} index_build_ms={build_ms:.1f}")
+    print(f"linear_filter_us_per_query={linear * 1e6:.1f}")
+    print(f"index_search_us_per_query={indexed * 1e6:.1f}")
+    print(f"speedup={linear / indexed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Trade history store benchmark: ingest throughput into on-disk segments and
+range-query latency (aggregates + first rows) on a synthetic dataset.
+
+Trades are generated in chunks (ids increasing, ~10 trades/s, 8-decimal
+prices), appended and flushed like the background task does, then random
+windows of several widths are queried through freshly opened and warm
+(already mapped) readers.
+
+Run: python -m backend.benchmarks.bench_trade_store [--trades 10000000] [--dir /tmp/trades]
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from backend.services.binance_client import AggTrade
+from backend.services.trade_store import TradeStore
+
+T0 = 1_700_000_000_000
+WINDOWS = (("1m", 60_000), ("1h", 3_600_000), ("1d", 86_400_000))
+
+
+def chunks(n: int, size: int = 100_000, seed: int = 1):
+    rng = random.Random(seed)
+    t, price = T0, 1.0
+    for start in range(0, n, size):
+        out = []
+        for i in range(start, min(n, start + size)):
+            t += rng.randint(0, 200)
+            price = max(0.0001, price * (1 + rng.gauss(0, 0.0005)))
+            out.append(AggTrade(i + 1, f"{price:.8f}", f"{rng.uniform(1, 10000):.2f}", t))
+        yield out
+
+
+def disk_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trades", type=int, default=10_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dir", help="store directory (default: a temporary one, removed afterwards)")
+    args = parser.parse_args()
+    root = args.dir or tempfile.mkdtemp(prefix="trade-store-bench-")
+
+    store = TradeStore(root, segment_seconds=3600)
+    ingest = 0.0
+    last_time = T0
+    for batch in chunks(args.trades):
+        t0 = time.perf_counter()
+        store.append("BENCH", batch)
+        store.flush()
+        ingest += time.perf_counter() - t0
+        last_time = batch[-1].time
+    size = disk_bytes(os.path.join(root, "BENCH"))
+    print(f"ingest: {args.trades} trades in {ingest:.1f}s = {args.trades / ingest:,.0f} trades/s; "
+          f"{len(store.partitions('BENCH'))} segments, {size / 2 ** 20:.0f} MiB ({size / args.trades:.1f} B/trade)")
+    store.close()
+
+    rng = random.Random(2)
+    for label, cold in (("cold", True), ("warm", False)):
+        store = TradeStore(root, segment_seconds=3600, max_open_segments=4096)
+        for name, width in WINDOWS:
+            latencies, counts = [], []
+            for _ in range(args.queries):
+                start = rng.randint(T0, max(T0, last_time - width))
+                if cold:
+                    store.close()  # unmap everything: measures opening the segments too
+                t0 = time.perf_counter()
+                res = store.query("BENCH", start, start + width, limit=100)
+                latencies.append(time.perf_counter() - t0)
+                counts.append(res["count"])
+            latencies.sort()
+            print(f"query {label:<4} {name:<3} rows~{statistics.mean(counts):>10,.0f} "
+                  f"p50_ms={latencies[len(latencies) // 2] * 1000:8.2f} "
+                  f"p99_ms={latencies[int(len(latencies) * 0.99)] * 1000:8.2f}")
+        store.close()
+
+    if not args.dir:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
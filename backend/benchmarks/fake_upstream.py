@@ -0,0 +1,180 @@
+"""
+Local fake Binance upstream for load tests: replays agg-trades and Alpha
+token-list payloads with configurable latency, 5xx error rate and 429s.
+
+Recordings are files holding one JSON response body, or JSON lines with one
+body per line (replayed round-robin, whatever symbol is asked for). Without
+them, seeded synthetic bodies in the upstream format are used, so runs are
+repeatable. Injected 429s carry Retry-After: --retry-after.
+
+Standalone, pointing a real backend at it:
+  python -m backend.benchmarks.fake_upstream --port 18080 --latency 0.02 --rate-429 0.01
+  BINANCE_REST_BASE=http://127.0.0.1:18080 USE_PROXY=false \\
+  ALPHA_TOKENS_API=http://127.0.0.1:18080/bapi/defi/v1/public/wallet-direct/buw/wallet/cex/alpha/all/token/list \\
+  uvicorn backend.main:app --workers 4
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+from itertools import cycle
+from typing import Dict, List, Optional, Tuple
+
+import uvicorn
+
+AGG_TRADES_PATH = "/bapi/defi/v1/public/alpha-trade/agg-trades"
+TOKEN_LIST_PATH = "/bapi/defi/v1/public/wallet-direct/buw/wallet/cex/alpha/all/token/list"
+T0 = 1_700_000_000_000
+
+
+def load_recording(path: str) -> List[bytes]:
+    """Response bodies from a recording: one JSON document, or JSON lines."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        json.loads(raw)
+        return [raw.strip()]
+    except ValueError:
+        return [line.strip() for line in raw.splitlines() if line.strip()]
+
+
+def synthetic_trades(bodies: int = 16, limit: int = 50, seed: int = 1) -> List[bytes]:
+    """agg-trades bodies whose windows overlap like consecutive polls do."""
+    rng = random.Random(seed)
+    trades, t, price = [], T0, 1.0
+    for i in range((bodies + 1) * limit // 2):
+        t += rng.randint(0, 500)
+        price = max(0.0001, price * (1 + rng.gauss(0, 0.001)))
+        trades.append({"a": 1000 + i, "p": f"{price:.8f}", "q": f"{rng.uniform(1, 5000):.2f}",
+                       "f": 5000 + 2 * i, "l": 5001 + 2 * i, "T": t, "m": rng.random() < 0.5})
+    step = limit // 2
+    return [json.dumps({"code": "000000", "message": None, "success": True,
+                        "data": trades[k * step:k * step + limit]}).encode() for k in range(bodies)]
+
+
+def synthetic_tokens(count: int = 500, seed: int = 1) -> bytes:
+    rng = random.Random(seed)
+    data = [{"tokenId": f"{rng.getrandbits(64):016X}", "chainId": "56", "name": f"Token {i}",
+             "symbol": f"SYM{i}", "alphaId": f"ALPHA_{i}", "price": f"{rng.uniform(0.001, 50):.8f}",
+             "decimals": 18, "listingCex": rng.random() < 0.2} for i in range(count)]
+    return json.dumps({"code": "000000", "message": None, "success": True, "data": data}).encode()
+
+
+class FakeBinance:
+    """ASGI app answering the two upstream endpoints the backend calls."""
+
+    def __init__(self, trades: Optional[List[bytes]] = None, tokens: Optional[bytes] = None, *,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 rate_429: float = 0.0, retry_after: float = 1.0, seed: int = 0) -> None:
+        self._trades = cycle(trades or synthetic_trades())
+        self._tokens = tokens or synthetic_tokens()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self.counters: Dict[str, int] = {"requests": 0, "agg_trades": 0, "tokens": 0,
+                                         "errors": 0, "throttled": 0, "not_found": 0}
+
+    def _respond(self, path: str) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+        roll = self._rng.random()
+        if roll < self.rate_429:
+            self.counters["throttled"] += 1
+            return 429, [(b"retry-after", str(self.retry_after).encode())], b'{"code":-1003}'
+        if roll < self.rate_429 + self.error_rate:
+            self.counters["errors"] += 1
+            return 500, [], b'{"code":"500"}'
+        if path == AGG_TRADES_PATH:
+            self.counters["agg_trades"] += 1
+            return 200, [], next(self._trades)
+        if path == TOKEN_LIST_PATH:
+            self.counters["tokens"] += 1
+            return 200, [], self._tokens
+        self.counters["not_found"] += 1
+        return 404, [], b"{}"
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return
+        self.counters["requests"] += 1
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        status, headers, body = self._respond(scope["path"])
+        headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                   *headers]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+class FakeServer:
+    """Runs a FakeBinance under uvicorn in a background thread on a free local port."""
+
+    def __init__(self, app: FakeBinance, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.app = app
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self.host, self.port = self._sock.getsockname()
+        config = uvicorn.Config(app, lifespan="off", log_level="warning", access_log=False)
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, kwargs={"sockets": [self._sock]}, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "FakeServer":
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("fake upstream failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+        self._sock.close()
+
+    def __enter__(self) -> "FakeServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def add_fault_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--trades-file", help="recorded agg-trades bodies (JSON or JSON lines)")
+    parser.add_argument("--tokens-file", help="recorded token-list body")
+    parser.add_argument("--latency", type=float, default=0.02, help="upstream latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra uniform random latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 500 responses")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of 429 responses")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After on injected 429s (s)")
+
+
+def app_from_args(args: argparse.Namespace) -> FakeBinance:
+    return FakeBinance(
+        load_recording(args.trades_file) if args.trades_file else None,
+        load_recording(args.tokens_file)[0] if args.tokens_file else None,
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        rate_429=args.rate_429, retry_after=args.retry_after)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    add_fault_args(parser)
+    args = parser.parse_args()
+    uvicorn.run(app_from_args(args), host=args.host, port=args.port, lifespan="off", log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,25 +15,165 @@ HTTP_PROXY: str = os.getenv("HTTP_PROXY", "http://127.0.0.1:33210")
 SOCKS_HOST: str = os.getenv("SOCKS_HOST", "127.0.0.1")
 SOCKS_PORT: int = int(os.getenv("SOCKS_PORT", "33211"))
 
-# Rate limiting (simple in-memory)
+# Rate limiting (GCRA, O(1) state per client/path key)
 RATE_LIMIT_WINDOW_SECONDS: int = int(os.getenv("RATE_LIMIT_WINDOW_SECONDS", "60"))
 RATE_LIMIT_MAX_REQUESTS: int = int(os.getenv("RATE_LIMIT_MAX_REQUESTS", "60"))
+# Per-route overrides: "path=limit/window[:cost],..." e.g. "/api/alpha/prices=300/60"
+RATE_LIMIT_ROUTES: str = os.getenv("RATE_LIMIT_ROUTES", "")
+RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))  # LRU cap (memory backend)
+RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()  # memory | redis
+RATE_LIMIT_REDIS_URL: str = os.getenv("RATE_LIMIT_REDIS_URL", "redis://127.0.0.1:6379/0")
+# X-Forwarded-For is only honored when the peer is in these IPs/CIDRs (comma-separated)
+RATE_LIMIT_TRUSTED_PROXIES: str = os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "")
 
 # HTTP client retry policy
 RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
 RETRY_BACKOFF_BASE: float = float(os.getenv("RETRY_BACKOFF_BASE", "0.25"))  # seconds
 RETRY_BACKOFF_FACTOR: float = float(os.getenv("RETRY_BACKOFF_FACTOR", "2.0"))
+RETRY_BACKOFF_MAX: float = float(os.getenv("RETRY_BACKOFF_MAX", "5.0"))  # seconds, before jitter
+# Longest 429 Retry-After waited out inline; longer ones fail the call (callers may serve stale data)
+RETRY_AFTER_MAX_SECONDS: float = float(os.getenv("RETRY_AFTER_MAX_SECONDS", "10"))
+
+# Upstream governor: process-wide weight budget, priority queue, per-endpoint circuit breaker
+UPSTREAM_WEIGHT_PER_MINUTE: float = float(os.getenv("UPSTREAM_WEIGHT_PER_MINUTE", "1200"))
+UPSTREAM_WEIGHT_BURST: float = float(os.getenv("UPSTREAM_WEIGHT_BURST", "40"))
+# File holding the weight budget shared by all workers on the host; empty: one budget per process
+UPSTREAM_BUDGET_PATH: str = os.getenv("UPSTREAM_BUDGET_PATH", "")
+UPSTREAM_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT_SECONDS", "10"))
+BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))  # consecutive failures
+BREAKER_RESET_SECONDS: float = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+# Last good price snapshot served while the upstream is unavailable, up to this age
+PRICE_STALE_MAX_SECONDS: float = float(os.getenv("PRICE_STALE_MAX_SECONDS", "300"))
+
+# Shared HTTP client (one pooled client per process, opened by the app lifespan)
+HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "true").lower() in {"1", "true", "yes"}
+HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30.0"))  # seconds
+HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5.0"))
+HTTP_READ_TIMEOUT: float = float(os.getenv("HTTP_READ_TIMEOUT", "10.0"))
+HTTP_WRITE_TIMEOUT: float = float(os.getenv("HTTP_WRITE_TIMEOUT", "10.0"))
+HTTP_POOL_TIMEOUT: float = float(os.getenv("HTTP_POOL_TIMEOUT", "5.0"))
+
+# Metrics (GET /metrics, Prometheus text format); false turns all instrumentation into no-ops
+METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() in {"1", "true", "yes"}
+METRICS_LOOP_LAG_INTERVAL: float = float(os.getenv("METRICS_LOOP_LAG_INTERVAL", "0.5"))  # seconds
+
+# Profiling (opt-in): GET /api/admin/profile runs a sampling profiler for N seconds
+PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() in {"1", "true", "yes"}
+PROFILE_MAX_SECONDS: float = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# Requests slower than this keep a per-phase timing breakdown (GET /api/admin/slow-requests); 0 = off
+SLOW_REQUEST_THRESHOLD_MS: float = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "0"))
+SLOW_REQUEST_RING_SIZE: int = int(os.getenv("SLOW_REQUEST_RING_SIZE", "100"))
+# /api/admin/* requires the X-Admin-Token header to match; empty: the admin endpoints answer 403
+ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
 
 # Logging
 LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()
+# json: one JSON object per line | text
+LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json").lower()
+# Records are queued to a writer thread; when the queue is full they are dropped (and counted)
+LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Share of successful, fast requests written to the access log (errors and slow ones always are)
+LOG_ACCESS_SAMPLE_RATE: float = float(os.getenv("LOG_ACCESS_SAMPLE_RATE", "1.0"))
+LOG_ACCESS_SLOW_MS: float = float(os.getenv("LOG_ACCESS_SLOW_MS", "1000"))
+# Alerts: repeats of the same alert within the window are counted instead of logged,
+# and at most ALERT_MAX_PER_MINUTE alerts are logged in total
+ALERT_DEDUPE_SECONDS: float = float(os.getenv("ALERT_DEDUPE_SECONDS", "60"))
+ALERT_MAX_PER_MINUTE: int = int(os.getenv("ALERT_MAX_PER_MINUTE", "20"))
+
+# JSON decode/encode backend: auto (msgspec > orjson > json) | msgspec | orjson | json
+JSON_BACKEND: str = os.getenv("JSON_BACKEND", "auto").lower()
 
 # External APIs
 BINANCE_REST_BASE: str = os.getenv("BINANCE_REST_BASE", "https://www.binance.com")
 
+# WebSocket aggTrade streaming (one multiplexed connection, SOCKS5 via SOCKS_HOST/SOCKS_PORT)
+WS_ENABLED: bool = os.getenv("WS_ENABLED", "false").lower() in {"1", "true", "yes"}
+BINANCE_WS_URL: str = os.getenv("BINANCE_WS_URL", "wss://nbstream.binance.com/w3w/wsa/stream")
+WS_RECONNECT_BACKOFF_BASE: float = float(os.getenv("WS_RECONNECT_BACKOFF_BASE", "0.5"))  # seconds
+WS_RECONNECT_BACKOFF_MAX: float = float(os.getenv("WS_RECONNECT_BACKOFF_MAX", "30.0"))
+WS_PING_INTERVAL: float = float(os.getenv("WS_PING_INTERVAL", "20.0"))
+# Comma-separated trading symbols kept subscribed for the process lifetime
+WS_SYMBOLS: str = os.getenv("WS_SYMBOLS", "")
+
 # If you have an Alpha tokens listing API, configure it here.
 # When empty, service will fallback to local file or empty list.
 ALPHA_TOKENS_API: str = os.getenv("ALPHA_TOKENS_API", "https://www.binance.com/bapi/defi/v1/public/wallet-direct/buw/wallet/cex/alpha/all/token/list")
+# Token registry refresh: full list reload interval, local mapping file mtime poll
+TOKEN_REFRESH_SECONDS: float = float(os.getenv("TOKEN_REFRESH_SECONDS", "300"))
+TOKEN_FILE_POLL_SECONDS: float = float(os.getenv("TOKEN_FILE_POLL_SECONDS", "5"))
 
 # Trading symbol construction
 ALPHA_SYMBOL_SUFFIX: str = os.getenv("ALPHA_SYMBOL_SUFFIX", "USDT")
 DEFAULT_TRADES_LIMIT: int = int(os.getenv("DEFAULT_TRADES_LIMIT", "50"))
+
+# Symbol validation: once the remote token list is loaded, symbols it doesn't list are rejected
+# without an upstream call; symbols the upstream reports as not found are remembered
+SYMBOL_VALIDATION_ENABLED: bool = os.getenv("SYMBOL_VALIDATION_ENABLED", "true").lower() in {"1", "true", "yes"}
+SYMBOL_NEGATIVE_TTL_SECONDS: float = float(os.getenv("SYMBOL_NEGATIVE_TTL_SECONDS", "300"))
+SYMBOL_NEGATIVE_MAX_ENTRIES: int = int(os.getenv("SYMBOL_NEGATIVE_MAX_ENTRIES", "10000"))
+# Memoized alphaId -> symbol results (cleared whenever the token list or mapping changes)
+RESOLVE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESOLVE_CACHE_MAX_ENTRIES", "10000"))
+
+# In-memory per-symbol trade windows (metrics window = capacity trades)
+TRADE_BUFFER_CAPACITY: int = int(os.getenv("TRADE_BUFFER_CAPACITY", str(DEFAULT_TRADES_LIMIT)))
+TRADE_BUFFER_MAX_SYMBOLS: int = int(os.getenv("TRADE_BUFFER_MAX_SYMBOLS", "1000"))
+
+# Incremental agg-trade polling: per-symbol fromId cursor, limit sized to the observed trade rate
+AGG_TRADES_INCREMENTAL: bool = os.getenv("AGG_TRADES_INCREMENTAL", "true").lower() in {"1", "true", "yes"}
+AGG_TRADES_MIN_LIMIT: int = int(os.getenv("AGG_TRADES_MIN_LIMIT", "5"))
+# A cursor not polled for this long is distrusted; the next poll fetches the full window
+AGG_TRADES_CURSOR_IDLE_SECONDS: float = float(os.getenv("AGG_TRADES_CURSOR_IDLE_SECONDS", "300"))
+
+# /api/alpha/price snapshot cache (shared by concurrent requests for the same symbol)
+PRICE_CACHE_TTL_SECONDS: float = float(os.getenv("PRICE_CACHE_TTL_SECONDS", "1.0"))
+PRICE_CACHE_MAX_ENTRIES: int = int(os.getenv("PRICE_CACHE_MAX_ENTRIES", "1024"))
+
+# Batch price endpoint (/api/alpha/prices)
+PRICE_BATCH_MAX_SYMBOLS: int = int(os.getenv("PRICE_BATCH_MAX_SYMBOLS", "100"))
+PRICE_BATCH_CONCURRENCY: int = int(os.getenv("PRICE_BATCH_CONCURRENCY", "8"))
+
+# Server push (/api/alpha/stream): one refresh loop per symbol fanned out to clients
+PRICE_STREAM_INTERVAL_SECONDS: float = float(os.getenv("PRICE_STREAM_INTERVAL_SECONDS", "1.0"))
+PRICE_STREAM_QUEUE_SIZE: int = int(os.getenv("PRICE_STREAM_QUEUE_SIZE", "16"))
+PRICE_STREAM_SLOW_CONSUMER_POLICY: str = os.getenv("PRICE_STREAM_SLOW_CONSUMER_POLICY", "drop_oldest")  # or conflate
+PRICE_STREAM_HEARTBEAT_SECONDS: float = float(os.getenv("PRICE_STREAM_HEARTBEAT_SECONDS", "15"))
+PRICE_STREAM_MAX_SUBSCRIBERS: int = int(os.getenv("PRICE_STREAM_MAX_SUBSCRIBERS", "5000"))
+
+# Batch calculator (/api/calc/price-range/batch)
+CALC_BATCH_MAX_SCENARIOS: int = int(os.getenv("CALC_BATCH_MAX_SCENARIOS", "100000"))
+# Rate limiter charges one unit per this many scenarios
+CALC_BATCH_RATE_LIMIT_UNIT: int = int(os.getenv("CALC_BATCH_RATE_LIMIT_UNIT", "1000"))
+
+# On-disk trade history (/api/alpha/history): columnar segments per symbol and time partition
+TRADE_STORE_ENABLED: bool = os.getenv("TRADE_STORE_ENABLED", "false").lower() in {"1", "true", "yes"}
+TRADE_STORE_DIR: str = os.getenv("TRADE_STORE_DIR", "")  # empty = backend/data/trades
+TRADE_STORE_SEGMENT_SECONDS: float = float(os.getenv("TRADE_STORE_SEGMENT_SECONDS", "3600"))
+TRADE_STORE_FLUSH_SECONDS: float = float(os.getenv("TRADE_STORE_FLUSH_SECONDS", "1.0"))
+TRADE_STORE_RETENTION_HOURS: float = float(os.getenv("TRADE_STORE_RETENTION_HOURS", "168"))  # 0 = keep all
+TRADE_STORE_MAX_OPEN_SEGMENTS: int = int(os.getenv("TRADE_STORE_MAX_OPEN_SEGMENTS", "256"))
+TRADE_STORE_MAX_ROWS: int = int(os.getenv("TRADE_STORE_MAX_ROWS", "10000"))  # rows returned per query
+
+# Candle rollups (/api/alpha/candles): pre-aggregated OHLCV/VWAP buckets per symbol
+CANDLE_INTERVALS: str = os.getenv("CANDLE_INTERVALS", "1s,1m,5m")  # comma-separated, units s/m/h
+CANDLE_HISTORY: int = int(os.getenv("CANDLE_HISTORY", "720"))  # buckets kept per interval
+CANDLE_MAX_SYMBOLS: int = int(os.getenv("CANDLE_MAX_SYMBOLS", "500"))
+# Late trades are recognised by agg id up to this many ids behind the newest seen
+CANDLE_LATE_SPAN: int = int(os.getenv("CANDLE_LATE_SPAN", "10000"))
+
+# Prefetch scheduler: keeps the most requested symbols' snapshots fresh in the background
+PREFETCH_ENABLED: bool = os.getenv("PREFETCH_ENABLED", "true").lower() in {"1", "true", "yes"}
+PREFETCH_TOP_K: int = int(os.getenv("PREFETCH_TOP_K", "20"))
+PREFETCH_MAX_RPS: float = float(os.getenv("PREFETCH_MAX_RPS", "5.0"))  # upstream calls/s spent on prefetching
+PREFETCH_CONCURRENCY: int = int(os.getenv("PREFETCH_CONCURRENCY", "4"))
+PREFETCH_HALF_LIFE_SECONDS: float = float(os.getenv("PREFETCH_HALF_LIFE_SECONDS", "60"))  # popularity decay
+PREFETCH_MIN_SCORE: float = float(os.getenv("PREFETCH_MIN_SCORE", "3"))  # decayed request count to be hot
+
+# Shared-memory snapshot table for multi-worker deployments: one elected worker fetches upstream
+SHARED_CACHE_ENABLED: bool = os.getenv("SHARED_CACHE_ENABLED", "false").lower() in {"1", "true", "yes"}
+SHARED_CACHE_PATH: str = os.getenv("SHARED_CACHE_PATH", "/dev/shm/binance-alpha-prices")
+SHARED_CACHE_SLOTS: int = int(os.getenv("SHARED_CACHE_SLOTS", "4096"))  # max symbols (rounded up to 2^n)
+SHARED_CACHE_WAIT_SECONDS: float = float(os.getenv("SHARED_CACHE_WAIT_SECONDS", "2.0"))  # then fetch locally
+SHARED_CACHE_IDLE_SECONDS: float = float(os.getenv("SHARED_CACHE_IDLE_SECONDS", "30"))  # stop refreshing after
@@ -1,15 +1,100 @@
 """
 Alerts stub. Replace implementations with integrations (Sentry, Slack, email) later.
+
+Repeats of an alert (same message, exception type and raising line) within
+ALERT_DEDUPE_SECONDS are counted instead of logged; the next one logged
+carries the count. At most ALERT_MAX_PER_MINUTE alerts are logged overall.
+Tracebacks are formatted by the logging thread, not by the caller.
 """
 import logging
-import traceback
-from typing import Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from backend.config import config
+from backend.core import metrics
 
 logger = logging.getLogger("alerts")
 
 
+def fingerprint(msg: str, exc: Optional[BaseException] = None) -> Hashable:
+    if exc is None:
+        return msg, None, None
+    tb = exc.__traceback__
+    while tb is not None and tb.tb_next is not None:
+        tb = tb.tb_next
+    where = (tb.tb_frame.f_code.co_filename, tb.tb_lineno) if tb is not None else None
+    return msg, type(exc).__qualname__, where
+
+
+class AlertLimiter:
+    """Per-fingerprint dedupe window plus a token bucket over all alerts."""
+
+    def __init__(self, dedupe_seconds: Optional[float] = None, max_per_minute: Optional[int] = None,
+                 max_keys: int = 1024, clock: Callable[[], float] = time.monotonic) -> None:
+        self.dedupe_seconds = config.ALERT_DEDUPE_SECONDS if dedupe_seconds is None else dedupe_seconds
+        self.max_per_minute = config.ALERT_MAX_PER_MINUTE if max_per_minute is None else max_per_minute
+        self.max_keys = max_keys
+        self._clock = clock
+        # fingerprint -> [last logged at, repeats suppressed since]
+        self._seen: "OrderedDict[Hashable, List[Any]]" = OrderedDict()
+        self._tokens = float(self.max_per_minute)
+        self._refilled = clock()
+        self._lock = threading.Lock()
+        self.logged = 0
+        self.suppressed = 0
+
+    def admit(self, key: Hashable) -> Optional[int]:
+        """None when the alert should not be logged, else the repeats suppressed before it."""
+        with self._lock:
+            now = self._clock()
+            entry = self._seen.get(key)
+            if entry is None:
+                entry = self._seen[key] = [float("-inf"), 0]
+                while len(self._seen) > self.max_keys:
+                    self._seen.popitem(last=False)
+            else:
+                self._seen.move_to_end(key)
+            self._tokens = min(float(self.max_per_minute),
+                               self._tokens + (now - self._refilled) * self.max_per_minute / 60.0)
+            self._refilled = now
+            if now - entry[0] < self.dedupe_seconds or self._tokens < 1:
+                entry[1] += 1
+                self.suppressed += 1
+                return None
+            self._tokens -= 1
+            repeats = entry[1]
+            entry[0], entry[1] = now, 0
+            self.logged += 1
+            return repeats
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "dedupe_seconds": self.dedupe_seconds,
+            "max_per_minute": self.max_per_minute,
+            "logged": self.logged,
+            "suppressed": self.suppressed,
+            "fingerprints": len(self._seen),
+        }
+
+
+limiter = AlertLimiter()
+
+
 def alert_error(msg: str, exc: Optional[BaseException] = None) -> None:
-    if exc is not None:
-        logger.error("%s\n%s", msg, "".join(traceback.format_exception(exc)))
-    else:
-        logger.error("%s", msg)
+    metrics.alerts.inc()
+    repeats = limiter.admit(fingerprint(msg, exc))
+    if repeats is None:
+        return
+    if repeats:
+        msg = f"{msg} (repeated {repeats} more times since last logged)"
+    logger.error("%s", msg, exc_info=exc, extra={"fields": {"alert": True, "repeats": repeats}})
+
+
+def alert_stats() -> Dict[str, Any]:
+    return limiter.stats()
+
+
+metrics.CallbackMetric("alerts_suppressed_total", "Alerts not logged as repeats or over the rate limit.",
+                       lambda: limiter.suppressed, kind="counter")
@@ -3,11 +3,21 @@ from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 
 from backend.core.alerts import alert_error
+from backend.core.http_client import UpstreamUnavailable
 
 logger = logging.getLogger("app.errors")
 
 
 def install_exception_handlers(app: FastAPI) -> None:
+    @app.exception_handler(UpstreamUnavailable)
+    async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailable):
+        logger.warning("upstream unavailable for %s: %s", request.url.path, exc)
+        return JSONResponse(
+            status_code=503,
+            content={"detail": f"Upstream unavailable: {exc}"},
+            headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+        )
+
     @app.exception_handler(Exception)
     async def unhandled_exc_handler(request: Request, exc: Exception):
         alert_error("Unhandled exception", exc)
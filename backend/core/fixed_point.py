@@ -0,0 +1,84 @@
+"""
+Fixed-point helpers: a decimal value as an int n and a scale s (value == n / 10**s).
+
+Upstream prices and quantities are plain decimal strings ("0.01234500"), so they
+can be read into scaled ints without building a Decimal, and sums at a common
+scale are exact. Decimal comes back only at the response boundary
+(to_decimal_exact), where the result equals the Decimal of the same value.
+"""
+import re
+from decimal import MAX_PREC, Context, Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.core.precision import INTERMEDIATE_PREC
+
+# Largest coefficient a Decimal at INTERMEDIATE_PREC holds without rounding
+PREC_LIMIT = 10 ** INTERMEDIATE_PREC
+
+_EXACT = Context(prec=MAX_PREC)
+_COLUMN_PATTERNS: Dict[int, "re.Pattern[str]"] = {}
+_POW10 = [10 ** i for i in range(40)]
+
+
+def pow10(n: int) -> int:
+    return _POW10[n] if n < 40 else 10 ** n
+
+
+def parse_fixed(raw: Any) -> Tuple[int, int]:
+    """'12.3400' -> (123400, 4). Plain unsigned decimals are split and read with int();
+    anything else (signs, exponents, numbers) goes through Decimal. Raises ValueError."""
+    if raw.__class__ is str:
+        whole, _, frac = raw.partition(".")
+        if whole.isdecimal() and (frac.isdecimal() or not frac):
+            return int(whole + frac), len(frac)
+    try:
+        d = Decimal(str(raw))
+    except ArithmeticError:
+        raise ValueError(f"invalid decimal: {raw!r}") from None
+    if not d.is_finite():
+        raise ValueError(f"invalid decimal: {raw!r}")
+    exp = d.as_tuple().exponent
+    if exp >= 0:
+        return int(d), 0
+    return int(d.scaleb(-exp, _EXACT)), -exp
+
+
+def _column_pattern(scale: int) -> "re.Pattern[str]":
+    rx = _COLUMN_PATTERNS.get(scale)
+    if rx is None:
+        rx = _COLUMN_PATTERNS[scale] = re.compile(r"(?:[0-9]*\.[0-9]{%d}\|)+" % scale)
+    return rx
+
+
+def parse_fixed_column(values: List[Any]) -> Optional[Tuple[List[int], int]]:
+    """Parse many values sharing one scale without a Python-level loop: one regex pass
+    validates every value, then a single replace/split feeds int().
+    Returns (ints, scale), or None when any value is not a plain unsigned decimal
+    with exactly `scale` fraction digits (callers fall back per value)."""
+    if not values or values[0].__class__ is not str:
+        return None
+    first = values[0]
+    dot = first.find(".")
+    if dot < 0:
+        return None
+    scale = len(first) - dot - 1
+    try:
+        joined = "|".join(values)
+    except TypeError:
+        return None
+    if _column_pattern(scale).fullmatch(joined + "|") is None:
+        return None
+    try:
+        return list(map(int, joined.replace(".", "").split("|"))), scale
+    except ValueError:
+        return None  # a bare "."
+
+
+def to_decimal_exact(n: int, scale: int) -> Decimal:
+    """n / 10**scale as a Decimal, never rounded."""
+    return Decimal(n).scaleb(-scale, _EXACT)
+
+
+def fits_precision(n: int) -> bool:
+    """True when a Decimal sum of this magnitude was exact at INTERMEDIATE_PREC."""
+    return -PREC_LIMIT < n < PREC_LIMIT
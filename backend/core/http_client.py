@@ -1,14 +1,47 @@
+"""
+Shared upstream HTTP: the pooled client and the upstream governor.
+
+Every request_with_retries() call goes through `upstream` (UpstreamGovernor):
+- a token bucket for the upstream weight budget (UPSTREAM_WEIGHT_PER_MINUTE);
+  callers that find it empty wait in a priority queue, interactive requests
+  ahead of background refreshes (see upstream_priority());
+- 429/418 pause the whole bucket for Retry-After, so one throttled request
+  doesn't let the other callers keep hammering the upstream;
+- with UPSTREAM_BUDGET_PATH set, the bucket (tokens, refill stamp, pause) lives
+  in a small file every worker on the host updates under flock, so N uvicorn
+  workers share one budget and one Retry-After pause instead of N;
+- retries use jittered exponential backoff and never wait less than Retry-After;
+- a circuit breaker per endpoint (URL path) fails fast with UpstreamUnavailable
+  after BREAKER_FAILURE_THRESHOLD consecutive failures. Callers can serve stale
+  data meanwhile; after BREAKER_RESET_SECONDS one trial request is let through.
+"""
 import asyncio
+import fcntl
+import heapq
+import itertools
 import logging
 import os
-from typing import Any
+import random
+import struct
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import httpx
 
 from backend.config import config
+from backend.core import metrics, profiling
 
 logger = logging.getLogger("app.http")
 
+# Process-wide pooled client, opened/closed by the app lifespan (see backend.main)
+_shared_client: Optional[httpx.AsyncClient] = None
+_seen_connections: "weakref.WeakSet[Any]" = weakref.WeakSet()
+_pool_counters: Dict[str, int] = {"requests": 0, "connections_opened": 0}
+
 
 def _apply_env_proxies() -> None:
     """Configure proxies via environment variables for broad httpx compatibility.
@@ -25,29 +58,478 @@ def _apply_env_proxies() -> None:
         os.environ.setdefault("HTTPS_PROXY", proxy)
 
 
+def _http2_available() -> bool:
+    if not config.HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401  (optional dependency of httpx[http2])
+    except ImportError:
+        logger.warning("HTTP2_ENABLED but 'h2' is not installed; falling back to HTTP/1.1")
+        return False
+    return True
+
+
+def _default_timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=config.HTTP_CONNECT_TIMEOUT,
+        read=config.HTTP_READ_TIMEOUT,
+        write=config.HTTP_WRITE_TIMEOUT,
+        pool=config.HTTP_POOL_TIMEOUT,
+    )
+
+
+def _default_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
 def get_async_client(**kwargs) -> httpx.AsyncClient:
+    """Build a new client with the configured pool limits and timeouts.
+    Prefer get_shared_client() on request paths; this is for one-off use.
+    """
     # Use env proxies for compatibility across httpx versions
     _apply_env_proxies()
-    timeout = kwargs.pop("timeout", 10.0)
+    timeout = kwargs.pop("timeout", None) or _default_timeout()
+    kwargs.setdefault("limits", _default_limits())
+    kwargs.setdefault("http2", _http2_available())
     return httpx.AsyncClient(timeout=timeout, trust_env=True, **kwargs)
 
 
+def _pools(client: httpx.AsyncClient):
+    """Yield httpcore pools behind the client (direct transport + proxy mounts)."""
+    transports = [getattr(client, "_transport", None)]
+    transports.extend(getattr(client, "_mounts", {}).values())
+    for t in transports:
+        pool = getattr(t, "_pool", None)
+        if pool is not None:
+            yield pool
+
+
+async def _on_response(response: httpx.Response) -> None:
+    # Count requests and newly opened connections to derive the reuse ratio
+    _pool_counters["requests"] += 1
+    client = _shared_client
+    if client is None:
+        return
+    for pool in _pools(client):
+        for conn in list(getattr(pool, "connections", ())):
+            if conn not in _seen_connections:
+                _seen_connections.add(conn)
+                _pool_counters["connections_opened"] += 1
+
+
+async def init_http_client(**kwargs) -> httpx.AsyncClient:
+    """Open the shared client. Called once from the app lifespan."""
+    global _shared_client
+    if config.UPSTREAM_BUDGET_PATH and upstream._shared is None:
+        upstream.share(config.UPSTREAM_BUDGET_PATH)
+    if _shared_client is not None and not _shared_client.is_closed:
+        return _shared_client
+    hooks = kwargs.pop("event_hooks", {})
+    hooks.setdefault("response", []).append(_on_response)
+    _shared_client = get_async_client(event_hooks=hooks, **kwargs)
+    logger.info("shared http client opened")
+    return _shared_client
+
+
+async def close_http_client() -> None:
+    """Close the shared client. Called once from the app lifespan on shutdown."""
+    global _shared_client
+    client, _shared_client = _shared_client, None
+    upstream.unshare()
+    if client is not None and not client.is_closed:
+        await client.aclose()
+        logger.info("shared http client closed")
+
+
+def get_shared_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled client.
+    Outside the app lifespan (scripts, tests) it is created lazily.
+    Callers must not close it.
+    """
+    global _shared_client
+    if _shared_client is None or _shared_client.is_closed:
+        hooks = {"response": [_on_response]}
+        _shared_client = get_async_client(event_hooks=hooks)
+    return _shared_client
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Snapshot of shared pool usage: in-use/idle connections and reuse ratio."""
+    in_use = idle = 0
+    http2 = 0
+    client = _shared_client
+    if client is not None and not client.is_closed:
+        for pool in _pools(client):
+            for conn in list(getattr(pool, "connections", ())):
+                if conn.is_idle():
+                    idle += 1
+                elif not conn.is_closed():
+                    in_use += 1
+                if "HTTP/2" in conn.info():
+                    http2 += 1
+    requests = _pool_counters["requests"]
+    opened = _pool_counters["connections_opened"]
+    reuse_ratio = (1.0 - opened / requests) if requests else 0.0
+    return {
+        "open": client is not None and not client.is_closed,
+        "requests": requests,
+        "connections_opened": opened,
+        "in_use": in_use,
+        "idle": idle,
+        "http2_connections": http2,
+        "reuse_ratio": round(max(0.0, reuse_ratio), 4),
+    }
+
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+_priority: ContextVar[int] = ContextVar("upstream_priority", default=PRIORITY_INTERACTIVE)
+
+
+@contextmanager
+def upstream_priority(priority: int) -> Iterator[None]:
+    """Queue upstream calls made in this context (and tasks it starts) at `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class UpstreamUnavailable(Exception):
+    """The upstream can't be called right now (circuit open, throttled, budget wait too long)."""
+
+    def __init__(self, message: str, retry_after: float = 0.0) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open (one trial) -> closed."""
+
+    def __init__(self, threshold: int, reset_seconds: float) -> None:
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_until = 0.0
+        self.opens = 0
+
+    def allow(self, now: float) -> bool:
+        if self.state == "closed":
+            return True
+        if now >= self.opened_until:
+            # One trial request; another one only if it hasn't finished within reset_seconds
+            self.state = "half_open"
+            self.opened_until = now + self.reset_seconds
+            return True
+        return False
+
+    def retry_in(self, now: float) -> float:
+        return max(0.0, self.opened_until - now)
+
+    def success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+
+    def failure(self, now: float, retry_after: float = 0.0) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.threshold:
+            if self.state != "open":
+                self.opens += 1
+            self.state = "open"
+            self.opened_until = now + max(self.reset_seconds, retry_after)
+
+
+_BUDGET = struct.Struct("<8sddd")  # magic, tokens, refill stamp, blocked_until
+_BUDGET_MAGIC = b"BAPXBUD1"
+
+
+class SharedBudgetFile:
+    """Bucket state shared by the workers on one host, read and written under flock.
+
+    Stamps are time.monotonic(), which on Linux is the same clock in every process.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+    def lock(self) -> Optional[Tuple[float, float, float]]:
+        """Take the lock; (tokens, stamp, blocked_until) unless the file is new."""
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        raw = os.pread(self._fd, _BUDGET.size, 0)
+        if len(raw) == _BUDGET.size:
+            magic, tokens, stamp, blocked_until = _BUDGET.unpack(raw)
+            if magic == _BUDGET_MAGIC:
+                return tokens, stamp, blocked_until
+        return None
+
+    def unlock(self, tokens: float, stamp: float, blocked_until: float) -> None:
+        try:
+            os.pwrite(self._fd, _BUDGET.pack(_BUDGET_MAGIC, tokens, stamp, blocked_until), 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class UpstreamGovernor:
+    """Upstream budget: weight token bucket + priority queue + breakers.
+
+    The bucket is per-process unless share() points it at a SharedBudgetFile;
+    the queue and the breakers always stay per-process.
+    """
+
+    def __init__(self, weight_per_minute: Optional[float] = None, burst: Optional[float] = None,
+                 clock=time.monotonic) -> None:
+        self.limit = weight_per_minute or config.UPSTREAM_WEIGHT_PER_MINUTE
+        self.rate = self.limit / 60.0
+        self.capacity = burst or config.UPSTREAM_WEIGHT_BURST
+        self.tokens = self.capacity
+        self._clock = clock
+        self._stamp = clock()
+        self._blocked_until = 0.0
+        self._waiters: List[Tuple[int, int, float, asyncio.Future]] = []  # (priority, seq, weight, fut)
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._shared: Optional[SharedBudgetFile] = None
+        self.counters: Dict[str, int] = {"granted": 0, "queued": 0, "queue_timeouts": 0,
+                                         "throttled": 0, "banned": 0, "retries": 0, "fast_failed": 0}
+
+    # Budget -----------------------------------------------------------------
+    def share(self, path: str) -> None:
+        """Keep the bucket in `path`, shared with every worker that opens it."""
+        self.unshare()
+        try:
+            self._shared = SharedBudgetFile(path)
+        except OSError as e:
+            logger.warning("shared upstream budget disabled, using a per-process one: %s", e)
+
+    def unshare(self) -> None:
+        shared, self._shared = self._shared, None
+        if shared is not None:
+            shared.close()
+
+    @contextmanager
+    def _bucket(self) -> Iterator[None]:
+        """Scope of one bucket update: loads and stores the shared state, if any."""
+        shared = self._shared
+        if shared is None:
+            yield
+            return
+        state = shared.lock()
+        try:
+            if state is not None:
+                self.tokens, self._stamp, self._blocked_until = state
+            yield
+        finally:
+            shared.unlock(self.tokens, self._stamp, self._blocked_until)
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + max(0.0, now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def _pending(self) -> bool:
+        while self._waiters and self._waiters[0][3].done():
+            heapq.heappop(self._waiters)  # cancelled / timed out
+        return bool(self._waiters)
+
+    async def acquire(self, weight: float = 1, priority: Optional[int] = None,
+                      timeout: Optional[float] = None) -> None:
+        """Take `weight` from the budget, queueing behind higher-priority/earlier callers."""
+        weight = min(weight, self.capacity)
+        now = self._clock()
+        with self._bucket():
+            self._refill(now)
+            if not self._pending() and now >= self._blocked_until and self.tokens >= weight:
+                self.tokens -= weight
+                self.counters["granted"] += 1
+                return
+        prio = _priority.get() if priority is None else priority
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (prio, next(self._seq), weight, fut))
+        self.counters["queued"] += 1
+        self._arm()
+        wait = config.UPSTREAM_QUEUE_TIMEOUT_SECONDS if timeout is None else timeout
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), wait)
+        except asyncio.TimeoutError:
+            fut.cancel()
+            self.counters["queue_timeouts"] += 1
+            raise UpstreamUnavailable("upstream budget exhausted", retry_after=self._delay(weight)) from None
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                with self._bucket():
+                    self.tokens += weight  # granted as we were cancelled: give it back
+            fut.cancel()
+            raise
+        self.counters["granted"] += 1
+
+    def _delay(self, weight: float) -> float:
+        now = self._clock()
+        return max(self._blocked_until - now, (weight - self.tokens) / self.rate, 0.0)
+
+    def _arm(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+        if self._pending():
+            delay = self._delay(self._waiters[0][2])
+            self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        now = self._clock()
+        with self._bucket():
+            self._refill(now)
+            while self._pending() and now >= self._blocked_until and self.tokens >= self._waiters[0][2]:
+                _, _, weight, fut = heapq.heappop(self._waiters)
+                self.tokens -= weight
+                fut.set_result(None)
+        self._arm()
+
+    def block(self, seconds: float) -> None:
+        """Pause every upstream call for `seconds` (429/418 Retry-After)."""
+        with self._bucket():
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+        if self._waiters:
+            try:
+                self._arm()
+            except RuntimeError:
+                pass  # no running loop (sync caller); waiters re-arm themselves
+
+    def observe(self, resp: httpx.Response) -> None:
+        """Align the bucket with the upstream's own count when it reports one."""
+        used = resp.headers.get("x-mbx-used-weight-1m")
+        if used is not None and used.isdigit():
+            with self._bucket():
+                self.tokens = min(self.tokens, max(0.0, self.limit - int(used)))
+
+    # Breakers -----------------------------------------------------------------
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        b = self._breakers.get(endpoint)
+        if b is None:
+            b = self._breakers[endpoint] = CircuitBreaker(config.BREAKER_FAILURE_THRESHOLD,
+                                                          config.BREAKER_RESET_SECONDS)
+        return b
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._clock()
+        with self._bucket():
+            self._refill(now)
+        return {
+            "weight_per_minute": self.limit,
+            "shared": self._shared.path if self._shared is not None else None,
+            "tokens": round(self.tokens, 2),
+            "queued_now": sum(1 for w in self._waiters if not w[3].done()),
+            "blocked_for_s": round(max(0.0, self._blocked_until - now), 3),
+            **self.counters,
+            "breakers": {ep: {"state": b.state, "failures": b.failures, "opens": b.opens,
+                              "retry_in_s": round(b.retry_in(now), 3)} for ep, b in self._breakers.items()},
+        }
+
+
+upstream = UpstreamGovernor()
+
+
+def upstream_stats() -> Dict[str, Any]:
+    return upstream.stats()
+
+
+metrics.CallbackMetric("upstream_governor_events_total", "Upstream governor events (granted, queued, "
+                       "throttled, banned, fast_failed, ...).",
+                       lambda: {(k,): v for k, v in upstream.counters.items()}, kind="counter",
+                       labelnames=("event",))
+metrics.CallbackMetric("upstream_breaker_open", "1 while the endpoint's circuit breaker is not closed.",
+                       lambda: {(ep,): int(b.state != "closed") for ep, b in upstream._breakers.items()},
+                       labelnames=("endpoint",))
+
+
+def _retry_after(resp: httpx.Response) -> Optional[float]:
+    """Retry-After in seconds (delta-seconds or HTTP-date), None when absent/invalid."""
+    value = resp.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt: int, base: float, factor: float) -> float:
+    """Equal-jitter exponential backoff: half fixed, half random, capped."""
+    delay = min(config.RETRY_BACKOFF_MAX, base * (factor ** (attempt - 1)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
 async def request_with_retries(client: httpx.AsyncClient, method: str, url: str, *,
                                max_attempts: int = None, backoff_base: float = None,
-                               backoff_factor: float = None, **kwargs) -> httpx.Response:
+                               backoff_factor: float = None, weight: float = 1,
+                               priority: Optional[int] = None, **kwargs) -> httpx.Response:
     attempts = max_attempts or config.RETRY_MAX_ATTEMPTS
     base = backoff_base or config.RETRY_BACKOFF_BASE
     factor = backoff_factor or config.RETRY_BACKOFF_FACTOR
+    gov = upstream
+    endpoint = httpx.URL(url).path
+    breaker = gov.breaker(endpoint)
+    latency = metrics.upstream_request_seconds.labels(endpoint)
+    trace = profiling.current_trace()
+    if trace is not None:
+        kwargs["extensions"] = {**kwargs.get("extensions", {}), "trace": trace.httpcore_trace}
 
     for i in range(1, attempts + 1):
+        now = gov._clock()
+        if not breaker.allow(now):
+            gov.counters["fast_failed"] += 1
+            raise UpstreamUnavailable(f"circuit open for {endpoint}", retry_after=breaker.retry_in(now))
+        with profiling.phase("upstream_queue"):
+            await gov.acquire(weight, priority)
+        retry_after = None
         try:
-            resp = await client.request(method, url, **kwargs)
-            if resp.status_code >= 500:
+            started = time.perf_counter()
+            try:
+                with profiling.phase("upstream_request"):
+                    resp = await client.request(method, url, **kwargs)
+            finally:
+                latency.observe(time.perf_counter() - started)
+            metrics.upstream_responses.labels(endpoint, str(resp.status_code)).inc()
+            gov.observe(resp)
+            if resp.status_code in (429, 418):
+                # 429: over the limit; 418: IP banned for ignoring 429s. Stop everyone.
+                retry_after = _retry_after(resp)
+                pause = retry_after if retry_after is not None else _backoff(i, base, factor)
+                gov.block(pause)
+                breaker.failure(gov._clock(), pause)
+                gov.counters["banned" if resp.status_code == 418 else "throttled"] += 1
+                if resp.status_code == 418 or i == attempts or pause > config.RETRY_AFTER_MAX_SECONDS:
+                    logger.error("upstream %s: %s %s (retry after %.1fs)", resp.status_code, method, url, pause)
+                    raise UpstreamUnavailable(f"upstream returned {resp.status_code}", retry_after=pause)
+            elif resp.status_code >= 500:
                 raise httpx.HTTPStatusError("server error", request=resp.request, response=resp)
-            return resp
+            else:
+                breaker.success()
+                return resp
         except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            breaker.failure(gov._clock())
+            if isinstance(e, httpx.TransportError):
+                metrics.upstream_responses.labels(endpoint, "error").inc()
+            else:
+                retry_after = _retry_after(e.response)
             if i == attempts:
                 logger.error("HTTP failed after %s attempts: %s %s", i, method, url)
                 raise
-            delay = base * (factor ** (i - 1))
-            await asyncio.sleep(delay)
+        gov.counters["retries"] += 1
+        metrics.upstream_retries.labels(endpoint).inc()
+        with profiling.phase("retry_wait"):
+            await asyncio.sleep(max(retry_after or 0.0, _backoff(i, base, factor)))
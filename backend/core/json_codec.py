@@ -0,0 +1,145 @@
+"""
+JSON decoding/encoding with optional fast backends.
+
+JSON_BACKEND=auto picks msgspec, then orjson, then the stdlib json module
+(msgspec and orjson are optional; nothing here requires them).
+
+- decode_list() extracts only the named fields of each object in a JSON array
+  (optionally under an envelope key) and hands them to a factory, so callers
+  keep compact records instead of one dict per upstream object. With msgspec
+  the unused fields are skipped by the decoder and never become Python objects.
+- dumps() writes compact UTF-8 bytes; Decimal is encoded as its string form,
+  the same as pydantic's JSON output for Decimal fields (no float rounding).
+"""
+import json
+import logging
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from starlette.responses import JSONResponse
+
+from backend.config import config
+
+logger = logging.getLogger("app.json")
+
+Factory = Callable[..., Any]
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+def _extract(obj: Any, fields: Sequence[str], factory: Factory, key: Optional[str]) -> Optional[List[Any]]:
+    items = obj.get(key) if key is not None and isinstance(obj, dict) else obj
+    if not isinstance(items, list):
+        return None
+    return [factory(*map(item.get, fields)) for item in items if isinstance(item, dict)]
+
+
+class StdlibCodec:
+    name = "json"
+
+    @staticmethod
+    def loads(data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+    @staticmethod
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, default=_default, ensure_ascii=False, allow_nan=False,
+                          separators=(",", ":")).encode("utf-8")
+
+    def decode_list(self, data: Union[bytes, str], fields: Sequence[str], factory: Factory,
+                    key: Optional[str] = None) -> Optional[List[Any]]:
+        return _extract(self.loads(data), fields, factory, key)
+
+
+class OrjsonCodec(StdlibCodec):
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson
+        self.loads = orjson.loads
+        option = orjson.OPT_NON_STR_KEYS
+        self.dumps = lambda obj: orjson.dumps(obj, default=_default, option=option)
+
+
+class MsgspecCodec(StdlibCodec):
+    """Typed decoding: one Struct type per field set, unknown fields skipped."""
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        import msgspec
+        self._msgspec = msgspec
+        self._decode = msgspec.json.decode
+        self.dumps = msgspec.json.Encoder(enc_hook=_default, decimal_format="string").encode
+        self._decoders: Dict[Tuple[Tuple[str, ...], Optional[str]], Any] = {}
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        try:
+            return self._decode(data)
+        except self._msgspec.DecodeError as e:
+            raise ValueError(str(e)) from None  # same contract as json/orjson
+
+    def _decoder(self, fields: Tuple[str, ...], key: Optional[str]) -> Any:
+        dec = self._decoders.get((fields, key))
+        if dec is None:
+            ms = self._msgspec
+            item = ms.defstruct("Item", [(f, Any, None) for f in fields])
+            target: Any = List[item]
+            if key is not None:
+                target = ms.defstruct("Envelope", [(key, Optional[target], None)])
+            dec = self._decoders[(fields, key)] = ms.json.Decoder(target)
+        return dec
+
+    def decode_list(self, data: Union[bytes, str], fields: Sequence[str], factory: Factory,
+                    key: Optional[str] = None) -> Optional[List[Any]]:
+        fields = tuple(fields)
+        try:
+            decoded = self._decoder(fields, key).decode(data)
+        except self._msgspec.ValidationError:
+            # Some other shape (non-object items, a bare array instead of an envelope, ...)
+            return _extract(self.loads(data), fields, factory, key)
+        except self._msgspec.DecodeError as e:
+            raise ValueError(str(e)) from None
+        items = getattr(decoded, key) if key is not None else decoded
+        if items is None:
+            return None
+        astuple = self._msgspec.structs.astuple
+        return [factory(*astuple(item)) for item in items]
+
+
+_CODECS = {"msgspec": MsgspecCodec, "orjson": OrjsonCodec, "json": StdlibCodec}
+
+
+def get_codec(name: str = "auto") -> StdlibCodec:
+    """Codec by backend name; 'auto' takes the fastest one installed."""
+    names = ("msgspec", "orjson", "json") if name == "auto" else (name,)
+    for n in names:
+        try:
+            return _CODECS[n]()
+        except ImportError:
+            if name != "auto":
+                logger.warning("JSON_BACKEND=%s but it is not installed; using the json module", n)
+        except KeyError:
+            raise ValueError(f"unknown JSON backend: {name!r}") from None
+    return StdlibCodec()
+
+
+codec = get_codec(config.JSON_BACKEND)
+BACKEND = codec.name
+loads = codec.loads
+dumps = codec.dumps
+decode_list = codec.decode_list
+
+
+def dumps_str(obj: Any) -> str:
+    return dumps(obj).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the selected backend (Decimal -> string)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,22 +1,123 @@
+"""
+Logging setup: handlers on the event loop only put records on a bounded
+queue; a listener thread formats and writes them, so a slow stdout never
+blocks request handling. When the queue is full, records are dropped and
+counted rather than waited for.
+
+LOG_FORMAT=json writes one JSON object per line. Context passed as
+extra={"fields": {...}} becomes top-level keys of the object.
+"""
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
 import sys
-from typing import Optional
+import time
+from typing import Any, Dict, Optional, TextIO
 
 from backend.config import config
+from backend.core import metrics
+from backend.core.json_codec import dumps_str
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """ts, level, logger, msg, the record's `fields` and exc (formatted traceback)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out: Dict[str, Any] = dict(getattr(record, "fields", None) or ())
+        out["ts"] = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + ".%03dZ" % record.msecs
+        out["level"] = record.levelname
+        out["logger"] = record.name
+        out["msg"] = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        if record.stack_info:
+            out["stack"] = self.formatStack(record.stack_info)
+        try:
+            return dumps_str(out)
+        except (TypeError, ValueError):
+            return json.dumps(out, default=str, ensure_ascii=False)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Merges the message in the caller's thread and leaves the rest (tracebacks,
+    JSON) to the listener; drops the record when the queue is full."""
+
+    def __init__(self, q: "queue.Queue") -> None:
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # args may be mutated after the call returns; the traceback objects may not
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
 
 
-def setup_logging(level: Optional[str] = None) -> None:
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)  # waits for room: the listener is still draining
+
+
+_handler: Optional[NonBlockingQueueHandler] = None
+_listener: Optional[_Listener] = None
+
+
+def setup_logging(level: Optional[str] = None, stream: Optional[TextIO] = None) -> None:
+    global _handler, _listener
     lvl = getattr(logging, (level or config.LOG_LEVEL).upper(), logging.INFO)
+    stop_logging()
+    out = logging.StreamHandler(stream or sys.stdout)
+    out.setFormatter(JsonFormatter() if config.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    _handler = NonBlockingQueueHandler(queue.Queue(config.LOG_QUEUE_SIZE))
+    _listener = _Listener(_handler.queue, out)
+    _listener.start()
     # Root logger
-    logging.basicConfig(
-        level=lvl,
-        format='%(asctime)s %(levelname)s [%(name)s] %(message)s',
-        stream=sys.stdout,
-    )
+    root = logging.getLogger()
+    root.setLevel(lvl)
+    root.addHandler(_handler)
     # Tweak uvicorn loggers if present
     for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
         logger = logging.getLogger(name)
         logger.setLevel(lvl)
 
 
+def stop_logging() -> None:
+    """Detach the queue handler and write out whatever is still queued."""
+    global _handler, _listener
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+    if _listener is not None:
+        _listener.stop()
+    _handler = _listener = None
+
+
+def logging_stats() -> Dict[str, Any]:
+    if _handler is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "format": config.LOG_FORMAT,
+        "queue_size": _handler.queue.maxsize,
+        "queued": _handler.queue.qsize(),
+        "dropped": _handler.dropped,
+        "access_sample_rate": config.LOG_ACCESS_SAMPLE_RATE,
+    }
+
+
+metrics.CallbackMetric("log_records_dropped_total", "Log records dropped because the log queue was full.",
+                       lambda: _handler.dropped if _handler is not None else 0, kind="counter")
+atexit.register(stop_logging)
+
 logger = logging.getLogger("app")
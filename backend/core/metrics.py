@@ -0,0 +1,280 @@
+"""
+Prometheus text-format metrics for GET /metrics, without a client library.
+
+Instruments are module-level and their label children are created on first
+use; after that a hot path only does a dict lookup and integer/float adds on
+preallocated lists (Histogram.observe is one bisect into fixed bucket bounds).
+Updates happen on the event loop thread, so nothing takes a lock; a scrape
+may see a histogram between its bucket and sum updates, which Prometheus
+tolerates. Values already counted elsewhere (price cache, rate limiter,
+upstream governor) are read by callbacks at scrape time instead of twice.
+
+METRICS_ENABLED=false makes every instrument a no-op and removes /metrics.
+"""
+import asyncio
+import logging
+import math
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from backend.config import config
+
+logger = logging.getLogger("app.metrics")
+
+ENABLED = config.METRICS_ENABLED
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+
+CallbackValue = Union[float, Dict[Tuple[str, ...], float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _NoopChild:
+    __slots__ = ()
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def observe(self, value: float) -> None:
+        pass
+
+
+_NOOP = _NoopChild()
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class _Family:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        if not labelnames:
+            self._default = self.labels()
+        REGISTRY.register(self)
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: str) -> Any:
+        if not ENABLED:
+            return _NOOP
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for values, child in list(self._children.items()):
+            yield from self._render_child(values, child)
+
+    def _render_child(self, values: Tuple[str, ...], child: Any) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self._default.inc(amount)
+
+    def _render_child(self, values, child):
+        yield f"{self.name}{_labels(self.labelnames, values)} {_num(child.value)}"
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def _render_child(self, values, child):
+        total = 0
+        for bound, count in zip(self.buckets + (math.inf,), child.counts):
+            total += count
+            le = 'le="%s"' % _num(bound)
+            yield f"{self.name}_bucket{_labels(self.labelnames, values, le)} {total}"
+        yield f"{self.name}_sum{_labels(self.labelnames, values)} {_num(child.sum)}"
+        yield f"{self.name}_count{_labels(self.labelnames, values)} {total}"
+
+
+class CallbackMetric:
+    """Gauge or counter whose value(s) are computed at scrape time.
+    `fn` returns a number, or {label values tuple: number} when labelnames are given."""
+
+    def __init__(self, name: str, help: str, fn: Callable[[], CallbackValue],
+                 kind: str = "gauge", labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._fn = fn
+        REGISTRY.register(self)
+
+    def render(self) -> Iterable[str]:
+        try:
+            value = self._fn()
+        except Exception as e:  # a broken callback must not break the scrape
+            logger.warning("metric %s failed: %s", self.name, e)
+            return
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for values, v in items:
+            yield f"{self.name}{_labels(self.labelnames, values)} {_num(v)}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Any] = {}
+
+    def register(self, metric: Any) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"duplicate metric {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def unregister(self, name: str) -> None:
+        self._metrics.pop(name, None)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# Instruments shared across modules ------------------------------------------
+
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "Request latency by route template.", ("route",))
+http_requests = Counter("http_requests_total", "Responses by route template and status.", ("route", "status"))
+upstream_request_seconds = Histogram(
+    "upstream_request_duration_seconds", "Binance REST call latency by endpoint.", ("endpoint",))
+upstream_responses = Counter("upstream_responses_total", "Binance REST outcomes by endpoint "
+                             "(HTTP status, or error for transport failures).", ("endpoint", "status"))
+upstream_retries = Counter("upstream_retries_total", "Binance REST retries by endpoint.", ("endpoint",))
+aggregate_seconds = Histogram(
+    "price_aggregate_duration_seconds", "Time to aggregate a trade window into last/avg/vwap.",
+    ("path",), buckets=FAST_BUCKETS)
+alerts = Counter("alerts_total", "Errors reported through alerts.alert_error.")
+loop_lag_seconds = Histogram(
+    "event_loop_lag_seconds", "How late a periodic event loop callback ran.", buckets=LATENCY_BUCKETS)
+
+
+class RequestMetrics:
+    """Request latency/status per route template. The template string is the one
+    held by the route itself and the children are cached by it, so recording a
+    request allocates nothing; unmatched paths share one series."""
+
+    def __init__(self) -> None:
+        self._routes: Dict[Optional[str], Tuple[Any, Dict[int, Any], str]] = {}
+
+    def record(self, route: Any, status: int, seconds: float) -> None:
+        path = getattr(route, "path", None)
+        entry = self._routes.get(path)
+        if entry is None:
+            template = path or "<unmatched>"
+            entry = self._routes[path] = (http_request_seconds.labels(template), {}, template)
+        latency, statuses, template = entry
+        latency.observe(seconds)
+        counter = statuses.get(status)
+        if counter is None:
+            counter = statuses[status] = http_requests.labels(template, str(status))
+        counter.inc()
+
+
+class LoopLagMonitor:
+    """Sleeps METRICS_LOOP_LAG_INTERVAL in a loop and records how late it wakes up."""
+
+    def __init__(self, interval: Optional[float] = None) -> None:
+        self.interval = interval or config.METRICS_LOOP_LAG_INTERVAL
+        self.last = 0.0
+        self.max = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.last = lag
+            self.max = max(self.max, lag)
+            loop_lag_seconds.observe(lag)
+
+    async def start(self) -> None:
+        if ENABLED and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+loop_lag = LoopLagMonitor()
+CallbackMetric("event_loop_lag_last_seconds", "Most recent event loop lag sample.", lambda: loop_lag.last)
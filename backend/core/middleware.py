@@ -1,76 +1,206 @@
+"""
+Pure ASGI middlewares (no BaseHTTPMiddleware): they wrap `send` instead of
+buffering the response through an extra task, so short JSON endpoints pay
+only a function call per hop.
+"""
 import time
 import uuid
 import logging
-from collections import deque, defaultdict
-from typing import Callable, Deque, Dict, Tuple
+from random import random
+from typing import Any, Dict, Optional
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.datastructures import MutableHeaders
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from backend.config import config
+from backend.core import metrics, profiling
+from backend.core.rate_limit import RateLimiter, RateRule, client_ip, parse_networks, retry_after_header
 
 logger = logging.getLogger("app.request")
 
+# The active limiter, for the stats endpoint
+_rate_limiter: Optional[RateLimiter] = None
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """Logs method, path, status, duration. Injects X-Request-ID if missing."""
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        req_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
+def set_rate_limiter(limiter: RateLimiter) -> None:
+    global _rate_limiter
+    _rate_limiter = limiter
+
+
+def rate_limit_stats() -> Dict[str, Any]:
+    return _rate_limiter.stats() if _rate_limiter is not None else {"enabled": False}
+
+
+metrics.CallbackMetric("rate_limit_rejected_total", "Requests rejected with 429 by the rate limiter.",
+                       lambda: _rate_limiter.rejected if _rate_limiter is not None else 0, kind="counter")
+
+
+def rate_limit_rule(request: Request) -> Optional[RateRule]:
+    """The rule RateLimitMiddleware applies to this request (None without the middleware)."""
+    return request.scope.get("state", {}).get("rate_limit_rule")
+
+
+async def charge_up_front(request: Request, cost: int) -> None:
+    """Charge a batch's cost (units beyond the one already taken) before doing the work.
+
+    Raises a 400 HTTPException when the cost exceeds the route's whole limit (no
+    wait would let it through), and a 429 when the units don't fit right now, so
+    an over-budget batch never fans out upstream. No-op without RateLimitMiddleware.
+    """
+    state = request.scope.setdefault("state", {})
+    charge = state.get("rate_limit_charge")
+    if charge is None or cost <= 1:
+        return
+    rule = state["rate_limit_rule"]
+    if cost - 1 + rule.cost > rule.limit:
+        raise HTTPException(status_code=400, detail=f"batch costs {cost} rate limit units, this route allows "
+                                                    f"{rule.limit} per {rule.window:g}s (RATE_LIMIT_ROUTES)")
+    decision = await charge(cost - 1)
+    if not decision.allowed:
+        headers = {
+            "Retry-After": retry_after_header(decision),
+            "X-RateLimit-Limit": str(decision.limit),
+            "X-RateLimit-Remaining": "0",
+        }
+        raise HTTPException(status_code=429, detail="Too Many Requests", headers=headers)
+    state["rate_limit_decision"] = decision
+
+
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class RequestLoggingMiddleware:
+    """Logs method, path, status, duration. Injects X-Request-ID if missing.
+    Also records the per-route latency histogram behind /metrics.
+
+    Successful, fast requests are logged at LOG_ACCESS_SAMPLE_RATE; 5xx and
+    requests slower than LOG_ACCESS_SLOW_MS always are.
+    With SLOW_REQUEST_THRESHOLD_MS set, each request runs under a RequestTrace and
+    slow ones are kept with their phase breakdown (profiling.slow_requests)."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.metrics = metrics.RequestMetrics() if metrics.ENABLED else None
+        self.sample_rate = config.LOG_ACCESS_SAMPLE_RATE
+        self.slow_ms = config.LOG_ACCESS_SLOW_MS
+        self.slow_requests = profiling.slow_requests if profiling.slow_requests.enabled else None
+
+    def _should_log(self, status: Optional[int], duration_ms: float) -> bool:
+        if not logger.isEnabledFor(logging.INFO):
+            return False
+        if status is None or status >= 500 or duration_ms >= self.slow_ms:
+            return True
+        return self.sample_rate >= 1 or random() < self.sample_rate
+
+    def _capture(self, scope: Scope, status: Optional[int], duration_ms: float, req_id: str, token) -> None:
+        trace = profiling.current_trace()
+        profiling.end_trace(token)
+        if duration_ms < self.slow_requests.threshold_ms or trace is None:
+            return
+        route = scope.get("route")
+        self.slow_requests.add({
+            "ts": int(time.time() * 1000),
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": getattr(route, "path", None),
+            "status": status,
+            "duration_ms": round(duration_ms, 3),
+            "request_id": req_id,
+            "phases": trace.breakdown(),
+        })
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        req_id = _header(scope, b"x-request-id") or str(uuid.uuid4())
+        status = [None]
+        token = profiling.start_trace() if self.slow_requests is not None else None
         start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                # Propagate request id
+                MutableHeaders(scope=message).setdefault("X-Request-ID", req_id)
+            with profiling.phase("send"):
+                await send(message)
+
         try:
-            response: Response = await call_next(request)
-        except Exception:
-            # Unhandled exceptions will be logged by error handler
-            raise
+            await self.app(scope, receive, send_wrapper)
         finally:
-            duration_ms = (time.perf_counter() - start) * 1000.0
-            logger.info(
-                "%s %s -> %sms",
-                request.method,
-                request.url.path,
-                f"{duration_ms:.2f}",
-            )
-        # Propagate request id
-        response.headers.setdefault("X-Request-ID", req_id)
-        return response
-
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Simple sliding window limiter per (ip, path)."""
-
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
-        self.window = config.RATE_LIMIT_WINDOW_SECONDS
-        self.limit = config.RATE_LIMIT_MAX_REQUESTS
-        self.buckets: Dict[Tuple[str, str], Deque[float]] = defaultdict(deque)
-
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        key = (self._client_ip(request), request.url.path)
-        now = time.monotonic()
-        q = self.buckets[key]
-        # Drop expired
-        cutoff = now - self.window
-        while q and q[0] < cutoff:
-            q.popleft()
-        if len(q) >= self.limit:
+            # Unhandled exceptions are logged by the error handler
+            elapsed = time.perf_counter() - start
+            if self.metrics is not None:
+                self.metrics.record(scope.get("route"), status[0] or 500, elapsed)
+            duration_ms = elapsed * 1000.0
+            if token is not None:
+                self._capture(scope, status[0], duration_ms, req_id, token)
+            if self._should_log(status[0], duration_ms):
+                logger.info(
+                    "%s %s %s -> %sms",
+                    scope["method"],
+                    scope["path"],
+                    status[0] or "-",
+                    f"{duration_ms:.2f}",
+                    extra={"fields": {"method": scope["method"], "path": scope["path"], "status": status[0],
+                                      "duration_ms": round(duration_ms, 2), "request_id": req_id}},
+                )
+
+
+class RateLimitMiddleware:
+    """GCRA limiter per (client ip, path) with per-route limits and costs."""
+
+    def __init__(self, app: ASGIApp, limiter: Optional[RateLimiter] = None) -> None:
+        self.app = app
+        self.limiter = limiter or RateLimiter()
+        self.trusted_proxies = parse_networks(config.RATE_LIMIT_TRUSTED_PROXIES)
+        set_rate_limiter(self.limiter)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        client = self._client_ip(scope)
+        path = scope["path"]
+        decision = await self.limiter.acquire(client, path)
+        if not decision.allowed:
             headers = {
-                "Retry-After": str(int(self.window)),
-                "X-RateLimit-Limit": str(self.limit),
+                "Retry-After": retry_after_header(decision),
+                "X-RateLimit-Limit": str(decision.limit),
                 "X-RateLimit-Remaining": "0",
             }
-            return Response("Too Many Requests", status_code=429, headers=headers)
-        q.append(now)
-        remaining = max(0, self.limit - len(q))
-        response: Response = await call_next(request)
-        response.headers.setdefault("X-RateLimit-Limit", str(self.limit))
-        response.headers.setdefault("X-RateLimit-Remaining", str(remaining))
-        return response
-
-    @staticmethod
-    def _client_ip(request: Request) -> str:
-        xff = request.headers.get("x-forwarded-for")
-        if xff:
-            return xff.split(",")[0].strip()
-        return request.client.host if request.client else "-"
+            await PlainTextResponse("Too Many Requests", status_code=429, headers=headers)(scope, receive, send)
+            return
+        state = scope.setdefault("state", {})
+        state["rate_limit_rule"] = self.limiter.rule_for(path)
+        state["rate_limit_charge"] = lambda cost: self.limiter.acquire(client, path, cost)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal decision
+            if message["type"] == "http.response.start":
+                if "rate_limit_decision" in state:
+                    decision = state["rate_limit_decision"]  # charged up front (charge_up_front)
+                else:
+                    # Endpoints may set request.state.rate_limit_cost instead; charge the extra units now
+                    extra = state.get("rate_limit_cost", 1) - 1
+                    if extra > 0:
+                        decision = await self.limiter.charge(client, path, extra)
+                headers = MutableHeaders(scope=message)
+                headers.setdefault("X-RateLimit-Limit", str(decision.limit))
+                headers.setdefault("X-RateLimit-Remaining", str(decision.remaining))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _client_ip(self, scope: Scope) -> str:
+        peer = scope["client"][0] if scope.get("client") else None
+        forwarded = _header(scope, b"x-forwarded-for") if self.trusted_proxies else None
+        return client_ip(peer, forwarded, self.trusted_proxies)
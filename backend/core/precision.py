@@ -1,15 +1,16 @@
 """
 Decimal helpers with ROUND_HALF_UP and fixed 8-decimal quantization by default.
 """
-from decimal import Decimal, getcontext, localcontext
-from typing import Union
+from decimal import Decimal, getcontext
+from typing import Dict, Optional, Union
 
 from backend.config import config
 
 Number = Union[int, float, str, Decimal]
 
 # Use a reasonably high precision for intermediate math
-getcontext().prec = 36
+INTERMEDIATE_PREC = 36
+getcontext().prec = INTERMEDIATE_PREC
 
 
 def to_decimal(val: Number) -> Decimal:
@@ -17,16 +18,24 @@ def to_decimal(val: Number) -> Decimal:
     return val if isinstance(val, Decimal) else Decimal(str(val))
 
 
+# Quantizer per number of places, built once (quantize runs on every response)
+_QUANTIZERS: Dict[int, Decimal] = {}
+
+
+def quantizer(places: Optional[int] = None) -> Decimal:
+    p = config.DECIMAL_PLACES if places is None else places
+    q = _QUANTIZERS.get(p)
+    if q is None:
+        q = _QUANTIZERS[p] = Decimal('1e-' + str(p))
+    return q
+
+
 def quantize(val: Number, places: int = None) -> Decimal:
     """Quantize to fixed decimal places using ROUND_HALF_UP.
     Only round at the boundary to keep intermediate precision.
     """
-    d = to_decimal(val)
-    p = config.DECIMAL_PLACES if places is None else places
-    q = Decimal('1e-' + str(p))
-    with localcontext() as ctx:
-        ctx.rounding = config.ROUNDING_MODE
-        return d.quantize(q, rounding=config.ROUNDING_MODE)
+    # The rounding mode is passed explicitly; precision and traps come from the current context
+    return to_decimal(val).quantize(quantizer(places), rounding=config.ROUNDING_MODE)
 
 
 round_price = quantize  # alias for clarity
@@ -0,0 +1,176 @@
+"""
+Opt-in profiling surface.
+
+- SamplingProfiler: a thread that snapshots the stacks of other threads every
+  few milliseconds for a fixed duration and returns them in collapsed-stack
+  format ("thread;module:func;... count" lines, the input of flamegraph.pl and
+  speedscope). Nothing runs between profiles.
+- Request traces: with SLOW_REQUEST_THRESHOLD_MS > 0 the request middleware
+  opens a RequestTrace per request, and code on the request path times its
+  phases with `with phase("name"):`. Requests slower than the threshold are
+  kept, with their phase breakdown, in a bounded ring (slow_requests). Without
+  an open trace, phase() returns a shared no-op context manager.
+
+Phases can nest (connect happens inside upstream_request), so their times
+don't add up to the request's duration.
+"""
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import nullcontext
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Iterable, List, Optional
+
+from backend.config import config
+
+_NULL = nullcontext()
+_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("request_trace", default=None)
+# httpcore trace events timed as the "connect" phase
+_CONNECT_EVENTS = ("connection.connect_tcp", "connection.connect_unix_socket", "connection.start_tls")
+
+
+class _Phase:
+    __slots__ = ("times", "name", "started")
+
+    def __init__(self, times: Dict[str, List[float]], name: str) -> None:
+        self.times = times
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        entry = self.times.get(self.name)
+        if entry is None:
+            entry = self.times[self.name] = [0.0, 0]
+        entry[0] += time.perf_counter() - self.started
+        entry[1] += 1
+
+
+class RequestTrace:
+    """Seconds and count per phase of one request."""
+    __slots__ = ("times", "_connecting")
+
+    def __init__(self) -> None:
+        self.times: Dict[str, List[float]] = {}
+        self._connecting: Dict[str, float] = {}
+
+    def phase(self, name: str) -> _Phase:
+        return _Phase(self.times, name)
+
+    async def httpcore_trace(self, event: str, info: Dict[str, Any]) -> None:
+        """httpx `trace` extension callback: times connection setup."""
+        name, _, stage = event.rpartition(".")
+        if name not in _CONNECT_EVENTS:
+            return
+        if stage == "started":
+            self._connecting[name] = time.perf_counter()
+        else:
+            started = self._connecting.pop(name, None)
+            if started is not None:
+                entry = self.times.setdefault("connect", [0.0, 0])
+                entry[0] += time.perf_counter() - started
+                entry[1] += 1
+
+    def breakdown(self) -> Dict[str, Dict[str, Any]]:
+        return {name: {"ms": round(s * 1000, 3), "count": n} for name, (s, n) in self.times.items()}
+
+
+def phase(name: str):
+    """Context manager timing `name` in the current request's trace (no-op without one)."""
+    trace = _trace.get()
+    return trace.phase(name) if trace is not None else _NULL
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _trace.get()
+
+
+def start_trace() -> Token:
+    return _trace.set(RequestTrace())
+
+
+def end_trace(token: Token) -> None:
+    _trace.reset(token)
+
+
+class SlowRequestLog:
+    """Newest `size` requests slower than the threshold, with their phase breakdown."""
+
+    def __init__(self, threshold_ms: Optional[float] = None, size: Optional[int] = None) -> None:
+        self.threshold_ms = config.SLOW_REQUEST_THRESHOLD_MS if threshold_ms is None else threshold_ms
+        self._ring: deque = deque(maxlen=size or config.SLOW_REQUEST_RING_SIZE)
+        self.captured = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        self._ring.append(entry)
+        self.captured += 1
+
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        items = list(self._ring)
+        items.reverse()
+        return items[:limit]
+
+    def clear(self) -> None:
+        self._ring.clear()
+
+
+slow_requests = SlowRequestLog()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}"
+
+
+class SamplingProfiler:
+    """Samples stacks of other threads from a thread of its own; one profile at a time."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.samples = 0
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def run(self, seconds: float, interval: float, thread_ids: Optional[Iterable[int]] = None) -> Counter:
+        """Blocking: sample for `seconds`, every `interval` seconds. Call from a worker thread."""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("a profile is already running")
+        try:
+            wanted = set(thread_ids) if thread_ids is not None else None
+            me = threading.get_ident()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            stacks: Counter = Counter()
+            self.samples = 0
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                for tid, frame in sys._current_frames().items():
+                    if tid == me or (wanted is not None and tid not in wanted):
+                        continue
+                    labels = []
+                    while frame is not None:
+                        labels.append(_frame_label(frame))
+                        frame = frame.f_back
+                    labels.append(names.get(tid) or str(tid))
+                    labels.reverse()
+                    stacks[";".join(labels)] += 1
+                self.samples += 1
+                time.sleep(interval)
+            return stacks
+        finally:
+            self._lock.release()
+
+
+def collapsed(stacks: Counter) -> str:
+    """Collapsed-stack text: one "frame;frame;... count" line per distinct stack."""
+    return "".join(f"{stack} {n}\n" for stack, n in sorted(stacks.items()))
+
+
+profiler = SamplingProfiler()
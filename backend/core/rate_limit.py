@@ -0,0 +1,217 @@
+"""
+GCRA (generic cell rate algorithm) rate limiting.
+
+A rule allows `limit` units per `window` seconds. Each key stores one float,
+its theoretical arrival time (TAT), so state is O(1) per key regardless of the
+limit. A request of cost c is allowed when
+    max(TAT, now) + c * T - now <= window,    T = window / limit
+and then moves TAT forward by c * T.
+
+Stores:
+- MemoryRateLimitStore: per-process, LRU-capped, idle keys swept incrementally.
+- RedisRateLimitStore: optional (needs the `redis` package); the GCRA update is
+  one Lua script, so limits hold across uvicorn workers and hosts.
+"""
+import ipaddress
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from backend.config import config
+
+
+class RateRule(NamedTuple):
+    limit: int
+    window: float
+    cost: int = 1
+
+    @property
+    def interval(self) -> float:
+        return self.window / self.limit
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+
+
+def gcra(tat: Optional[float], now: float, rule: RateRule, cost: int, force: bool = False) -> Tuple[Decision, Optional[float]]:
+    """Pure GCRA step: returns (decision, new_tat). new_tat is None when rejected."""
+    t = rule.interval
+    base = now if tat is None or tat < now else tat
+    new_tat = base + cost * t
+    over = new_tat - now - rule.window
+    if over > 1e-9 and not force:
+        remaining = max(0, int((rule.window - (base - now)) / t + 1e-9))
+        return Decision(False, rule.limit, remaining, over), None
+    remaining = max(0, int((rule.window - (new_tat - now)) / t + 1e-9))
+    return Decision(True, rule.limit, remaining, 0.0), new_tat
+
+
+class MemoryRateLimitStore:
+    """Key -> TAT in an OrderedDict kept in last-touched order (LRU)."""
+
+    def __init__(self, max_keys: Optional[int] = None, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_keys = max_keys or config.RATE_LIMIT_MAX_KEYS
+        self._clock = clock
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self.evicted = 0
+        self.swept = 0
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    def _sweep(self, now: float, budget: int = 8) -> None:
+        # Least recently touched keys come first; a key whose TAT has passed is
+        # back at full capacity and carries no state worth keeping.
+        tats = self._tats
+        while budget and tats:
+            key, tat = next(iter(tats.items()))
+            if tat > now:
+                break
+            del tats[key]
+            self.swept += 1
+            budget -= 1
+
+    async def acquire(self, key: str, rule: RateRule, cost: int, force: bool = False) -> Decision:
+        now = self._clock()
+        self._sweep(now)
+        decision, new_tat = gcra(self._tats.get(key), now, rule, cost, force)
+        if new_tat is not None:
+            self._tats[key] = new_tat
+            self._tats.move_to_end(key)
+            if len(self._tats) > self.max_keys:
+                self._tats.popitem(last=False)
+                self.evicted += 1
+        return decision
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "keys": len(self._tats), "max_keys": self.max_keys,
+                "evicted": self.evicted, "swept": self.swept}
+
+
+# KEYS[1]=key ARGV: interval, window, cost, force. Returns {allowed, remaining, retry_after_ms}
+_GCRA_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local force = ARGV[4] == '1'
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + cost * interval
+local over = new_tat - now - window
+if over > 0.000000001 and not force then
+  return {0, math.floor((window - (tat - now)) / interval + 0.000000001), math.ceil(over * 1000)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000) + 1)
+return {1, math.floor((window - (new_tat - now)) / interval + 0.000000001), 0}
+"""
+
+
+class RedisRateLimitStore:
+    """Shared store for multi-worker deployments. Keys expire on their own at TAT."""
+
+    def __init__(self, client: Any, prefix: str = "rl:") -> None:
+        self._client = client
+        self._prefix = prefix
+        self._script = client.register_script(_GCRA_LUA)
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisRateLimitStore":
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from e
+        return cls(redis_asyncio.from_url(url))
+
+    async def acquire(self, key: str, rule: RateRule, cost: int, force: bool = False) -> Decision:
+        allowed, remaining, retry_ms = await self._script(
+            keys=[self._prefix + key],
+            args=[rule.interval, rule.window, cost, "1" if force else "0"],
+        )
+        return Decision(bool(allowed), rule.limit, max(0, int(remaining)), int(retry_ms) / 1000.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis"}
+
+
+def parse_route_rules(spec: str) -> Dict[str, RateRule]:
+    """'/api/alpha/prices=120/60:1,/api/alpha/stream=30/60' -> {path: RateRule}"""
+    rules: Dict[str, RateRule] = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        path, _, rest = part.partition("=")
+        rate, _, cost = rest.partition(":")
+        limit, _, window = rate.partition("/")
+        rules[path.strip()] = RateRule(int(limit), float(window or config.RATE_LIMIT_WINDOW_SECONDS), int(cost or 1))
+    return rules
+
+
+def parse_networks(spec: str) -> List[Any]:
+    return [ipaddress.ip_network(p.strip(), strict=False) for p in spec.split(",") if p.strip()]
+
+
+def client_ip(peer: Optional[str], forwarded_for: Optional[str], trusted: List[Any]) -> str:
+    """Client address; X-Forwarded-For is only honored when the peer is a trusted proxy.
+    The chain is walked right to left and the first untrusted hop wins.
+    """
+    if not peer:
+        return "-"
+    if not forwarded_for or not trusted or not _is_trusted(peer, trusted):
+        return peer
+    hops = [h.strip() for h in forwarded_for.split(",") if h.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop, trusted):
+            return hop
+    return hops[0] if hops else peer
+
+
+def _is_trusted(addr: str, trusted: List[Any]) -> bool:
+    try:
+        ip = ipaddress.ip_address(addr)
+    except ValueError:
+        return False
+    return any(ip in net for net in trusted)
+
+
+class RateLimiter:
+    def __init__(self, store: Any = None, default: Optional[RateRule] = None,
+                 routes: Optional[Dict[str, RateRule]] = None) -> None:
+        self.store = store if store is not None else _default_store()
+        self.default = default or RateRule(config.RATE_LIMIT_MAX_REQUESTS, float(config.RATE_LIMIT_WINDOW_SECONDS))
+        self.routes = parse_route_rules(config.RATE_LIMIT_ROUTES) if routes is None else routes
+        self.rejected = 0
+
+    def rule_for(self, path: str) -> RateRule:
+        return self.routes.get(path, self.default)
+
+    async def acquire(self, client: str, path: str, cost: Optional[int] = None) -> Decision:
+        rule = self.rule_for(path)
+        decision = await self.store.acquire(f"{client}|{path}", rule, rule.cost if cost is None else cost)
+        if not decision.allowed:
+            self.rejected += 1
+        return decision
+
+    async def charge(self, client: str, path: str, cost: int) -> Decision:
+        """Charge extra units after the fact (e.g. a batch's per-symbol cost); never rejects."""
+        rule = self.rule_for(path)
+        return await self.store.acquire(f"{client}|{path}", rule, cost, force=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.store.stats(), "rejected": self.rejected,
+                "default": self.default._asdict(),
+                "routes": {p: r._asdict() for p, r in self.routes.items()}}
+
+
+def _default_store():
+    if config.RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimitStore.from_url(config.RATE_LIMIT_REDIS_URL)
+    return MemoryRateLimitStore()
+
+
+def retry_after_header(decision: Decision) -> str:
+    return str(max(1, math.ceil(decision.retry_after)))
@@ -1,18 +1,60 @@
 import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend.core.logging import setup_logging
 from backend.core.middleware import RequestLoggingMiddleware, RateLimitMiddleware
 from backend.core.error_handling import install_exception_handlers
+from backend.core.http_client import init_http_client, close_http_client
+from backend.core.json_codec import FastJSONResponse
+from backend.core.metrics import ENABLED as METRICS_ENABLED, loop_lag
+from backend.config import config
+from backend.services.alpha_price_service import prefetcher, shared_prices
+from backend.services.alpha_token_service import token_registry
+from backend.services.binance_ws_client import start_stream_client, stop_stream_client
+from backend.services.price_broadcaster import broadcaster
+from backend.services.trade_store import start_trade_store, stop_trade_store
+from backend.api.admin_routes import router as admin_router
 from backend.api.alpha_routes import router as alpha_router
 from backend.api.calc_routes import router as calc_router
+from backend.api.metrics_routes import router as metrics_router
+from backend.api.stats_routes import router as stats_router
 
 
 setup_logging()
 logger = logging.getLogger("app.main")
 
-app = FastAPI(title="Binance Alpha Tool API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if (config.PROFILING_ENABLED or config.SLOW_REQUEST_THRESHOLD_MS > 0) and not config.ADMIN_TOKEN:
+        logger.warning("profiling / slow request capture is on but ADMIN_TOKEN is empty: /api/admin/* answers 403")
+    await init_http_client()
+    await loop_lag.start()
+    await token_registry.start()
+    await start_trade_store()
+    stream = await start_stream_client()
+    if stream is not None:
+        for sym in filter(None, (s.strip() for s in config.WS_SYMBOLS.split(","))):
+            await stream.subscribe(sym)
+    await shared_prices.start()
+    await prefetcher.start()
+    try:
+        yield
+    finally:
+        await prefetcher.stop()
+        await shared_prices.stop()
+        await broadcaster.close()
+        await stop_stream_client()
+        await stop_trade_store()
+        await token_registry.stop()
+        await close_http_client()
+        await loop_lag.stop()
+
+
+app = FastAPI(title="Binance Alpha Tool API", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Middlewares
 app.add_middleware(RequestLoggingMiddleware)
@@ -33,6 +75,10 @@ install_exception_handlers(app)
 # Routers
 app.include_router(alpha_router)
 app.include_router(calc_router)
+app.include_router(stats_router)
+app.include_router(admin_router)
+if METRICS_ENABLED:
+    app.include_router(metrics_router)
 
 
 @app.get("/health")
@@ -2,16 +2,46 @@
 Service for Alpha token price snapshot.
 Fetches recent agg trades and computes last, average and vwap prices.
 """
-from typing import Dict, List, Any
+import asyncio
+import logging
+import time
+from operator import mul
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timezone
 from decimal import Decimal
 
-from backend.services.binance_client import fetch_agg_trades, parse_price_qty
-from backend.services.symbol_mapping import resolve_symbol
+from backend.config import config
+from backend.services.binance_client import (
+    AggTrade, SymbolNotFound, agg_trade_poller, fetch_agg_trades, parse_price_qty, parse_price_qty_columns,
+)
+from backend.services.binance_ws_client import get_live_metrics
+from backend.services.candle_rollup import candle_rollups
+from backend.services.prefetch_scheduler import PrefetchScheduler
+from backend.services.shared_price_cache import SharedPriceCache
+from backend.services.trade_buffer import fixed_metrics, trade_buffers
+from backend.services.trade_store import record_trades
+from backend.services.symbol_mapping import resolve_symbol, symbol_index
+from backend.core import metrics, profiling
+from backend.core.cache import SingleFlight, TTLCache
+from backend.core.http_client import PRIORITY_BACKGROUND, UpstreamUnavailable, upstream_priority
+from backend.core.fixed_point import fits_precision
 from backend.core.precision import quantize, to_decimal
 
+logger = logging.getLogger("app.alpha_price")
 
-def _aggregate_prices(trades: List[Dict[str, Any]]) -> Dict[str, Decimal]:
+# Short-TTL snapshot cache + single-flight per resolved symbol, so N tabs polling
+# the same token cost one upstream request per TTL window.
+_price_cache = TTLCache(config.PRICE_CACHE_TTL_SECONDS, config.PRICE_CACHE_MAX_ENTRIES)
+_inflight = SingleFlight()
+# Last good snapshot per symbol, served while the upstream is unavailable (circuit open, throttled)
+_last_good = TTLCache(config.PRICE_STALE_MAX_SECONDS, config.PRICE_CACHE_MAX_ENTRIES)
+_cache_stats: Dict[str, int] = {"hits": 0, "misses": 0, "coalesced": 0, "stream": 0, "shared": 0, "stale": 0}
+_aggregate_full = metrics.aggregate_seconds.labels("full")
+_aggregate_incremental = metrics.aggregate_seconds.labels("window")
+
+
+def _aggregate_prices_decimal(trades: List[AggTrade]) -> Dict[str, Decimal]:
+    """Reference aggregation in Decimal; the fixed-point path must match it exactly."""
     if not trades:
         raise ValueError("No trades available for aggregation")
     # last price: last trade's price
@@ -35,12 +65,48 @@ def _aggregate_prices(trades: List[Dict[str, Any]]) -> Dict[str, Decimal]:
     }
 
 
-async def fetch_alpha_price(alpha_id: str) -> Dict:
-    symbol = resolve_symbol(alpha_id)
-    if not symbol:
-        raise ValueError("Unable to resolve symbol from alphaId")
-    trades = await fetch_agg_trades(symbol)
-    metrics = _aggregate_prices(trades)
+def _aggregate_prices(trades: List[AggTrade]) -> Dict[str, Decimal]:
+    started = time.perf_counter()
+    try:
+        return _aggregate_prices_fixed(trades)
+    finally:
+        _aggregate_full.observe(time.perf_counter() - started)
+
+
+def _aggregate_prices_fixed(trades: List[AggTrade]) -> Dict[str, Decimal]:
+    if not trades:
+        raise ValueError("No trades available for aggregation")
+    columns = parse_price_qty_columns(trades)
+    if columns is None:
+        return _aggregate_prices_decimal(trades)
+    (prices, p_scale), (qtys, q_scale) = columns
+    # Exact integer sums; Decimal only for the final divisions
+    sum_p, sum_pq, sum_q = sum(prices), sum(map(mul, prices, qtys)), sum(qtys)
+    if not (fits_precision(sum_p) and fits_precision(sum_pq) and fits_precision(sum_q)):
+        return _aggregate_prices_decimal(trades)  # the Decimal sums would have rounded
+    return fixed_metrics(prices[-1], p_scale, len(prices), sum_p, sum_pq, sum_q, q_scale)
+
+
+def _aggregate_window(symbol: str, trades: List[AggTrade]) -> Dict[str, Decimal]:
+    """Merge a REST window into the symbol's trade buffer and read its O(1) metrics.
+    Polls overlap heavily, so only trades not seen before get parsed; an
+    incremental poll with nothing new leaves the held window as it is.
+    """
+    if not trades:
+        buf = trade_buffers.get(symbol)
+        if buf is not None and len(buf):
+            return buf.metrics()
+        raise ValueError("No trades available for aggregation")
+    if any(t.agg_id is None for t in trades):
+        return _aggregate_prices(trades)  # no ids to key the window by
+    started = time.perf_counter()
+    try:
+        return trade_buffers.ingest(symbol, trades).metrics()
+    finally:
+        _aggregate_incremental.observe(time.perf_counter() - started)
+
+
+def _snapshot(symbol: str, metrics: Dict[str, Decimal]) -> Dict:
     ts = int(datetime.now(tz=timezone.utc).timestamp() * 1000)
     return {
         "symbol": symbol,
@@ -49,3 +115,136 @@ async def fetch_alpha_price(alpha_id: str) -> Dict:
         "price_vwap": metrics["vwap"],
         "timestamp": ts,
     }
+
+
+async def _fetch_upstream(symbol: str) -> Dict:
+    buf = trade_buffers.get(symbol)
+    try:
+        trades = await agg_trade_poller.poll(symbol, buf.last_id if buf is not None else None, fetch_agg_trades)
+    except SymbolNotFound:
+        symbol_index.not_found(symbol)  # only on the upstream's explicit unknown-symbol answer
+        raise
+    if trades is None:
+        # No data without saying why: transient, so no negative entry (stale data may still be served)
+        raise UpstreamUnavailable(f"no agg-trades data for {symbol}", retry_after=1.0)
+    record_trades(symbol, trades)
+    candle_rollups.ingest(symbol, trades)
+    with profiling.phase("aggregate"):
+        snap = _snapshot(symbol, _aggregate_window(symbol, trades))
+    _price_cache.set(symbol, snap)
+    _last_good.set(symbol, snap)
+    shared_prices.publish(snap)
+    return snap
+
+
+async def _prefetch(symbol: str) -> None:
+    try:
+        symbol_index.check(symbol)
+    except SymbolNotFound:
+        return  # the upstream said so recently
+    if shared_prices.following:
+        shared_prices.store.want(symbol)  # the writer worker keeps it fresh
+        return
+    with upstream_priority(PRIORITY_BACKGROUND):
+        await _inflight.do(symbol, lambda: _fetch_upstream(symbol))
+
+
+async def _shared_refresh(symbol: str) -> None:
+    await _inflight.do(symbol, lambda: _fetch_upstream(symbol))
+
+
+def _data_age(symbol: str) -> Optional[float]:
+    """Age of what a request would be served right now (None: it would go upstream)."""
+    if get_live_metrics(symbol) is not None:
+        return 0.0
+    cached = _price_cache.get(symbol)
+    return cached[1] if cached is not None else None
+
+
+# Keeps the most requested symbols refreshed ahead of their cache expiry
+prefetcher = PrefetchScheduler(_prefetch, _data_age)
+# Cross-worker snapshots (SHARED_CACHE_ENABLED); started by the app lifespan
+shared_prices = SharedPriceCache(_shared_refresh)
+
+
+async def fetch_alpha_price_with_source(alpha_id: str) -> Tuple[Dict, str, float]:
+    """Return (snapshot, source, age_seconds).
+    source is one of: stream, hit (TTL cache), coalesced (joined an in-flight fetch), miss,
+    shared (published by the writer worker), stale (last good snapshot while the upstream
+    is unavailable).
+    """
+    symbol = resolve_symbol(alpha_id)
+    if not symbol:
+        raise ValueError("Unable to resolve symbol from alphaId")
+    symbol_index.check(symbol)
+    prefetcher.touch(symbol)
+    # Prefer the live stream window; REST only when no subscription is live
+    metrics = get_live_metrics(symbol)
+    if metrics is not None:
+        _cache_stats["stream"] += 1
+        return _snapshot(symbol, metrics), "stream", 0.0
+    cached = _price_cache.get(symbol)
+    if cached is not None:
+        _cache_stats["hits"] += 1
+        return cached[0], "hit", cached[1]
+    remote = shared_prices.get(symbol)
+    if remote is None and shared_prices.following:
+        remote = await shared_prices.wait(symbol)  # falls back to our own fetch on timeout
+    if remote is not None:
+        _cache_stats["shared"] += 1
+        return remote[0], "shared", remote[1]
+    try:
+        snap, shared = await _inflight.do(symbol, lambda: _fetch_upstream(symbol))
+    except UpstreamUnavailable:
+        # Followers have no last good snapshot of their own: the writer's is in the shared slot
+        stale = _last_good.get(symbol) or shared_prices.stale(symbol)
+        if stale is None:
+            raise
+        _cache_stats["stale"] += 1
+        return stale[0], "stale", stale[1]
+    _cache_stats["coalesced" if shared else "misses"] += 1
+    return snap, ("coalesced" if shared else "miss"), 0.0
+
+
+async def fetch_alpha_price(alpha_id: str) -> Dict:
+    snap, _, _ = await fetch_alpha_price_with_source(alpha_id)
+    return snap
+
+
+async def fetch_alpha_prices(alpha_ids: List[str]) -> List[Dict[str, Any]]:
+    """Batch snapshot fetch with bounded upstream fan-out.
+    Each item carries either data or its own error, so one bad id doesn't fail the batch.
+    """
+    sem = asyncio.Semaphore(config.PRICE_BATCH_CONCURRENCY)
+
+    async def one(alpha_id: str) -> Dict[str, Any]:
+        async with sem:
+            try:
+                snap, source, age = await fetch_alpha_price_with_source(alpha_id)
+            except ValueError as e:
+                return {"alphaId": alpha_id, "ok": False, "error": str(e)}
+            except Exception as e:
+                logger.warning("batch price failed for %s: %s", alpha_id, e)
+                return {"alphaId": alpha_id, "ok": False, "error": f"upstream error: {e.__class__.__name__}"}
+        return {"alphaId": alpha_id, "ok": True, "data": snap, "source": source, "age_ms": int(age * 1000)}
+
+    return list(await asyncio.gather(*(one(a) for a in alpha_ids)))
+
+
+def price_cache_stats() -> Dict[str, Any]:
+    lookups = _cache_stats["hits"] + _cache_stats["misses"] + _cache_stats["coalesced"]
+    return {
+        **_cache_stats,
+        "hit_ratio": round((_cache_stats["hits"] + _cache_stats["coalesced"]) / lookups, 4) if lookups else 0.0,
+        "entries": len(_price_cache),
+        "evictions": _price_cache.evictions,
+        "in_flight": len(_inflight),
+        "ttl_seconds": _price_cache.ttl,
+    }
+
+
+metrics.CallbackMetric("price_cache_lookups_total", "Price snapshot lookups by result.",
+                       lambda: {(k,): v for k, v in _cache_stats.items()}, kind="counter",
+                       labelnames=("result",))
+metrics.CallbackMetric("price_cache_hit_ratio", "(hits + coalesced) / (hits + coalesced + misses).",
+                       lambda: price_cache_stats()["hit_ratio"])
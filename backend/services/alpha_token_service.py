@@ -5,21 +5,44 @@ Strategy:
 - If config.ALPHA_TOKENS_API is set, fetch from there.
 - Else, try to load local backend/data/alpha_tokens.json (keys: alphaId -> symbol).
 - Else, return empty list.
+
+The list is loaded into the shared token_registry once and refreshed in the
+background; request paths read the registry snapshot instead of the source.
 """
 import json
 import os
 import logging
-from typing import List, Dict
+from typing import Any, Dict, List, Optional
 from urllib.parse import urlparse
 
 from backend.config import config
-from backend.core.http_client import get_async_client, request_with_retries
+from backend.core.http_client import get_shared_client, request_with_retries
+from backend.core.json_codec import decode_list, loads
+from backend.services.token_registry import AlphaToken, RemoteTokenList, TokenRegistry, TokenSnapshot
+from backend.services import token_search
 
 DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "alpha_tokens.json")
 logger = logging.getLogger("app.alpha_tokens")
 
+# Fields read from each upstream token object (the list carries dozens more)
+_TOKEN_FIELDS = ("symbol", "baseSymbol", "name", "alphaId", "id")
+
+
+def _token_from_fields(symbol: Any, base_symbol: Any, name: Any, alpha_id: Any, id_: Any) -> Optional[AlphaToken]:
+    symbol = symbol or base_symbol or name
+    alpha_id = alpha_id or id_ or symbol
+    if not (symbol and alpha_id):
+        return None
+    return AlphaToken(str(symbol), str(alpha_id), str(name) if name else None)
+
 
-async def fetch_alpha_tokens() -> List[Dict[str, str]]:
+def _tokens_from_mapping(mapping: Dict[Any, Any]) -> List[AlphaToken]:
+    return [AlphaToken(str(v), str(k)) for k, v in mapping.items()]
+
+
+async def load_alpha_tokens(raise_on_error: bool = False) -> List[AlphaToken]:
+    """Load the token list from its source. With raise_on_error, a failing remote
+    source raises instead of falling back (used by registry refreshes)."""
     # 1) External API if provided
     if config.ALPHA_TOKENS_API:
         src = config.ALPHA_TOKENS_API.strip()
@@ -27,31 +50,26 @@ async def fetch_alpha_tokens() -> List[Dict[str, str]]:
         parsed = urlparse(src)
         if parsed.scheme in ("http", "https"):
             try:
-                async with get_async_client() as client:
-                    resp = await request_with_retries(client, "GET", src)
-                    resp.raise_for_status()
-                    raw = resp.json()
+                client = get_shared_client()
+                resp = await request_with_retries(client, "GET", src)
+                resp.raise_for_status()
+                body = resp.content
+                # Array or wrapped object like { data: [...] }: only the used fields are decoded
+                tokens = decode_list(body, _TOKEN_FIELDS, _token_from_fields, key="data")
+                raw = loads(body) if tokens is None else None
             except Exception as e:
                 logger.error("alpha tokens fetch failed from %s: %s", src, e)
-                raw = None
+                if raise_on_error:
+                    raise
+                tokens = raw = None
+            if tokens is not None:
+                return RemoteTokenList(t for t in tokens if t is not None)
             if raw is not None:
-                # Accept array or wrapped object like { data: [...] } or mapping { alphaId: symbol }
+                # Mapping { alphaId: symbol }, possibly under data
                 data = raw.get("data") if isinstance(raw, dict) and "data" in raw else raw
-                out: List[Dict[str, str]] = []
-                if isinstance(data, list):
-                    for item in data:
-                        if not isinstance(item, dict):
-                            continue
-                        symbol = item.get("symbol") or item.get("baseSymbol") or item.get("name")
-                        alpha_id = item.get("alphaId") or item.get("id") or symbol
-                        if symbol and alpha_id:
-                            out.append({"symbol": str(symbol), "alphaId": str(alpha_id)})
-                    return out
                 if isinstance(data, dict):
-                    for k, v in data.items():
-                        out.append({"symbol": str(v), "alphaId": str(k)})
-                    return out
-                return out
+                    return RemoteTokenList(_tokens_from_mapping(data))
+                return RemoteTokenList()
         else:
             # 2) If src is a path, try to read local JSON file
             path = os.path.expanduser(src)
@@ -60,13 +78,13 @@ async def fetch_alpha_tokens() -> List[Dict[str, str]]:
                     with open(path, "r", encoding="utf-8") as f:
                         raw = json.load(f)
                     if isinstance(raw, list):
-                        out: List[Dict[str, str]] = []
+                        out: List[AlphaToken] = []
                         for item in raw:
                             if isinstance(item, dict) and "symbol" in item and ("alphaId" in item or "id" in item):
-                                out.append({"symbol": str(item["symbol"]), "alphaId": str(item.get("alphaId") or item.get("id"))})
+                                out.append(AlphaToken(str(item["symbol"]), str(item.get("alphaId") or item.get("id"))))
                         return out
                     if isinstance(raw, dict):
-                        return [{"symbol": str(v), "alphaId": str(k)} for k, v in raw.items()]
+                        return _tokens_from_mapping(raw)
                 except Exception as e:
                     logger.error("alpha tokens load from file failed %s: %s", path, e)
 
@@ -75,7 +93,24 @@ async def fetch_alpha_tokens() -> List[Dict[str, str]]:
     if os.path.exists(path):
         with open(path, "r", encoding="utf-8") as f:
             raw = json.load(f)
-        return [{"symbol": v, "alphaId": k} for k, v in raw.items()]
+        return _tokens_from_mapping(raw)
 
     # 3) Empty list
     return []
+
+
+token_registry = TokenRegistry(load_alpha_tokens, DATA_FILE)
+token_registry.add_listener(token_search.on_snapshot)
+
+
+async def get_token_snapshot() -> TokenSnapshot:
+    return await token_registry.get_snapshot()
+
+
+async def fetch_alpha_tokens() -> List[AlphaToken]:
+    return (await token_registry.get_snapshot()).tokens
+
+
+async def search_alpha_tokens(query: str, limit: int = 20, offset: int = 0) -> Dict:
+    snap = await token_registry.get_snapshot()
+    return token_search.get_index(snap.tokens, snap.version).search(query, limit=limit, offset=offset)
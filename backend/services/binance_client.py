@@ -1,29 +1,432 @@
 """
 Thin client for Binance REST API.
+
+Aggregate trades are decoded straight into AggTrade records holding only the
+fields the service reads; the rest of each upstream object is never kept.
+Trades held in bulk go into TradeColumns (parallel 8-byte int arrays).
+Repeated polls of a symbol go through AggTradePoller, which only asks for
+trades newer than the last one it saw.
 """
-from typing import Any, Dict, List, Optional
+import math
+import re
+import time
+from array import array
+from collections import OrderedDict
+from operator import attrgetter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
 from decimal import Decimal
 
+import httpx
+
 from backend.config import config
-from backend.core.http_client import get_async_client, request_with_retries
+from backend.core import profiling
+from backend.core.fixed_point import parse_fixed, parse_fixed_column, pow10
+from backend.core.http_client import get_shared_client, request_with_retries
+from backend.core.json_codec import decode_list, loads
+
+_price_of = attrgetter("price")
+_qty_of = attrgetter("qty")
+_INT64_MAX = 2 ** 63 - 1
+
+# array('q'), or a list of Python ints once a value outgrew 64 bits
+IntColumn = Union["array[int]", List[int]]
+
+# Upstream keys: a (aggregate trade id), p (price), q (qty), T (trade time, ms)
+AGG_TRADE_FIELDS = ("a", "p", "q", "T")
+
+
+class AggTrade:
+    """One aggregate trade. Price and qty stay the upstream strings (parsed in batches later)."""
+
+    __slots__ = ("agg_id", "price", "qty", "time")
+
+    def __init__(self, agg_id: Any, price: Any = "0", qty: Any = "0", time: Any = None) -> None:
+        self.agg_id = agg_id
+        self.price = "0" if price is None else price
+        self.qty = "0" if qty is None else qty
+        self.time = time
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "AggTrade":
+        """From an upstream object (REST item or WS aggTrade event)."""
+        return cls(d.get("a"), d.get("p"), d.get("q"), d.get("T"))
+
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not AggTrade:
+            return NotImplemented
+        return (self.agg_id, self.price, self.qty, self.time) == (other.agg_id, other.price, other.qty, other.time)
+
+    def __repr__(self) -> str:
+        return f"AggTrade(agg_id={self.agg_id!r}, price={self.price!r}, qty={self.qty!r}, time={self.time!r})"
+
+
+class SymbolNotFound(ValueError):
+    """The upstream doesn't know the trading symbol (or it is rejected locally as unknown)."""
+
+
+# The upstream's explicit "no such symbol" answers: Binance's -1121 code, or a message saying so
+_UNKNOWN_SYMBOL_CODES = {-1121, "-1121"}
+_UNKNOWN_SYMBOL_MESSAGE = re.compile(r"(invalid|unknown) symbol|symbol\b.*\b(not exist|not found|does not exist)", re.I)
+
 
+def unknown_symbol_answer(body: bytes) -> bool:
+    """True only when an error body names the symbol as unknown (not for other 4xx or empty data)."""
+    try:
+        raw = loads(body)
+    except Exception:
+        return False
+    if not isinstance(raw, dict):
+        return False
+    if raw.get("code") in _UNKNOWN_SYMBOL_CODES:
+        return True
+    message = raw.get("msg") or raw.get("message") or raw.get("messageDetail")
+    return isinstance(message, str) and _UNKNOWN_SYMBOL_MESSAGE.search(message) is not None
 
-async def fetch_agg_trades(symbol: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-    """Fetch recent aggregate trades from Binance.
-    Returns list of dicts with keys: p (price), q (qty), T (timestamp), etc.
+
+def decode_agg_trades(body: bytes) -> Optional[List[AggTrade]]:
+    """Records from an agg-trades response body ({"data": [...]}); None when data is missing."""
+    return decode_list(body, AGG_TRADE_FIELDS, AggTrade, key="data")
+
+
+async def fetch_agg_trades(symbol: str, limit: Optional[int] = None,
+                           from_id: Optional[int] = None) -> Optional[List[AggTrade]]:
+    """Fetch recent aggregate trades from Binance as AggTrade records (oldest first).
+    When from_id is given, returns trades with aggregate id >= from_id (gap backfill).
+    Raises SymbolNotFound only on the upstream's explicit unknown-symbol answer;
+    other 4xx (a rejected fromId or limit) raise httpx.HTTPStatusError. None when
+    a successful response carries no data.
     """
     lim = limit or config.DEFAULT_TRADES_LIMIT
     url = f"{config.BINANCE_REST_BASE}/bapi/defi/v1/public/alpha-trade/agg-trades"
     params = {"symbol": symbol, "limit": lim}
-    async with get_async_client() as client:
-        resp = await request_with_retries(client, "GET", url, params=params)
-        resp.raise_for_status()
-        return resp.json().get("data")
+    if from_id is not None:
+        params["fromId"] = from_id
+    client = get_shared_client()
+    resp = await request_with_retries(client, "GET", url, params=params)
+    if resp.status_code >= 400 and unknown_symbol_answer(resp.content):
+        raise SymbolNotFound(f"Unknown symbol: {symbol}")
+    resp.raise_for_status()
+    agg_trade_poller.record_bytes(symbol, len(resp.content))
+    with profiling.phase("decode"):
+        trades = decode_agg_trades(resp.content)
+    if trades is None and unknown_symbol_answer(resp.content):
+        raise SymbolNotFound(f"Unknown symbol: {symbol}")
+    return trades
 
 
-def parse_price_qty(trade: Dict[str, Any]) -> (Decimal, Decimal):
-    # price is under 'p', qty under 'q'
-    p = Decimal(str(trade.get("p", "0")))
-    q = Decimal(str(trade.get("q", "0")))
+def parse_price_qty(trade: AggTrade) -> (Decimal, Decimal):
+    p = Decimal(str(trade.price))
+    q = Decimal(str(trade.qty))
     return p, q
 
+
+def parse_price_qty_fixed(trade: AggTrade) -> Tuple[int, int, int, int]:
+    """(price, price_scale, qty, qty_scale) as scaled ints, straight from the JSON strings."""
+    p, ps = parse_fixed(trade.price)
+    q, qs = parse_fixed(trade.qty)
+    return p, ps, q, qs
+
+
+def parse_price_qty_columns(trades: List[AggTrade]):
+    """((prices, scale), (qtys, scale)) when every trade has plain price/qty strings of one
+    scale each (the usual upstream format), else None."""
+    prices = parse_fixed_column(list(map(_price_of, trades)))
+    qtys = parse_fixed_column(list(map(_qty_of, trades)))
+    if prices is None or qtys is None:
+        return None
+    return prices, qtys
+
+
+def trade_time(trade: AggTrade) -> int:
+    """Trade time in ms as stored in TradeColumns (0 when missing or invalid)."""
+    try:
+        t = int(trade.time)
+    except (TypeError, ValueError):
+        return 0
+    return t if 0 <= t <= _INT64_MAX else 0
+
+
+def _scaled(col: IntColumn, factor: int) -> IntColumn:
+    if factor == 1:
+        return col
+    values = [v * factor for v in col]
+    try:
+        return array("q", values)
+    except OverflowError:
+        return values
+
+
+def _align(values: List[int], scales: List[int], scale: int) -> List[int]:
+    if all(s == scale for s in scales):
+        return values
+    return [v * pow10(scale - s) for v, s in zip(values, scales)]
+
+
+class TradeColumns:
+    """Struct-of-arrays trades: agg id, time (ms), price and qty as parallel columns
+    of 8-byte ints (32 bytes per trade), price/qty scaled by 10**price_scale and
+    10**qty_scale. A price or qty column becomes a list of Python ints if a value
+    outgrows 64 bits, so values are never truncated."""
+
+    __slots__ = ("agg_ids", "times", "prices", "qtys", "price_scale", "qty_scale")
+
+    def __init__(self) -> None:
+        self.agg_ids: "array[int]" = array("q")
+        self.times: "array[int]" = array("q")
+        self.prices: IntColumn = array("q")
+        self.qtys: IntColumn = array("q")
+        self.price_scale = 0
+        self.qty_scale = 0
+
+    def __len__(self) -> int:
+        return len(self.agg_ids)
+
+    @classmethod
+    def from_trades(cls, trades: List[AggTrade]) -> "TradeColumns":
+        cols = cls()
+        cols.extend(trades)
+        return cols
+
+    def rescale(self, price_scale: int, qty_scale: int) -> None:
+        """Widen the scales (rare: a trade with more decimals than any before)."""
+        self.prices = _scaled(self.prices, pow10(price_scale - self.price_scale))
+        self.qtys = _scaled(self.qtys, pow10(qty_scale - self.qty_scale))
+        self.price_scale, self.qty_scale = price_scale, qty_scale
+
+    def parse(self, trades: List[AggTrade]) -> Tuple[List[int], List[int]]:
+        """Prices and qtys of trades at this store's scales (widened first if needed)."""
+        columns = parse_price_qty_columns(trades)
+        if columns is not None:
+            (prices, ps), (qtys, qs) = columns
+            p_scales = q_scales = None
+        else:
+            parsed = [parse_price_qty_fixed(t) for t in trades]
+            prices, qtys = [x[0] for x in parsed], [x[2] for x in parsed]
+            p_scales, q_scales = [x[1] for x in parsed], [x[3] for x in parsed]
+            ps, qs = max(p_scales), max(q_scales)
+        if ps > self.price_scale or qs > self.qty_scale:
+            self.rescale(max(ps, self.price_scale), max(qs, self.qty_scale))
+        return (_align(prices, p_scales or [ps] * len(prices), self.price_scale),
+                _align(qtys, q_scales or [qs] * len(qtys), self.qty_scale))
+
+    def append(self, agg_id: int, time: int, price: int, qty: int) -> None:
+        self.agg_ids.append(agg_id)
+        self.times.append(time)
+        try:
+            self.prices.append(price)
+        except OverflowError:
+            self.prices = list(self.prices)
+            self.prices.append(price)
+        try:
+            self.qtys.append(qty)
+        except OverflowError:
+            self.qtys = list(self.qtys)
+            self.qtys.append(qty)
+
+    def insert(self, i: int, agg_id: int, time: int, price: int, qty: int) -> None:
+        self.agg_ids.insert(i, agg_id)
+        self.times.insert(i, time)
+        try:
+            self.prices.insert(i, price)
+        except OverflowError:
+            self.prices = list(self.prices)
+            self.prices.insert(i, price)
+        try:
+            self.qtys.insert(i, qty)
+        except OverflowError:
+            self.qtys = list(self.qtys)
+            self.qtys.insert(i, qty)
+
+    def extend(self, trades: List[AggTrade]) -> None:
+        """Append trades in the given order. Every trade needs an integer agg id."""
+        if not trades:
+            return
+        ids = array("q", [int(t.agg_id) for t in trades])  # validated before anything is stored
+        prices, qtys = self.parse(trades)
+        self.agg_ids.extend(ids)
+        self.times.extend(map(trade_time, trades))
+        for name, values in (("prices", prices), ("qtys", qtys)):
+            col = getattr(self, name)
+            n = len(col)
+            try:
+                col.extend(values)
+            except OverflowError:
+                # array.extend keeps the values before the one that failed
+                setattr(self, name, list(col[:n]) + values)
+
+    def drop_front(self, n: int) -> None:
+        """Forget the n oldest rows."""
+        del self.agg_ids[:n], self.times[:n], self.prices[:n], self.qtys[:n]
+
+    def trades(self, start: int = 0) -> Iterable[Tuple[int, int, int, int]]:
+        """(agg_id, time, price, qty) rows from `start`."""
+        return zip(self.agg_ids[start:], self.times[start:], self.prices[start:], self.qtys[start:])
+
+
+Fetch = Callable[..., Awaitable[Optional[List[AggTrade]]]]
+
+_RATE_ALPHA = 0.3  # EWMA weight of the newest trades/s sample
+_HEADROOM = 2.0  # limit = expected new trades x this, so a burst rarely fills the page
+_POLL_COUNTERS = ("requests", "incremental", "full", "gap_fallbacks", "rejected", "bytes", "trades", "duplicates")
+
+
+def _agg_id(trade: AggTrade) -> Optional[int]:
+    try:
+        return int(trade.agg_id)
+    except (TypeError, ValueError):
+        return None
+
+
+class _SymbolPoll:
+    """Cursor (newest agg id/time seen) and fetch counters of one symbol."""
+    __slots__ = ("last_id", "last_time", "polled_at", "rate", "limit") + _POLL_COUNTERS
+
+    def __init__(self) -> None:
+        self.last_id: Optional[int] = None
+        self.last_time = 0
+        self.polled_at = 0.0
+        self.rate = 0.0  # new trades/s
+        self.limit = 0
+        for name in _POLL_COUNTERS:
+            setattr(self, name, 0)
+
+
+class AggTradePoller:
+    """Latest agg-trade window per symbol, downloading only what is new.
+
+    While the caller still holds the window ending at the cursor, a poll asks
+    for fromId=cursor+1 with a limit of the trades expected since the last poll
+    (trade rate x elapsed, with headroom; at least min_limit). A full page means
+    trades may be missing between the two, so the latest window is fetched
+    instead, as it is with no cursor (first poll, restart, LRU eviction), a
+    different held window, an idle cursor, an expected count of a window or
+    more, or a 4xx answer to the incremental request.
+    """
+
+    def __init__(self, window: Optional[int] = None, min_limit: Optional[int] = None,
+                 idle_seconds: Optional[float] = None, max_symbols: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.window = window or config.DEFAULT_TRADES_LIMIT
+        self.min_limit = min(min_limit or config.AGG_TRADES_MIN_LIMIT, self.window)
+        self.idle_seconds = idle_seconds if idle_seconds is not None else config.AGG_TRADES_CURSOR_IDLE_SECONDS
+        self.max_symbols = max_symbols or config.TRADE_BUFFER_MAX_SYMBOLS
+        self.enabled = config.AGG_TRADES_INCREMENTAL
+        self._clock = clock
+        self._symbols: "OrderedDict[str, _SymbolPoll]" = OrderedDict()
+        self._totals = dict.fromkeys(_POLL_COUNTERS, 0)
+
+    def _entry(self, symbol: str) -> _SymbolPoll:
+        st = self._symbols.get(symbol)
+        if st is None:
+            st = self._symbols[symbol] = _SymbolPoll()
+            while len(self._symbols) > self.max_symbols:
+                self._symbols.popitem(last=False)
+        else:
+            self._symbols.move_to_end(symbol)
+        return st
+
+    def _count(self, st: _SymbolPoll, name: str, n: int = 1) -> None:
+        setattr(st, name, getattr(st, name) + n)
+        self._totals[name] += n
+
+    def record_bytes(self, symbol: str, n: int) -> None:
+        self._count(self._entry(symbol), "bytes", n)
+
+    def next_limit(self, symbol: str, held_last_id: Optional[int]) -> int:
+        """Limit of the next poll; the window size means a full fetch."""
+        st = self._symbols.get(symbol)
+        if not self.enabled or st is None or st.last_id is None or held_last_id != st.last_id:
+            return self.window
+        elapsed = self._clock() - st.polled_at
+        if elapsed > self.idle_seconds:
+            return self.window
+        expected = st.rate * max(elapsed, 0.0) * _HEADROOM
+        return max(self.min_limit, min(self.window, math.ceil(expected) + 1))
+
+    async def poll(self, symbol: str, held_last_id: Optional[int],
+                   fetch: Optional[Fetch] = None) -> Optional[List[AggTrade]]:
+        """Trades to merge into a window ending at held_last_id (None: none held).
+        Incremental polls return only trades newer than it, possibly none; full
+        polls return the latest window as fetch_agg_trades does.
+        """
+        fetch = fetch or fetch_agg_trades
+        limit = self.next_limit(symbol, held_last_id)
+        st = self._entry(symbol)
+        now = self._clock()
+        after = held_last_id if held_last_id == st.last_id else None
+        truncated = rejected = False
+        if limit < self.window:
+            self._count(st, "requests")
+            self._count(st, "incremental")
+            try:
+                trades = await fetch(symbol, limit, from_id=st.last_id + 1)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code >= 500:
+                    raise
+                self._count(st, "rejected")  # the upstream refused fromId/limit: fetch the window instead
+                rejected = True
+            else:
+                truncated = trades is not None and len(trades) >= limit
+        if limit >= self.window or truncated or rejected:
+            if truncated:
+                self._count(st, "gap_fallbacks")  # the trades between page and window were not returned
+            self._count(st, "requests")
+            self._count(st, "full")
+            trades = await fetch(symbol, self.window)
+        st.limit = limit
+        if trades is None:
+            return None
+        self._count(st, "trades", len(trades))
+        ids = [_agg_id(t) for t in trades]
+        fresh = len(trades)
+        if after is not None and None not in ids:
+            fresh = sum(i > after for i in ids)
+            self._count(st, "duplicates", len(trades) - fresh)
+        self._advance(st, trades, ids, fresh, now, truncated)
+        return trades
+
+    def _advance(self, st: _SymbolPoll, trades: List[AggTrade], ids: List[Optional[int]], fresh: int,
+                 now: float, truncated: bool) -> None:
+        if not trades or None in ids:
+            if None in ids:
+                st.last_id = None  # nothing to resume from
+            st.polled_at = now
+            return
+        if st.last_id is None:
+            # Prior rate from the window's own time span
+            span = (trade_time(trades[-1]) - trade_time(trades[0])) / 1000
+            st.rate = (len(trades) - 1) / span if span > 0 else 0.0
+        else:
+            elapsed = now - st.polled_at
+            if elapsed > 0:
+                sample = fresh / elapsed
+                st.rate += _RATE_ALPHA * (sample - st.rate)
+            if truncated:
+                st.rate = max(st.rate, 2 * st.limit / max(elapsed, 1e-3))
+        newest = max(range(len(ids)), key=ids.__getitem__)
+        if st.last_id is None or ids[newest] > st.last_id:
+            st.last_id = ids[newest]
+            st.last_time = trade_time(trades[newest])
+        st.polled_at = now
+
+    def forget(self, symbol: str) -> None:
+        self._symbols.pop(symbol, None)
+
+    def stats(self, top: int = 20) -> Dict[str, Any]:
+        symbols = sorted(self._symbols.items(), key=lambda kv: kv[1].bytes, reverse=True)[:top]
+        return {
+            "enabled": self.enabled,
+            "window": self.window,
+            "min_limit": self.min_limit,
+            **self._totals,
+            "bytes_per_request": round(self._totals["bytes"] / self._totals["requests"], 1)
+            if self._totals["requests"] else 0.0,
+            "symbols": {
+                sym: {name: getattr(st, name) for name in _POLL_COUNTERS} | {
+                    "last_id": st.last_id, "limit": st.limit, "rate_per_s": round(st.rate, 3)}
+                for sym, st in symbols
+            },
+        }
+
+
+agg_trade_poller = AggTradePoller()
@@ -1,4 +1,276 @@
 """
-Placeholder for Binance WS client with SOCKS5 support if needed.
+Binance aggTrade streaming over one multiplexed WebSocket connection.
+
+- Symbols are (un)subscribed with SUBSCRIBE/UNSUBSCRIBE frames on a single
+  connection and reference-counted per consumer.
+- The connection reconnects with capped exponential backoff; afterwards every
+  symbol is backfilled over REST starting from its last seen aggregate trade id.
+- WS traffic goes through SOCKS5 (config.SOCKS_HOST/SOCKS_PORT) when USE_PROXY is on.
+- `websockets` (and `python-socks` for the proxy) are optional dependencies,
+  imported only when WS_ENABLED starts the client; without them the stream
+  stays off and prices come from REST.
+
+Readers use get_live_metrics(): it returns last/avg/vwap of the in-memory window
+only while the symbol's subscription is live, so callers can fall back to REST
+otherwise.
 """
-# TODO: Implement when enabling WS price streaming.
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from backend.config import config
+from backend.core.http_client import PRIORITY_BACKGROUND, upstream_priority
+from backend.core.json_codec import dumps_str, loads
+from backend.services.binance_client import AggTrade, fetch_agg_trades
+from backend.services.candle_rollup import candle_rollups
+from backend.services.trade_buffer import TradeRingBuffer
+from backend.services.trade_store import record_trades
+
+logger = logging.getLogger("app.ws")
+
+Backfill = Callable[..., Awaitable[Optional[List[AggTrade]]]]
+
+
+def _default_proxy() -> Optional[str]:
+    # None disables websockets' own env proxy lookup (HTTP_PROXY is REST only)
+    if config.USE_PROXY and config.SOCKS_HOST:
+        return f"socks5://{config.SOCKS_HOST}:{config.SOCKS_PORT}"
+    return None
+
+
+def _stream_name(symbol: str) -> str:
+    return f"{symbol.lower()}@aggTrade"
+
+
+class _SymbolState:
+    """Per-symbol subscription state around a trade window keyed by aggregate id."""
+
+    __slots__ = ("refcount", "buffer", "live")
+
+    def __init__(self, window: int) -> None:
+        self.refcount = 0
+        self.buffer = TradeRingBuffer(window)
+        self.live = False
+
+    @property
+    def last_id(self) -> Optional[int]:
+        return self.buffer.last_id
+
+
+class BinanceWSClient:
+    def __init__(self, url: Optional[str] = None, *, window: Optional[int] = None,
+                 proxy: Optional[str] = "", backfill: Backfill = fetch_agg_trades) -> None:
+        self.url = url or config.BINANCE_WS_URL
+        self.window = window or config.DEFAULT_TRADES_LIMIT
+        self.proxy = _default_proxy() if proxy == "" else proxy
+        self._backfill = backfill
+        self._symbols: Dict[str, _SymbolState] = {}
+        self._ws = None
+        self._task: Optional[asyncio.Task] = None
+        self._msg_id = 0
+        self.reconnects = 0
+        self.messages = 0
+
+    # Lifecycle -----------------------------------------------------------
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="binance-ws")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None
+
+    # Subscriptions -------------------------------------------------------
+    async def subscribe(self, symbol: str) -> None:
+        sym = symbol.upper()
+        st = self._symbols.get(sym)
+        if st is not None:
+            st.refcount += 1
+            return
+        st = self._symbols[sym] = _SymbolState(self.window)
+        st.refcount = 1
+        if self._ws is not None:
+            await self._send("SUBSCRIBE", [sym])
+            await self._backfill_symbol(sym, st)
+
+    async def unsubscribe(self, symbol: str) -> None:
+        sym = symbol.upper()
+        st = self._symbols.get(sym)
+        if st is None:
+            return
+        st.refcount -= 1
+        if st.refcount > 0:
+            return
+        del self._symbols[sym]
+        if self._ws is not None:
+            await self._send("UNSUBSCRIBE", [sym])
+
+    def is_live(self, symbol: str) -> bool:
+        st = self._symbols.get(symbol.upper())
+        return bool(st and st.live and len(st.buffer))
+
+    def get_buffer(self, symbol: str) -> Optional[TradeRingBuffer]:
+        """Trade window of a live subscription, or None when not live."""
+        st = self._symbols.get(symbol.upper())
+        if st is None or not st.live or not len(st.buffer):
+            return None
+        return st.buffer
+
+    def get_metrics(self, symbol: str) -> Optional[Dict[str, Any]]:
+        buf = self.get_buffer(symbol)
+        return buf.metrics() if buf is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "reconnects": self.reconnects,
+            "messages": self.messages,
+            "symbols": {
+                sym: {"refcount": st.refcount, "live": st.live, "last_id": st.last_id, "trades": len(st.buffer)}
+                for sym, st in self._symbols.items()
+            },
+        }
+
+    # Internals -----------------------------------------------------------
+    async def _send(self, method: str, symbols: List[str]) -> None:
+        ws = self._ws
+        if ws is None:
+            return
+        self._msg_id += 1
+        payload = {"method": method, "params": [_stream_name(s) for s in symbols], "id": self._msg_id}
+        try:
+            await ws.send(dumps_str(payload))
+        except Exception as e:  # connection dropped; _run resubscribes on reconnect
+            logger.warning("ws %s failed for %s: %s", method, symbols, e)
+
+    async def _backfill_symbol(self, sym: str, st: _SymbolState) -> None:
+        try:
+            with upstream_priority(PRIORITY_BACKGROUND):
+                if st.last_id is not None:
+                    trades = await self._backfill(sym, self.window, from_id=st.last_id + 1) or []
+                    if len(trades) >= self.window:
+                        # Gap wider than the window: the latest window supersedes it
+                        trades = await self._backfill(sym, self.window) or []
+                else:
+                    trades = await self._backfill(sym, self.window) or []
+        except Exception as e:
+            logger.warning("ws backfill failed for %s: %s", sym, e)
+            return
+        st.buffer.add(trades)
+        record_trades(sym, trades)
+        candle_rollups.ingest(sym, trades)
+        st.live = self._ws is not None and self._symbols.get(sym) is st
+
+    def _on_message(self, raw: Any) -> None:
+        try:
+            msg = loads(raw)
+        except (TypeError, ValueError):
+            return
+        if not isinstance(msg, dict):
+            return
+        data = msg.get("data", msg)
+        if not isinstance(data, dict) or data.get("e") != "aggTrade":
+            return  # subscription acks and other events
+        self.messages += 1
+        sym = str(data.get("s", "")).upper()
+        st = self._symbols.get(sym)
+        if st is not None:
+            trade = (AggTrade.from_dict(data),)
+            st.buffer.add(trade)
+            record_trades(sym, trade)
+            candle_rollups.ingest(sym, trade)
+            if not st.live and self._ws is not None and len(st.buffer) >= self.window:
+                st.live = True  # window refilled by the stream alone (backfill failed)
+
+    async def _run(self) -> None:
+        from websockets.asyncio.client import connect  # optional dependency, see start_stream_client()
+
+        attempt = 0
+        while True:
+            try:
+                async with connect(self.url, proxy=self.proxy,
+                                   ping_interval=config.WS_PING_INTERVAL) as ws:
+                    self._ws = ws
+                    attempt = 0
+                    logger.info("ws connected %s", self.url)
+                    symbols = list(self._symbols)
+                    if symbols:
+                        await self._send("SUBSCRIBE", symbols)
+                        await asyncio.gather(*(
+                            self._backfill_symbol(s, self._symbols[s]) for s in symbols if s in self._symbols
+                        ))
+                    async for raw in ws:
+                        self._on_message(raw)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("ws connection error: %s", e)
+            finally:
+                self._ws = None
+                for st in self._symbols.values():
+                    st.live = False
+            attempt += 1
+            self.reconnects += 1
+            delay = min(config.WS_RECONNECT_BACKOFF_MAX,
+                        config.WS_RECONNECT_BACKOFF_BASE * (2 ** (attempt - 1)))
+            await asyncio.sleep(delay)
+
+
+# Process-wide stream client, started/stopped by the app lifespan when WS_ENABLED
+_stream_client: Optional[BinanceWSClient] = None
+
+
+def get_stream_client() -> Optional[BinanceWSClient]:
+    return _stream_client
+
+
+async def start_stream_client(client: Optional[BinanceWSClient] = None) -> Optional[BinanceWSClient]:
+    global _stream_client
+    if client is None and not config.WS_ENABLED:
+        return None
+    try:
+        import websockets  # noqa: F401
+        if (client.proxy if client is not None else _default_proxy()):
+            import python_socks  # noqa: F401  (websockets' SOCKS support)
+    except ImportError as e:
+        logger.warning("ws stream disabled, install 'websockets' and 'python-socks[asyncio]': %s", e)
+        return None
+    _stream_client = client or BinanceWSClient()
+    _stream_client.start()
+    return _stream_client
+
+
+async def stop_stream_client() -> None:
+    global _stream_client
+    client, _stream_client = _stream_client, None
+    if client is not None:
+        await client.stop()
+
+
+def get_live_metrics(symbol: str) -> Optional[Dict[str, Any]]:
+    client = _stream_client
+    return client.get_metrics(symbol) if client is not None else None
+
+
+@asynccontextmanager
+async def stream_subscription(symbol: str):
+    """Hold a reference-counted subscription for the duration of the block."""
+    client = _stream_client
+    if client is None:
+        yield None
+        return
+    await client.subscribe(symbol)
+    try:
+        yield client
+    finally:
+        await client.unsubscribe(symbol)
@@ -1,10 +1,26 @@
 """
 Calculation logic for price diff range using ROUND_HALF_UP with 8 decimals.
+
+Batch sweeps (compute_diff_range_batch) run the same Decimal operations in the
+same order and precision as compute_diff_range, so results are identical, but
+with the quantizer and context built once and token_amount shared by consecutive
+scenarios with the same price_now / per_volume / fee_amount_token.
 """
-from decimal import Decimal
-from typing import Dict
+import itertools
+from decimal import Context, Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from backend.config import config
+from backend.core.precision import INTERMEDIATE_PREC, Number, to_decimal, quantize
+
+# Order of the inputs in a batch scenario tuple
+SCENARIO_FIELDS = ("price_now", "per_volume", "waste_lower", "waste_upper", "fee_amount_token")
+Scenario = Tuple[Number, Number, Number, Number, Number]
+# (diff_lower, diff_upper, error) per scenario
+BatchResult = Tuple[Optional[Decimal], Optional[Decimal], Optional[str]]
 
-from backend.core.precision import to_decimal, quantize
+# Explicit context: batches may run in a worker thread, where getcontext() is not ours
+_CTX = Context(prec=INTERMEDIATE_PREC)
 
 
 def compute_fee_usdt(fee_amount_token, price_now) -> Decimal:
@@ -35,3 +51,66 @@ def compute_diff_range(price_now, per_volume, waste_lower, waste_upper, fee_amou
     if up < lo:
         lo, up = up, lo
     return {"diff_lower": lo, "diff_upper": up}
+
+
+def grid_values(start: Number, stop: Number, step: Number, max_count: Optional[int] = None) -> List[Decimal]:
+    """start, start + step, ... up to and including stop (exact Decimal steps)."""
+    start_d, stop_d, step_d = to_decimal(start), to_decimal(stop), to_decimal(step)
+    if step_d <= 0:
+        raise ValueError("step must be > 0")
+    if stop_d < start_d:
+        raise ValueError("stop must be >= start")
+    count = int((stop_d - start_d) / step_d) + 1
+    if max_count is not None and count > max_count:
+        raise ValueError(f"range has {count} values, at most {max_count} allowed")
+    return [start_d + step_d * i for i in range(count)]
+
+
+def grid_size(axes: Dict[str, Sequence[Number]]) -> int:
+    size = 1
+    for field in SCENARIO_FIELDS:
+        size *= len(axes[field])
+    return size
+
+
+def expand_grid(axes: Dict[str, Sequence[Number]]) -> Iterator[Scenario]:
+    """Cartesian product of the per-field value lists. The waste bounds vary fastest,
+    so consecutive scenarios share price_now / per_volume / fee_amount_token."""
+    outer = itertools.product(axes["price_now"], axes["per_volume"], axes["fee_amount_token"],
+                              axes["waste_lower"], axes["waste_upper"])
+    for price_now, per_volume, fee, waste_lower, waste_upper in outer:
+        yield price_now, per_volume, waste_lower, waste_upper, fee
+
+
+def compute_diff_range_batch(scenarios: Iterable[Scenario]) -> Iterator[BatchResult]:
+    """compute_diff_range over many scenarios, lazily, one result per scenario.
+    Errors are reported per row instead of raised.
+    """
+    q = Decimal(1).scaleb(-config.DECIMAL_PLACES)
+    rounding = config.ROUNDING_MODE
+    divide = _CTX.divide
+    last_key: Optional[Tuple[Decimal, Decimal, Decimal]] = None
+    token_amount = None
+    for scenario in scenarios:
+        price, per_volume, waste_lower, waste_upper, fee = map(to_decimal, scenario)
+        key = (price, per_volume, fee)
+        try:
+            # Grids (and most sweeps) keep these fixed across consecutive scenarios
+            if key != last_key:
+                last_key = None
+                if per_volume <= 0 or price <= 0:
+                    raise ValueError("price_now and per_volume must be > 0")
+                token_amount = divide(_CTX.subtract(per_volume, _CTX.multiply(fee, price)), price)
+                last_key = key
+            lo = divide(waste_lower, token_amount).quantize(q, rounding, _CTX)
+            up = divide(waste_upper, token_amount).quantize(q, rounding, _CTX)
+        except ValueError as e:
+            yield None, None, str(e)
+            continue
+        except ZeroDivisionError:
+            yield None, None, "per_volume - fee_usdt must be non-zero"
+            continue
+        except ArithmeticError as e:
+            yield None, None, f"arithmetic error: {type(e).__name__}"
+            continue
+        yield (up, lo, None) if up < lo else (lo, up, None)
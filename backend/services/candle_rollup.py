@@ -0,0 +1,325 @@
+"""
+Incremental OHLCV/VWAP rollups at fixed time resolutions (CANDLE_INTERVALS).
+
+Every ingested trade (REST poller or stream) updates one pre-aggregated bucket
+per interval; /api/alpha/candles reads the buckets and never touches raw
+trades. Each interval keeps a ring of CANDLE_HISTORY slots indexed by
+(bucket start // width) % CANDLE_HISTORY, so a symbol's memory is bounded and a
+slot is reused once its bucket is that far behind.
+
+Trades are deduplicated by aggregate-trade id: ids above the newest seen are
+new; ids below it are accepted only if they fall in a gap of ids not seen yet
+(tracked as ranges, up to CANDLE_LATE_SPAN ids back), so overlapping polls are
+counted once and late trades land in their own bucket. Open/close are the
+prices of the lowest/highest id in a bucket, so arrival order doesn't matter.
+Rollups only see what the poller or the stream delivered: a bucket whose time
+span overlaps a gap still open (or one given up on after CANDLE_LATE_SPAN ids)
+is returned with "complete": false, since its volume and count may be short.
+Prices and quantities are summed as fixed-point ints (one price scale and one
+qty scale per symbol, widened when a trade has more decimals).
+"""
+import re
+from bisect import bisect_right
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from backend.config import config
+from backend.core.fixed_point import pow10, to_decimal_exact
+from backend.core.precision import quantize
+from backend.services.binance_client import AggTrade, TradeColumns, trade_time
+
+_UNITS = {"s": 1000, "m": 60_000, "h": 3_600_000}
+_INTERVAL_RE = re.compile(r"^([1-9][0-9]*)([smh])$")
+
+
+def parse_interval(text: str) -> int:
+    """Interval like '1s', '5m' or '1h' in ms."""
+    m = _INTERVAL_RE.match(text.strip().lower())
+    if not m:
+        raise ValueError(f"invalid interval: {text!r}")
+    return int(m.group(1)) * _UNITS[m.group(2)]
+
+
+def configured_intervals() -> Dict[str, int]:
+    return {s.strip().lower(): parse_interval(s) for s in config.CANDLE_INTERVALS.split(",") if s.strip()}
+
+
+class Candle:
+    """One bucket: prices at the symbol's price scale, volume at its qty scale,
+    quote volume (sum p*q) at both."""
+
+    __slots__ = ("open_time", "open_id", "open", "close_id", "close", "high", "low", "volume", "quote", "count", "lost")
+
+    def __init__(self, open_time: int, agg_id: int, price: int, qty: int) -> None:
+        self.open_time = open_time
+        self.open_id = self.close_id = agg_id
+        self.open = self.close = self.high = self.low = price
+        self.volume = qty
+        self.quote = price * qty
+        self.count = 1
+        self.lost = False  # overlapped a gap that was never filled
+
+    def add(self, agg_id: int, price: int, qty: int) -> None:
+        if agg_id < self.open_id:
+            self.open_id, self.open = agg_id, price
+        elif agg_id > self.close_id:
+            self.close_id, self.close = agg_id, price
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.volume += qty
+        self.quote += price * qty
+        self.count += 1
+
+    def rescale(self, fp: int, fq: int) -> None:
+        self.open *= fp
+        self.close *= fp
+        self.high *= fp
+        self.low *= fp
+        self.volume *= fq
+        self.quote *= fp * fq
+
+
+class SymbolRollup:
+    """Candle rings of one symbol, one per interval width (ms)."""
+
+    def __init__(self, widths: Sequence[int], history: Optional[int] = None,
+                 late_span: Optional[int] = None) -> None:
+        self.history = history or config.CANDLE_HISTORY
+        self.late_span = config.CANDLE_LATE_SPAN if late_span is None else late_span
+        self._rings: Dict[int, List[Optional[Candle]]] = {w: [None] * self.history for w in widths}
+        self._scales = TradeColumns()  # empty; tracks the price/qty scales via parse()
+        self.max_id: Optional[int] = None
+        self.max_id_time = 0
+        self.last_time = 0
+        # Ids below max_id not seen yet, as sorted disjoint [start, end) ranges, and the
+        # times of the trades around each gap (the missing trades happened in between)
+        self._gap_starts: List[int] = []
+        self._gap_ends: List[int] = []
+        self._gap_times: List[Tuple[int, int]] = []
+        self.trades = self.late = self.duplicates = self.dropped = 0
+
+    @property
+    def price_scale(self) -> int:
+        return self._scales.price_scale
+
+    @property
+    def qty_scale(self) -> int:
+        return self._scales.qty_scale
+
+    def _fill_gap(self, agg_id: int) -> bool:
+        """Mark agg_id seen if it's in a gap (a late trade); False for duplicates."""
+        i = bisect_right(self._gap_starts, agg_id) - 1
+        if i < 0 or agg_id >= self._gap_ends[i]:
+            return False
+        start, end = self._gap_starts[i], self._gap_ends[i]
+        if end - start == 1:
+            del self._gap_starts[i], self._gap_ends[i], self._gap_times[i]
+        elif agg_id == start:
+            self._gap_starts[i] += 1
+        elif agg_id == end - 1:
+            self._gap_ends[i] -= 1
+        else:
+            self._gap_ends[i] = agg_id
+            self._gap_starts.insert(i + 1, agg_id + 1)
+            self._gap_ends.insert(i + 1, end)
+            self._gap_times.insert(i + 1, self._gap_times[i])
+        return True
+
+    def _accept(self, agg_id: int, ts: int) -> bool:
+        if self.max_id is None or agg_id > self.max_id:
+            if self.max_id is not None and agg_id > self.max_id + 1:
+                self._gap_starts.append(self.max_id + 1)
+                self._gap_ends.append(agg_id)
+                self._gap_times.append((min(self.max_id_time, ts), max(self.max_id_time, ts)))
+            self.max_id, self.max_id_time = agg_id, ts
+            return True
+        if agg_id <= self.max_id - self.late_span:
+            self.dropped += 1  # too late to tell from a duplicate
+            return False
+        if self._fill_gap(agg_id):
+            self.late += 1
+            return True
+        self.duplicates += 1
+        return False
+
+    def _forget_old_gaps(self) -> None:
+        horizon = self.max_id - self.late_span
+        n = bisect_right(self._gap_ends, horizon)
+        if n:
+            for lo, hi in self._gap_times[:n]:
+                self._mark_lost(lo, hi)
+            del self._gap_starts[:n], self._gap_ends[:n], self._gap_times[:n]
+
+    def _mark_lost(self, lo: int, hi: int) -> None:
+        """Flag the buckets in [lo, hi] for good: their missing trades won't be accepted any more."""
+        for width, ring in self._rings.items():
+            start = lo - lo % width
+            for k in range(min((hi - start) // width + 1, self.history)):
+                c = ring[((start + k * width) // width) % self.history]
+                if c is not None and c.open_time == start + k * width:
+                    c.lost = True
+
+    @property
+    def missing(self) -> int:
+        """Ids below max_id not seen yet (still accepted as late trades)."""
+        return sum(self._gap_ends) - sum(self._gap_starts)
+
+    def _open_gap_spans(self) -> Tuple[List[int], List[int]]:
+        """Time spans of the open gaps, merged into sorted disjoint [lo, hi] ranges."""
+        los: List[int] = []
+        his: List[int] = []
+        for lo, hi in sorted(self._gap_times):
+            if his and lo <= his[-1]:
+                his[-1] = max(his[-1], hi)
+            else:
+                los.append(lo)
+                his.append(hi)
+        return los, his
+
+    def add(self, trades: Iterable[AggTrade]) -> int:
+        """Fold new trades into every interval's buckets; returns how many were new."""
+        batch = []
+        for t in trades:
+            try:
+                agg_id = int(t.agg_id)
+            except (TypeError, ValueError):
+                continue
+            ts = trade_time(t)
+            if ts > 0:
+                batch.append((agg_id, ts, t))
+        if not batch:
+            return 0
+        batch.sort(key=lambda x: x[0])
+        fresh = [(agg_id, ts, t) for agg_id, ts, t in batch if self._accept(agg_id, ts)]
+        if fresh:
+            self._fold(fresh)
+        # After folding, so buckets of this batch inside a gap given up on are flagged too
+        self._forget_old_gaps()
+        return len(fresh)
+
+    def _fold(self, fresh: List[Tuple[int, int, AggTrade]]) -> None:
+        ps, qs = self.price_scale, self.qty_scale
+        prices, qtys = self._scales.parse([t for _, _, t in fresh])
+        if (self.price_scale, self.qty_scale) != (ps, qs):
+            self._rescale(pow10(self.price_scale - ps), pow10(self.qty_scale - qs))
+        for width, ring in self._rings.items():
+            n = self.history
+            for (agg_id, ts, _), p, q in zip(fresh, prices, qtys):
+                start = ts - ts % width
+                slot = (ts // width) % n
+                c = ring[slot]
+                if c is None or c.open_time < start:
+                    ring[slot] = Candle(start, agg_id, p, q)
+                elif c.open_time == start:
+                    c.add(agg_id, p, q)
+                # else: the bucket was already recycled for a newer one; the trade is too old
+        self.trades += len(fresh)
+        self.last_time = max(self.last_time, max(ts for _, ts, _ in fresh))
+
+    def _rescale(self, fp: int, fq: int) -> None:
+        for ring in self._rings.values():
+            for c in ring:
+                if c is not None:
+                    c.rescale(fp, fq)
+
+    def candles(self, width: int, limit: int) -> List[Candle]:
+        """Up to `limit` non-empty buckets, oldest first, ending with the newest one."""
+        ring = self._rings[width]
+        n = self.history
+        newest = self.last_time - self.last_time % width
+        out = []
+        for k in range(n):
+            start = newest - k * width
+            if start < 0:
+                break
+            c = ring[(start // width) % n]
+            if c is not None and c.open_time == start:
+                out.append(c)
+                if len(out) >= limit:
+                    break
+        out.reverse()
+        return out
+
+    def to_dicts(self, width: int, limit: int) -> List[Dict[str, Any]]:
+        ps, qs = self.price_scale, self.qty_scale
+        los, his = self._open_gap_spans()
+        out = []
+        for c in self.candles(width, limit):
+            # Incomplete if trades may be missing: an open or abandoned agg-id gap overlaps it
+            i = bisect_right(los, c.open_time + width - 1) - 1
+            complete = not c.lost and (i < 0 or his[i] < c.open_time)
+            close = to_decimal_exact(c.close, ps)
+            volume = to_decimal_exact(c.volume, qs)
+            quote = to_decimal_exact(c.quote, ps + qs)
+            out.append({
+                "open_time": c.open_time,
+                "close_time": c.open_time + width - 1,
+                "open": quantize(to_decimal_exact(c.open, ps)),
+                "high": quantize(to_decimal_exact(c.high, ps)),
+                "low": quantize(to_decimal_exact(c.low, ps)),
+                "close": quantize(close),
+                "volume": volume,
+                "quote_volume": quote,
+                "vwap": quantize(quote / volume if c.volume > 0 else close),
+                "count": c.count,
+                "complete": complete,
+            })
+        return out
+
+
+class CandleRegistry:
+    """Symbol -> SymbolRollup, bounded by an LRU cap on the number of symbols."""
+
+    def __init__(self, intervals: Optional[Dict[str, int]] = None, max_symbols: Optional[int] = None,
+                 history: Optional[int] = None, late_span: Optional[int] = None) -> None:
+        self.intervals = intervals or configured_intervals()
+        self.max_symbols = max_symbols or config.CANDLE_MAX_SYMBOLS
+        self.history = history
+        self.late_span = late_span
+        self._rollups: "OrderedDict[str, SymbolRollup]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._rollups)
+
+    def get(self, symbol: str) -> Optional[SymbolRollup]:
+        rollup = self._rollups.get(symbol.upper())
+        if rollup is not None:
+            self._rollups.move_to_end(symbol.upper())
+        return rollup
+
+    def ingest(self, symbol: str, trades: Iterable[AggTrade]) -> int:
+        sym = symbol.upper()
+        rollup = self.get(sym)
+        if rollup is None:
+            rollup = self._rollups[sym] = SymbolRollup(
+                tuple(set(self.intervals.values())), self.history, self.late_span)
+            while len(self._rollups) > self.max_symbols:
+                self._rollups.popitem(last=False)
+        return rollup.add(trades)
+
+    def candles(self, symbol: str, interval: str, limit: int) -> List[Dict[str, Any]]:
+        """Newest `limit` candles of a configured interval (ValueError for others)."""
+        width = self.intervals.get(interval.strip().lower())
+        if width is None:
+            raise ValueError(f"interval must be one of {', '.join(self.intervals)}")
+        rollup = self.get(symbol)
+        return rollup.to_dicts(width, limit) if rollup is not None else []
+
+    def stats(self) -> Dict[str, Any]:
+        rollups = self._rollups.values()
+        return {
+            "symbols": len(self._rollups),
+            "intervals": list(self.intervals),
+            "history": self.history or config.CANDLE_HISTORY,
+            "trades": sum(r.trades for r in rollups),
+            "late": sum(r.late for r in rollups),
+            "duplicates": sum(r.duplicates for r in rollups),
+            "dropped": sum(r.dropped for r in rollups),
+            "missing": sum(r.missing for r in rollups),
+        }
+
+
+candle_rollups = CandleRegistry()
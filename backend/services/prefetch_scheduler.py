@@ -0,0 +1,211 @@
+"""
+Background prefetching of hot symbols, so their price requests hit the cache.
+
+Popularity is a per-symbol request count decaying with PREFETCH_HALF_LIFE_SECONDS.
+Once a second the PREFETCH_TOP_K symbols scoring at least PREFETCH_MIN_SCORE
+become the hot set; symbols that cool down leave it and are eventually
+forgotten. Hot symbols are refreshed from a due-time heap:
+
+- The interval adapts to the snapshot TTL minus the measured upstream latency
+  (so a refresh lands before the cached snapshot expires). It never goes below
+  what the upstream budget allows: len(hot) / PREFETCH_MAX_RPS.
+- Refreshes are paced one every 1 / PREFETCH_MAX_RPS seconds, so upstream calls
+  are spread evenly instead of bursting when many symbols fall due together.
+- A symbol whose data was refreshed meanwhile (a request-driven miss, a live
+  stream) is skipped and rescheduled without spending budget.
+"""
+import asyncio
+import heapq
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from backend.config import config
+
+logger = logging.getLogger("app.prefetch")
+
+Refresh = Callable[[str], Awaitable[Any]]
+DataAge = Callable[[str], Optional[float]]
+
+_PLAN_SECONDS = 1.0
+_FORGET_SCORE = 0.05  # decayed score below which a symbol is no longer tracked
+_MAX_TRACKED = 10000
+_REFRESH_FRACTION = 0.8  # of the TTL, before subtracting upstream latency
+_EWMA = 0.2
+
+
+class PrefetchScheduler:
+    def __init__(self, refresh: Refresh, data_age: DataAge, *, top_k: Optional[int] = None,
+                 max_rps: Optional[float] = None, concurrency: Optional[int] = None,
+                 half_life: Optional[float] = None, min_score: Optional[float] = None,
+                 ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic) -> None:
+        self._refresh = refresh
+        self._data_age = data_age
+        self.top_k = config.PREFETCH_TOP_K if top_k is None else top_k
+        self.max_rps = max_rps or config.PREFETCH_MAX_RPS
+        self.concurrency = concurrency or config.PREFETCH_CONCURRENCY
+        self.half_life = half_life or config.PREFETCH_HALF_LIFE_SECONDS
+        self.min_score = config.PREFETCH_MIN_SCORE if min_score is None else min_score
+        self.ttl = ttl or config.PRICE_CACHE_TTL_SECONDS
+        self._clock = clock
+        self._scores: Dict[str, Tuple[float, float]] = {}  # symbol -> (score, as of)
+        self._hot: Set[str] = set()
+        self._running: Set[str] = set()  # hot or not, refresh in flight
+        self._due: Dict[str, float] = {}  # hot symbol -> next refresh time (absent while running)
+        self._heap: List[Tuple[float, str]] = []  # (due, symbol); stale entries skipped
+        self._next_slot = 0.0
+        self._inflight: Set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None  # set when something gets scheduled
+        self.interval = self.ttl
+        self.latency = 0.0  # EWMA of refresh duration (s)
+        self.lag = 0.0  # EWMA of how late refreshes start vs. their due time (s)
+        self.max_lag = 0.0
+        self.refreshes = 0
+        self.errors = 0
+        self.skipped = 0
+
+    # Popularity ------------------------------------------------------------
+    def _decayed(self, entry: Tuple[float, float], now: float) -> float:
+        score, at = entry
+        return score * 0.5 ** ((now - at) / self.half_life)
+
+    def touch(self, symbol: str) -> None:
+        """Count one request for symbol (request path: O(1))."""
+        now = self._clock()
+        entry = self._scores.pop(symbol, None)  # re-inserted: the dict stays in touch order
+        self._scores[symbol] = ((self._decayed(entry, now) if entry else 0.0) + 1.0, now)
+        if len(self._scores) > _MAX_TRACKED:
+            del self._scores[next(iter(self._scores))]  # least recently touched, so the coldest
+
+    def score(self, symbol: str) -> float:
+        entry = self._scores.get(symbol)
+        return self._decayed(entry, self._clock()) if entry else 0.0
+
+    # Scheduling ------------------------------------------------------------
+    def plan(self, now: float) -> None:
+        """Recompute the hot set and the refresh interval; forget cold symbols."""
+        ranked = []
+        for sym, entry in list(self._scores.items()):
+            score = self._decayed(entry, now)
+            if score < _FORGET_SCORE:
+                del self._scores[sym]
+            elif score >= self.min_score:
+                ranked.append((score, sym))
+        self._hot = {sym for _, sym in heapq.nlargest(self.top_k, ranked)}
+        for sym in list(self._due):
+            if sym not in self._hot:
+                del self._due[sym]  # its heap entry goes stale
+        for sym in self._hot:
+            if sym not in self._due and sym not in self._running:
+                self._schedule(sym, now)
+        floor = len(self._hot) / self.max_rps
+        self.interval = max(floor, self.ttl * _REFRESH_FRACTION - self.latency, self.ttl * 0.1)
+
+    def _schedule(self, symbol: str, at: float) -> None:
+        self._due[symbol] = at
+        heapq.heappush(self._heap, (at, symbol))
+        if self._wake is not None:
+            self._wake.set()
+
+    def due(self, now: float) -> Tuple[List[str], Optional[float]]:
+        """Symbols to refresh now (paced to max_rps), and seconds until the next one
+        could be due (None when nothing is scheduled)."""
+        fire: List[str] = []
+        while self._heap:
+            at, sym = self._heap[0]
+            if self._due.get(sym) != at:
+                heapq.heappop(self._heap)
+                continue
+            if at > now:
+                return fire, max(at, self._next_slot) - now
+            age = self._data_age(sym)
+            if age is not None and age < self.interval / 2:
+                # Refreshed meanwhile (a request miss, a live stream): no upstream call
+                heapq.heappop(self._heap)
+                self.skipped += 1
+                self._schedule(sym, now + self.interval - age)
+                continue
+            if self._next_slot > now:
+                return fire, self._next_slot - now
+            if len(self._running) + len(fire) >= self.concurrency:
+                return fire, 1.0 / self.max_rps
+            heapq.heappop(self._heap)
+            del self._due[sym]
+            self._next_slot = max(self._next_slot, now) + 1.0 / self.max_rps
+            lag = now - at
+            self.lag += _EWMA * (lag - self.lag)
+            self.max_lag = max(self.max_lag, lag)
+            fire.append(sym)
+        return fire, None
+
+    async def _refresh_one(self, symbol: str) -> None:
+        started = self._clock()
+        try:
+            await self._refresh(symbol)
+            self.refreshes += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.errors += 1
+            logger.warning("prefetch of %s failed: %s", symbol, e)
+        finally:
+            now = self._clock()
+            self.latency += _EWMA * ((now - started) - self.latency)
+            self._running.discard(symbol)
+            if symbol in self._hot:
+                self._schedule(symbol, now + self.interval)
+
+    def _spawn(self, symbol: str) -> None:
+        self._running.add(symbol)
+        task = asyncio.create_task(self._refresh_one(symbol), name=f"prefetch-{symbol}")
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _run(self) -> None:
+        next_plan = 0.0
+        wake = self._wake = asyncio.Event()
+        while True:
+            wake.clear()
+            now = self._clock()
+            if now >= next_plan:
+                self.plan(now)
+                next_plan = now + _PLAN_SECONDS
+            fire, wait = self.due(now)
+            for sym in fire:
+                self._spawn(sym)
+            until_plan = next_plan - now
+            try:
+                await asyncio.wait_for(wake.wait(), until_plan if wait is None else min(wait, until_plan))
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        if not config.PREFETCH_ENABLED:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="prefetch-scheduler")
+
+    async def stop(self) -> None:
+        task, self._task, self._wake = self._task, None, None
+        tasks = [t for t in (task, *self._inflight) if t is not None]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._clock()
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "tracked": len(self._scores),
+            "hot": sorted(self._hot, key=self.score, reverse=True),
+            "queue_depth": sum(1 for at in self._due.values() if at <= now),
+            "inflight": len(self._inflight),
+            "interval_s": round(self.interval, 3),
+            "latency_ms": round(self.latency * 1000, 1),
+            "lag_ms": round(self.lag * 1000, 1),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "skipped": self.skipped,
+        }
@@ -0,0 +1,172 @@
+"""
+Fan-out of price snapshots to many downstream clients (SSE / WebSocket).
+
+One topic per resolved symbol runs a single refresh loop (reading the live WS
+stream window when subscribed, otherwise the cached/single-flight REST path)
+and publishes only when last/avg/vwap change. Every client gets its own
+bounded queue; a slow consumer never blocks the topic:
+
+- drop_oldest: keep the newest `queue_size` messages, dropping older ones
+- conflate:    keep only the latest message
+
+Messages are JSON-encoded once per publish and shared by all subscribers.
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set
+
+from backend.config import config
+from backend.core.json_codec import dumps_str
+from backend.services.alpha_price_service import fetch_alpha_price_with_source
+from backend.services.binance_ws_client import stream_subscription
+from backend.services.symbol_mapping import resolve_symbol, symbol_index
+
+logger = logging.getLogger("app.broadcast")
+
+POLICIES = ("drop_oldest", "conflate")
+
+
+class Subscriber:
+    __slots__ = ("symbol", "_queue", "_event", "dropped", "delivered")
+
+    def __init__(self, symbol: str, queue_size: int, policy: str) -> None:
+        self.symbol = symbol
+        self._queue: Deque[str] = deque(maxlen=1 if policy == "conflate" else max(1, queue_size))
+        self._event = asyncio.Event()
+        self.dropped = 0
+        self.delivered = 0
+
+    def put(self, message: str) -> None:
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1  # deque(maxlen) evicts the oldest / conflates to latest
+        self._queue.append(message)
+        self._event.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Next message, or None on timeout (callers send a heartbeat)."""
+        if not self._queue:
+            self._event.clear()
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        self.delivered += 1
+        return self._queue.popleft()
+
+
+class _Topic:
+    __slots__ = ("symbol", "subscribers", "task", "last_key", "last_message", "publishes", "errors")
+
+    def __init__(self, symbol: str) -> None:
+        self.symbol = symbol
+        self.subscribers: Set[Subscriber] = set()
+        self.task: Optional[asyncio.Task] = None
+        self.last_key: Any = None
+        self.last_message: Optional[str] = None
+        self.publishes = 0
+        self.errors = 0
+
+
+def encode_event(kind: str, payload: Dict[str, Any]) -> str:
+    return dumps_str({"type": kind, **payload})
+
+
+class PriceBroadcaster:
+    def __init__(self, interval: Optional[float] = None, queue_size: Optional[int] = None,
+                 policy: Optional[str] = None, max_subscribers: Optional[int] = None) -> None:
+        self.interval = interval or config.PRICE_STREAM_INTERVAL_SECONDS
+        self.queue_size = queue_size or config.PRICE_STREAM_QUEUE_SIZE
+        self.policy = policy or config.PRICE_STREAM_SLOW_CONSUMER_POLICY
+        if self.policy not in POLICIES:
+            raise ValueError(f"slow consumer policy must be one of {POLICIES}")
+        self.max_subscribers = max_subscribers or config.PRICE_STREAM_MAX_SUBSCRIBERS
+        self._topics: Dict[str, _Topic] = {}
+        self._count = 0
+
+    def subscribe(self, alpha_id: str) -> Subscriber:
+        symbol = resolve_symbol(alpha_id)
+        if not symbol:
+            raise ValueError("Unable to resolve symbol from alphaId")
+        symbol_index.check(symbol)
+        if self._count >= self.max_subscribers:
+            raise OverflowError("too many stream subscribers")
+        topic = self._topics.get(symbol)
+        if topic is None:
+            topic = self._topics[symbol] = _Topic(symbol)
+            topic.task = asyncio.create_task(self._run(topic), name=f"price-topic-{symbol}")
+        sub = Subscriber(symbol, self.queue_size, self.policy)
+        topic.subscribers.add(sub)
+        self._count += 1
+        if topic.last_message is not None:
+            sub.put(topic.last_message)  # late joiners start from the current value
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        topic = self._topics.get(sub.symbol)
+        if topic is None or sub not in topic.subscribers:
+            return
+        topic.subscribers.discard(sub)
+        self._count -= 1
+        if not topic.subscribers:
+            del self._topics[sub.symbol]
+            if topic.task is not None:
+                topic.task.cancel()
+
+    def _publish(self, topic: _Topic, message: str) -> None:
+        topic.last_message = message
+        topic.publishes += 1
+        for sub in topic.subscribers:
+            sub.put(message)
+
+    async def _run(self, topic: _Topic) -> None:
+        # One upstream loop per symbol, shared by every subscriber of the topic
+        async with stream_subscription(topic.symbol):
+            while True:
+                try:
+                    snap, _, _ = await fetch_alpha_price_with_source(topic.symbol)
+                    key = (snap["price_now"], snap["price_avg"], snap["price_vwap"])
+                    if key != topic.last_key:
+                        topic.last_key = key
+                        self._publish(topic, encode_event("price", snap))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    topic.errors += 1
+                    logger.warning("price topic %s refresh failed: %s", topic.symbol, e)
+                    key = ("error", str(e))
+                    if key != topic.last_key:
+                        topic.last_key = key
+                        self._publish(topic, encode_event("error", {"symbol": topic.symbol, "detail": str(e)}))
+                await asyncio.sleep(self.interval)
+
+    async def close(self) -> None:
+        topics, self._topics = list(self._topics.values()), {}
+        self._count = 0
+        for topic in topics:
+            if topic.task is not None:
+                topic.task.cancel()
+        for topic in topics:
+            if topic.task is not None:
+                try:
+                    await topic.task
+                except (asyncio.CancelledError, Exception):
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "policy": self.policy,
+            "subscribers": self._count,
+            "topics": {
+                sym: {
+                    "subscribers": len(t.subscribers),
+                    "publishes": t.publishes,
+                    "errors": t.errors,
+                    "dropped": sum(s.dropped for s in t.subscribers),
+                }
+                for sym, t in self._topics.items()
+            },
+        }
+
+
+broadcaster = PriceBroadcaster()
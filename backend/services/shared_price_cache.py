@@ -0,0 +1,445 @@
+"""
+Host-wide price snapshot table shared by all uvicorn workers (optional).
+
+One file (SHARED_CACHE_PATH, /dev/shm by default) is mmap'ed by every worker:
+a 64-byte header, SHARED_CACHE_SLOTS fixed 96-byte slots, open-addressed
+by crc32(symbol), and a ring of recently wanted slot indices. A slot holds the symbol, the snapshot (prices as int64 at
+DECIMAL_PLACES, the trade timestamp, when it was stored) and a sequence
+number used as a seqlock:
+
+- exactly one worker, the one holding an flock on SHARED_CACHE_PATH.writer,
+  fetches upstream and publishes: seq becomes odd, the fields are written,
+  seq becomes even. The lock dies with its process, so another worker takes
+  over on its next tick;
+- readers unpack straight from the mapping without any lock and retry while
+  seq is odd or changed under them;
+- other workers flag the symbols they are asked for (wanted_at), push the slot
+  index onto the ring, bump a header counter the writer polls every 10 ms, and
+  wait up to SHARED_CACHE_WAIT_SECONDS for the writer to publish before falling
+  back to their own upstream call. The writer drains the ring into its set of
+  wanted slots and keeps those refreshed ahead of the snapshot TTL, so it only
+  looks at slots someone asked for (all slots only when it is elected or the
+  ring overflowed). When a
+  refresh fails the writer stamps the slot (failed_at), so waiting followers
+  give up at once instead of sitting out the whole wait;
+- a follower whose own upstream call is refused (UpstreamUnavailable) serves
+  the slot's last snapshot up to PRICE_STALE_MAX_SECONDS old (see stale()).
+
+Slots are claimed once per symbol (under a short flock on the data file) and
+never move, so a worker caches symbol -> slot locally. Ages use
+time.monotonic(), which on Linux is the same clock in every process.
+"""
+import asyncio
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.config import config
+from backend.core.fixed_point import to_decimal_exact
+
+logger = logging.getLogger("app.shared_cache")
+
+_MAGIC = b"BAPXSHM2"
+_HEADER = struct.Struct("<8sIII")  # magic, slots, slot size, decimal places
+_SIGNAL_AT = 24  # u64 bumped by followers waiting on a symbol, polled by the writer
+_RING_HEAD_AT = 32  # u64 count of slot indices ever pushed onto the ring
+_RING_SIZE = 1024  # u32 slot indices after the slots; older pushes are overwritten
+_RING = struct.Struct("<I")
+_HEADER_SIZE = 64
+_SLOT_SIZE = 96
+_SEQ = struct.Struct("<Q")
+_SYMBOL = struct.Struct("<32s")
+_WANTED = struct.Struct("<d")  # also used for failed_at
+_DATA = struct.Struct("<dqqqq")  # stored_at, timestamp, price_now, price_avg, price_vwap
+_SYMBOL_AT, _WANTED_AT, _DATA_AT, _FAILED_AT = 8, 40, 48, 88
+_INT64_MAX = 2 ** 63 - 1
+_READ_RETRIES = 64
+_WANT_EVERY = 1.0  # seconds between wanted_at refreshes by one reader
+_POLL_SECONDS = 0.005
+_WRITER_POLL_SECONDS = 0.01
+
+Refresh = Callable[[str], Awaitable[Any]]
+
+
+class SharedPriceStore:
+    """The mmap'ed slot table; one instance per worker process."""
+
+    def __init__(self, path: str, slots: Optional[int] = None, places: Optional[int] = None) -> None:
+        n = slots or config.SHARED_CACHE_SLOTS
+        self.slots = 1 << max(0, n - 1).bit_length()  # power of two for masking
+        self.places = config.DECIMAL_PLACES if places is None else places
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._ring_at = _HEADER_SIZE + self.slots * _SLOT_SIZE
+        size = self._ring_at + _RING_SIZE * _RING.size
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, _HEADER.pack(_MAGIC, self.slots, _SLOT_SIZE, self.places), 0)
+            header = _HEADER.unpack(os.pread(self._fd, _HEADER.size, 0))
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        if header != (_MAGIC, self.slots, _SLOT_SIZE, self.places):
+            os.close(self._fd)
+            raise ValueError(f"{path} has a different layout {header[1:]}; remove it or change SHARED_CACHE_PATH")
+        self._mm = mmap.mmap(self._fd, size)
+        self._index: Dict[str, int] = {}  # symbol -> slot offset; slots never move
+        self._wanted: Dict[str, float] = {}  # last wanted_at this worker wrote
+        self._writer_fd: Optional[int] = None
+        self.torn_reads = 0
+
+    # Election -----------------------------------------------------------------
+    @property
+    def is_writer(self) -> bool:
+        return self._writer_fd is not None
+
+    def try_become_writer(self) -> bool:
+        if self._writer_fd is None:
+            fd = os.open(self.path + ".writer", os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._writer_fd = fd
+            logger.info("pid %s is the shared price cache writer", os.getpid())
+        return True
+
+    def close(self) -> None:
+        if self._writer_fd is not None:
+            os.close(self._writer_fd)  # releases the flock: another worker takes over
+            self._writer_fd = None
+        self._mm.close()
+        os.close(self._fd)
+
+    # Slots --------------------------------------------------------------------
+    def _key(self, symbol: str) -> bytes:
+        return symbol.encode("ascii", "replace")[:32].ljust(32, b"\0")
+
+    def _probe(self, key: bytes) -> Tuple[Optional[int], Optional[int]]:
+        """(offset of the symbol's slot, offset of the first free slot on its probe path)."""
+        mask = self.slots - 1
+        i = zlib.crc32(key) & mask
+        for _ in range(self.slots):
+            off = _HEADER_SIZE + i * _SLOT_SIZE
+            found = self._mm[off + _SYMBOL_AT:off + _SYMBOL_AT + 32]
+            if found == key:
+                return off, None
+            if found[0] == 0:
+                return None, off
+            i = (i + 1) & mask
+        return None, None
+
+    def _slot(self, symbol: str, claim: bool) -> Optional[int]:
+        off = self._index.get(symbol)
+        if off is not None:
+            return off
+        key = self._key(symbol)
+        off, free = self._probe(key)
+        if off is None and claim and free is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)  # claims from several workers
+            try:
+                off, free = self._probe(key)
+                if off is None and free is not None:
+                    _SYMBOL.pack_into(self._mm, free + _SYMBOL_AT, key)
+                    off = free
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        if off is not None:
+            self._index[symbol] = off
+        return off
+
+    def read(self, symbol: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """(snapshot, age_seconds) as last published, or None when never published."""
+        off = self._slot(symbol, claim=False)
+        if off is None:
+            return None
+        mm = self._mm
+        for _ in range(_READ_RETRIES):
+            seq = _SEQ.unpack_from(mm, off)[0]
+            if seq & 1:
+                continue  # write in progress
+            data = _DATA.unpack_from(mm, off + _DATA_AT)
+            if _SEQ.unpack_from(mm, off)[0] == seq:
+                break
+            self.torn_reads += 1
+        else:
+            return None
+        if seq == 0:
+            return None
+        stored_at, ts, now, avg, vwap = data
+        p = self.places
+        snap = {
+            "symbol": symbol,
+            "price_now": to_decimal_exact(now, p),
+            "price_avg": to_decimal_exact(avg, p),
+            "price_vwap": to_decimal_exact(vwap, p),
+            "timestamp": ts,
+        }
+        return snap, max(0.0, time.monotonic() - stored_at)
+
+    def want(self, symbol: str) -> bool:
+        """Ask the writer to keep `symbol` fresh (rate-limited per worker); False if the table is full."""
+        off = self._slot(symbol, claim=True)
+        if off is None:
+            return False
+        now = time.monotonic()
+        if now - self._wanted.get(symbol, 0.0) >= _WANT_EVERY:
+            self._wanted[symbol] = now
+            _WANTED.pack_into(self._mm, off + _WANTED_AT, now)  # a hint: not under the seqlock
+            self._push(off)
+        return True
+
+    def _push(self, off: int) -> None:
+        mm = self._mm
+        fcntl.flock(self._fd, fcntl.LOCK_EX)  # pushes from several workers
+        try:
+            head = _SEQ.unpack_from(mm, _RING_HEAD_AT)[0]
+            _RING.pack_into(mm, self._ring_at + (head % _RING_SIZE) * _RING.size, (off - _HEADER_SIZE) // _SLOT_SIZE)
+            _SEQ.pack_into(mm, _RING_HEAD_AT, head + 1)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def ring_head(self) -> int:
+        return _SEQ.unpack_from(self._mm, _RING_HEAD_AT)[0]
+
+    def drain(self, cursor: int) -> Tuple[int, Optional[List[int]]]:
+        """(new cursor, slot offsets pushed since `cursor`); None when the ring overflowed meanwhile."""
+        head = self.ring_head()
+        if head - cursor > _RING_SIZE:
+            return head, None
+        mm, at = self._mm, self._ring_at
+        return head, [_HEADER_SIZE + _RING.unpack_from(mm, at + (i % _RING_SIZE) * _RING.size)[0] * _SLOT_SIZE
+                      for i in range(cursor, head)]
+
+    def fail(self, symbol: str) -> None:
+        """Writer: record that refreshing `symbol` just failed (a hint, like wanted_at)."""
+        off = self._slot(symbol, claim=True)
+        if off is not None:
+            _WANTED.pack_into(self._mm, off + _FAILED_AT, time.monotonic())
+
+    def failure_age(self, symbol: str) -> Optional[float]:
+        """Seconds since the writer's last failed refresh, unless a publish came after it."""
+        off = self._slot(symbol, claim=False)
+        if off is None:
+            return None
+        failed_at = _WANTED.unpack_from(self._mm, off + _FAILED_AT)[0]
+        if not failed_at or failed_at <= _DATA.unpack_from(self._mm, off + _DATA_AT)[0]:
+            return None
+        return max(0.0, time.monotonic() - failed_at)
+
+    def signal(self) -> None:
+        """Wake the writer (lost increments between workers are fine: any change wakes it)."""
+        _SEQ.pack_into(self._mm, _SIGNAL_AT, _SEQ.unpack_from(self._mm, _SIGNAL_AT)[0] + 1)
+
+    def signalled(self) -> int:
+        return _SEQ.unpack_from(self._mm, _SIGNAL_AT)[0]
+
+    def publish(self, snap: Dict[str, Any]) -> bool:
+        """Store a snapshot; writer only. False when it doesn't fit (table full, int64 overflow)."""
+        scale = 10 ** self.places
+        try:
+            values = [int(Decimal(snap[k]) * scale) for k in ("price_now", "price_avg", "price_vwap")]
+        except (ArithmeticError, ValueError, TypeError):
+            return False
+        if any(abs(v) > _INT64_MAX for v in values):
+            return False
+        off = self._slot(snap["symbol"], claim=True)
+        if off is None:
+            return False
+        mm = self._mm
+        seq = _SEQ.unpack_from(mm, off)[0]
+        if seq & 1:
+            seq += 1  # a previous writer died mid-write
+        _SEQ.pack_into(mm, off, seq + 1)
+        _DATA.pack_into(mm, off + _DATA_AT, time.monotonic(), int(snap["timestamp"]), *values)
+        _SEQ.pack_into(mm, off, seq + 2)
+        return True
+
+    def wanted(self, within: float, offsets: Optional[Iterable[int]] = None) -> List[Tuple[int, str, float]]:
+        """(slot offset, symbol, data age; inf: none) of the slots (default: all) some worker
+        asked for in the last `within` seconds."""
+        now = time.monotonic()
+        mm = self._mm
+        if offsets is None:
+            offsets = range(_HEADER_SIZE, self._ring_at, _SLOT_SIZE)
+        out = []
+        for off in offsets:
+            wanted_at = _WANTED.unpack_from(mm, off + _WANTED_AT)[0]
+            if wanted_at and now - wanted_at <= within:
+                symbol = mm[off + _SYMBOL_AT:off + _SYMBOL_AT + 32].rstrip(b"\0").decode("ascii", "replace")
+                seq = _SEQ.unpack_from(mm, off)[0]
+                stored_at = _DATA.unpack_from(mm, off + _DATA_AT)[0]
+                out.append((off, symbol, now - stored_at if seq else float("inf")))
+        return out
+
+    def used(self) -> int:
+        mm = self._mm
+        return sum(1 for i in range(self.slots) if mm[_HEADER_SIZE + i * _SLOT_SIZE + _SYMBOL_AT] != 0)
+
+
+class SharedPriceCache:
+    """Per-worker side of the shared table: election, follower waits, writer refresh loop."""
+
+    def __init__(self, refresh: Refresh, *, path: Optional[str] = None, ttl: Optional[float] = None,
+                 wait: Optional[float] = None, idle: Optional[float] = None) -> None:
+        self._refresh = refresh
+        self.path = path or config.SHARED_CACHE_PATH
+        self.ttl = ttl or config.PRICE_CACHE_TTL_SECONDS
+        self.wait_seconds = config.SHARED_CACHE_WAIT_SECONDS if wait is None else wait
+        self.idle = idle or config.SHARED_CACHE_IDLE_SECONDS
+        self.store: Optional[SharedPriceStore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._active: Set[int] = set()  # writer: offsets of the slots followers want
+        self.counters: Dict[str, int] = {"hits": 0, "waits": 0, "wait_timeouts": 0, "wait_failures": 0,
+                                         "stale": 0, "published": 0, "refreshes": 0, "refresh_errors": 0,
+                                         "full_scans": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
+
+    @property
+    def following(self) -> bool:
+        """True when another worker is the writer (so this one should wait for it)."""
+        return self.store is not None and not self.store.is_writer
+
+    def get(self, symbol: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """A snapshot younger than the TTL, from whichever worker published it."""
+        store = self.store
+        if store is None:
+            return None
+        store.want(symbol)
+        got = store.read(symbol)
+        if got is not None and got[1] <= self.ttl:
+            self.counters["hits"] += 1
+            return got
+        return None
+
+    def stale(self, symbol: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """The last published snapshot up to PRICE_STALE_MAX_SECONDS old (upstream unavailable)."""
+        store = self.store
+        if store is None:
+            return None
+        got = store.read(symbol)
+        if got is not None and got[1] <= config.PRICE_STALE_MAX_SECONDS:
+            self.counters["stale"] += 1
+            return got
+        return None
+
+    async def wait(self, symbol: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Follower: wait for the writer to publish `symbol`.
+
+        None after SHARED_CACHE_WAIT_SECONDS, or as soon as the writer's latest
+        refresh of it (within one TTL) failed.
+        """
+        store = self.store
+        if store is None or not store.want(symbol):
+            return None
+        self.counters["waits"] += 1
+        store.signal()
+        deadline = time.monotonic() + self.wait_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(_POLL_SECONDS)
+            got = store.read(symbol)
+            if got is not None and got[1] <= self.ttl:
+                return got
+            failed = store.failure_age(symbol)
+            if failed is not None and failed <= self.ttl:
+                self.counters["wait_failures"] += 1
+                return None
+        self.counters["wait_timeouts"] += 1
+        return None
+
+    def publish(self, snap: Dict[str, Any]) -> None:
+        store = self.store
+        if store is not None and store.is_writer and store.publish(snap):
+            self.counters["published"] += 1
+
+    async def _refresh_one(self, symbol: str, sem: asyncio.Semaphore) -> None:
+        async with sem:
+            try:
+                await self._refresh(symbol)
+                self.counters["refreshes"] += 1
+            except Exception as e:
+                self.counters["refresh_errors"] += 1
+                if self.store is not None:
+                    self.store.fail(symbol)
+                logger.warning("shared cache refresh of %s failed: %s", symbol, e)
+
+    async def _run(self) -> None:
+        sem = asyncio.Semaphore(config.PRICE_BATCH_CONCURRENCY)
+        tick = max(0.05, self.ttl / 4)
+        next_scan, seen = 0.0, -1
+        cursor: Optional[int] = None  # ring position; None until this worker is the writer
+        while True:
+            store = self.store
+            if store is not None and store.try_become_writer():
+                now = time.monotonic()
+                signal = store.signalled()
+                # A pass every tick, or right away when a follower is waiting
+                if now >= next_scan or signal != seen:
+                    next_scan, seen = now + tick, signal
+                    pushed: Optional[List[int]] = None
+                    if cursor is not None:
+                        cursor, pushed = store.drain(cursor)
+                    if pushed is None:
+                        # Just elected, or the ring wrapped before we drained it: look at every slot
+                        cursor = store.ring_head()
+                        self._active.clear()
+                        self.counters["full_scans"] += 1
+                    else:
+                        self._active.update(pushed)
+                    wanted = store.wanted(self.idle, None if pushed is None else list(self._active))
+                    self._active = {off for off, _, _ in wanted}  # idle ones drop out
+                    # Refresh what followers are asking for before their snapshots expire
+                    due = [sym for _, sym, age in wanted if age >= self.ttl * 0.8]
+                    if due:
+                        await asyncio.gather(*(self._refresh_one(sym, sem) for sym in due))
+                await asyncio.sleep(_WRITER_POLL_SECONDS)
+            else:
+                cursor = None
+                await asyncio.sleep(tick)
+
+    async def start(self) -> None:
+        if not config.SHARED_CACHE_ENABLED or self._task is not None:
+            return
+        try:
+            self.store = SharedPriceStore(self.path)
+        except (OSError, ValueError) as e:
+            logger.warning("shared price cache disabled: %s", e)
+            return
+        self.store.try_become_writer()
+        self._task = asyncio.create_task(self._run(), name="shared-price-cache")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        store, self.store = self.store, None
+        if store is not None:
+            store.close()
+
+    def stats(self) -> Dict[str, Any]:
+        store = self.store
+        if store is None:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "path": self.path,
+            "writer": store.is_writer,
+            "pid": os.getpid(),
+            "slots": store.slots,
+            "used": store.used(),
+            "wanted": len(self._active),
+            "torn_reads": store.torn_reads,
+            **self.counters,
+        }
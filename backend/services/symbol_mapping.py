@@ -3,30 +3,34 @@ Helpers to resolve alphaId -> trading symbol.
 
 Rules:
 - If alphaId looks like a trading symbol already (ends with suffix like USDT), use as-is.
-- Else, try to map via local data file backend/data/alpha_tokens.json if present.
+- Else, try to map via local data file backend/data/alpha_tokens.json if present
+  (read from the shared token registry, reloaded when the file changes).
 - Else, treat alphaId as base token symbol and append suffix from config (default USDT).
+
+Results are memoized per input until the token registry swaps in a new snapshot.
+symbol_index answers "is this a symbol worth asking the upstream about" in O(1):
+once the remote token list is loaded, symbols it doesn't list are rejected, and
+symbols the upstream reported as not found are rejected until their negative
+entry expires.
 """
-import json
-import os
-from typing import Optional
+import re
+from typing import Any, Dict, FrozenSet, Optional
 
 from backend.config import config
+from backend.core import metrics
+from backend.core.cache import TTLCache
+from backend.services.alpha_token_service import token_registry
+from backend.services.binance_client import SymbolNotFound
+from backend.services.token_registry import TokenSnapshot
 
-DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "alpha_tokens.json")
-
-
-def _load_local_tokens() -> dict:
-    path = os.path.normpath(DATA_FILE)
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except Exception:
-                return {}
-    return {}
+# Trading symbols are plain upper-case names; they also become directory names (trade store)
+SYMBOL_RE = re.compile(r"[A-Z0-9_]+")
+_memo: Dict[str, Optional[str]] = {}
+_memo_stats: Dict[str, int] = {"resolved": 0, "invalidations": 0}
+_MISSING = object()
 
 
-def resolve_symbol(alpha_id: str) -> Optional[str]:
+def _resolve(alpha_id: str) -> Optional[str]:
     if not alpha_id:
         return None
     aid = alpha_id.strip().upper()
@@ -35,12 +39,102 @@ def resolve_symbol(alpha_id: str) -> Optional[str]:
         return aid
 
     # 2) Local mapping file: expects entries like {"ALPHA_118": "KOGE"}
-    local_map = _load_local_tokens()
-    base = None
-    if aid in local_map:
-        base = str(local_map[aid]).strip().upper()
-    else:
-        # Maybe the alpha_id is already a base symbol like KOGE
-        base = aid
+    local_map = token_registry.snapshot.local_map
+    # Maybe the alpha_id is already a base symbol like KOGE
+    base = local_map.get(aid, aid)
     return f"{base}{config.ALPHA_SYMBOL_SUFFIX.upper()}"
 
+
+def resolve_symbol(alpha_id: str) -> Optional[str]:
+    symbol = _memo.get(alpha_id, _MISSING)
+    if symbol is not _MISSING:
+        return symbol
+    symbol = _resolve(alpha_id)
+    if len(_memo) >= config.RESOLVE_CACHE_MAX_ENTRIES:
+        _memo.clear()
+    _memo[alpha_id] = symbol
+    _memo_stats["resolved"] += 1
+    return symbol
+
+
+def valid_symbol(symbol: str) -> bool:
+    return SYMBOL_RE.fullmatch(symbol) is not None
+
+
+class SymbolIndex:
+    """Trading symbols the token registry knows, plus a TTL negative cache.
+
+    Only a non-empty list from the remote source is authoritative: without one
+    (no source configured, first load fell back to the local file) nothing is
+    rejected for being unlisted, so manually entered symbols still reach the
+    upstream. The negative cache applies either way.
+    """
+
+    def __init__(self, negative_ttl: Optional[float] = None, negative_max: Optional[int] = None) -> None:
+        self.enabled = config.SYMBOL_VALIDATION_ENABLED
+        self._known: FrozenSet[str] = frozenset()
+        self._negative = TTLCache(negative_ttl or config.SYMBOL_NEGATIVE_TTL_SECONDS,
+                                  negative_max or config.SYMBOL_NEGATIVE_MAX_ENTRIES)
+        self.counters: Dict[str, int] = {"rejected_unlisted": 0, "rejected_not_found": 0, "not_found": 0}
+
+    def rebuild(self, snap: TokenSnapshot) -> None:
+        if not (snap.remote and snap.tokens):
+            self._known = frozenset()
+            return
+        suffix = config.ALPHA_SYMBOL_SUFFIX.upper()
+        known = set(snap.by_symbol)
+        known.update(aid + suffix for aid in snap.by_alpha_id)
+        known.update(k + suffix for k in snap.local_map)
+        known.update(v + suffix for v in snap.local_map.values())
+        known.update(s.strip().upper() for s in config.WS_SYMBOLS.split(",") if s.strip())
+        for symbol in known - self._known:
+            self._negative.pop(symbol)  # newly listed: ask the upstream again
+        self._known = frozenset(known)
+
+    def check(self, symbol: str) -> None:
+        """Raise SymbolNotFound unless the symbol may exist upstream."""
+        if not self.enabled:
+            return
+        if self._negative.get(symbol) is not None:
+            self.counters["rejected_not_found"] += 1
+            raise SymbolNotFound(f"Unknown symbol: {symbol}")
+        known = self._known
+        if known and symbol not in known:
+            self.counters["rejected_unlisted"] += 1
+            raise SymbolNotFound(f"Unknown symbol: {symbol}")
+
+    def not_found(self, symbol: str) -> None:
+        """Record an upstream "symbol not found" answer."""
+        if self.enabled:
+            self._negative.set(symbol, True)
+            self.counters["not_found"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "authoritative": bool(self._known),
+            "known_symbols": len(self._known),
+            "negative_entries": len(self._negative),
+            "negative_ttl_seconds": self._negative.ttl,
+            **self.counters,
+            "upstream_calls_avoided": self.counters["rejected_unlisted"] + self.counters["rejected_not_found"],
+            "resolve_memo": {"entries": len(_memo), **_memo_stats},
+        }
+
+
+symbol_index = SymbolIndex()
+
+
+def _on_snapshot(snap: TokenSnapshot) -> None:
+    """Registry listener: the mapping may have changed, so forget memoized results."""
+    _memo.clear()
+    _memo_stats["invalidations"] += 1
+    symbol_index.rebuild(snap)
+
+
+token_registry.add_listener(_on_snapshot)
+
+metrics.CallbackMetric("symbol_rejections_total", "Price requests rejected locally by the symbol index.",
+                       lambda: {("unlisted",): symbol_index.counters["rejected_unlisted"],
+                                ("not_found",): symbol_index.counters["rejected_not_found"]},
+                       kind="counter", labelnames=("reason",))
@@ -0,0 +1,221 @@
+"""
+In-memory Alpha token registry shared by the token list API and symbol mapping.
+
+Tokens are AlphaToken records (__slots__, three strings) rather than dicts.
+The registry holds an immutable snapshot (token list, local alphaId mapping,
+O(1) indexes, pre-encoded JSON body and its ETag). Refreshes build a new
+snapshot off to the side and swap the reference in one assignment, so readers
+never observe a half-built index.
+
+- The remote/configured list is reloaded every config.TOKEN_REFRESH_SECONDS.
+- The local mapping file is reloaded when its mtime changes
+  (polled every config.TOKEN_FILE_POLL_SECONDS).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from backend.config import config
+from backend.core.http_client import PRIORITY_BACKGROUND, upstream_priority
+from backend.core.json_codec import dumps
+
+logger = logging.getLogger("app.token_registry")
+
+class AlphaToken:
+    """One listed token. Serialized as {"symbol", "alphaId"[, "name"]}."""
+
+    __slots__ = ("symbol", "alpha_id", "name")
+
+    def __init__(self, symbol: str, alpha_id: str, name: Optional[str] = None) -> None:
+        self.symbol = symbol
+        self.alpha_id = alpha_id
+        self.name = name
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "AlphaToken":
+        return cls(d["symbol"], d["alphaId"], d.get("name"))
+
+    def to_dict(self) -> Dict[str, str]:
+        d = {"symbol": self.symbol, "alphaId": self.alpha_id}
+        if self.name:
+            d["name"] = self.name
+        return d
+
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not AlphaToken:
+            return NotImplemented
+        return (self.symbol, self.alpha_id, self.name) == (other.symbol, other.alpha_id, other.name)
+
+    def __repr__(self) -> str:
+        return f"AlphaToken(symbol={self.symbol!r}, alpha_id={self.alpha_id!r}, name={self.name!r})"
+
+
+class RemoteTokenList(list):
+    """Token list fetched from the remote source. Only such a list is complete
+    enough to reject symbols it doesn't carry (local files are partial)."""
+
+
+Loader = Callable[..., Awaitable[List[AlphaToken]]]
+
+
+class TokenSnapshot:
+    __slots__ = ("tokens", "local_map", "by_alpha_id", "by_base", "by_symbol",
+                 "body", "etag", "loaded_at", "version", "remote")
+
+    def __init__(self, tokens: List[AlphaToken], local_map: Dict[str, str], version: int) -> None:
+        suffix = config.ALPHA_SYMBOL_SUFFIX.upper()
+        self.tokens = tokens
+        self.local_map = local_map
+        self.by_alpha_id: Dict[str, AlphaToken] = {}
+        self.by_base: Dict[str, AlphaToken] = {}
+        self.by_symbol: Dict[str, AlphaToken] = {}
+        for t in tokens:
+            base = t.symbol.strip().upper()
+            self.by_alpha_id.setdefault(t.alpha_id.strip().upper(), t)
+            self.by_base.setdefault(base, t)
+            self.by_symbol.setdefault(f"{base}{suffix}", t)
+        self.body = dumps([t.to_dict() for t in tokens])
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest() + '"'
+        self.loaded_at = time.time()
+        self.version = version
+        self.remote = isinstance(tokens, RemoteTokenList)
+
+
+def read_local_map(path: str) -> Dict[str, str]:
+    """Local alphaId -> base symbol mapping, keys upper-cased. Missing/invalid file -> {}."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.error("alpha tokens mapping load failed %s: %s", path, e)
+        return {}
+    if not isinstance(raw, dict):
+        return {}
+    return {str(k).strip().upper(): str(v).strip().upper() for k, v in raw.items()}
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class TokenRegistry:
+    def __init__(self, loader: Loader, local_file: str) -> None:
+        self._loader = loader
+        self.local_file = os.path.normpath(local_file)
+        self._snapshot: Optional[TokenSnapshot] = None
+        self._tokens: Optional[List[AlphaToken]] = None  # None until the list was loaded once
+        self._local_mtime: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._version = 0
+        self._listeners: List[Callable[[TokenSnapshot], None]] = []
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    # Readers --------------------------------------------------------------
+    @property
+    def snapshot(self) -> TokenSnapshot:
+        """Current snapshot; sync callers get at least the local mapping."""
+        snap = self._snapshot
+        if snap is None:
+            self._local_mtime = _mtime(self.local_file)
+            snap = self._swap(self._tokens or [], read_local_map(self.local_file))
+        return snap
+
+    async def get_snapshot(self) -> TokenSnapshot:
+        """Current snapshot, loading the token list on first use."""
+        if self._tokens is None:
+            await self.refresh()
+        return self.snapshot
+
+    # Refresh ----------------------------------------------------------------
+    def add_listener(self, fn: Callable[[TokenSnapshot], None]) -> None:
+        """Call fn(snapshot) after every swap (derived indexes rebuild here)."""
+        self._listeners.append(fn)
+
+    def _swap(self, tokens: List[AlphaToken], local_map: Dict[str, str]) -> TokenSnapshot:
+        self._version += 1
+        snap = TokenSnapshot(tokens, local_map, self._version)
+        self._snapshot = snap  # single reference assignment: atomic for readers
+        for fn in self._listeners:
+            try:
+                fn(snap)
+            except Exception as e:
+                logger.error("token registry listener failed: %s", e)
+        return snap
+
+    async def refresh(self) -> TokenSnapshot:
+        """Reload the token list (and the local file) and swap in a new snapshot."""
+        async with self._lock:
+            first = self._tokens is None
+            try:
+                # After the first load, keep the previous list if the source fails
+                tokens = await self._loader(raise_on_error=not first)
+            except Exception as e:
+                self.refresh_errors += 1
+                logger.warning("token registry refresh failed, keeping previous list: %s", e)
+                tokens = self._tokens or []
+            self._tokens = tokens
+            self._local_mtime = _mtime(self.local_file)
+            self.refreshes += 1
+            return self._swap(tokens, read_local_map(self.local_file))
+
+    def reload_local_if_changed(self) -> bool:
+        mtime = _mtime(self.local_file)
+        if mtime == self._local_mtime:
+            return False
+        self._local_mtime = mtime
+        self._swap(self._tokens or [], read_local_map(self.local_file))
+        logger.info("alpha tokens mapping reloaded from %s", self.local_file)
+        return True
+
+    async def _run(self) -> None:
+        next_remote = time.monotonic() + config.TOKEN_REFRESH_SECONDS
+        while True:
+            await asyncio.sleep(config.TOKEN_FILE_POLL_SECONDS)
+            try:
+                if time.monotonic() >= next_remote:
+                    next_remote = time.monotonic() + config.TOKEN_REFRESH_SECONDS
+                    with upstream_priority(PRIORITY_BACKGROUND):
+                        await self.refresh()
+                else:
+                    self.reload_local_if_changed()
+            except Exception as e:
+                logger.error("token registry background refresh error: %s", e)
+
+    async def start(self) -> None:
+        await self.refresh()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="token-registry")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        snap = self._snapshot
+        return {
+            "loaded": self._tokens is not None,
+            "tokens": len(snap.tokens) if snap else 0,
+            "local_mappings": len(snap.local_map) if snap else 0,
+            "version": snap.version if snap else 0,
+            "remote": snap.remote if snap else False,
+            "etag": snap.etag if snap else None,
+            "loaded_at": snap.loaded_at if snap else None,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+        }
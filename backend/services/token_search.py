@@ -0,0 +1,136 @@
+"""
+Token search over the registry snapshot: exact, prefix and fuzzy (trigram) matching
+on symbol, alphaId and name.
+
+The index is built once per registry snapshot (see token_registry listeners):
+- exact: dict key -> token positions
+- prefix: one sorted key array with a parallel array of token positions; a query
+  is a bisect range scan
+- fuzzy: trigram -> token positions over symbol and name (alphaIds share the
+  ALPHA_ prefix, so prefix search covers them)
+"""
+import bisect
+import heapq
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.services.token_registry import AlphaToken
+
+# Ranking by match kind and field (higher is better)
+_EXACT = {"symbol": 100.0, "alphaId": 95.0, "name": 90.0}
+_PREFIX = {"symbol": 80.0, "alphaId": 70.0, "name": 60.0}
+_FUZZY_MAX = 50.0
+_FUZZY_MIN_SIMILARITY = 0.3
+# (field name in results, AlphaToken attribute)
+_FIELDS = (("symbol", "symbol"), ("alphaId", "alpha_id"), ("name", "name"))
+
+
+def _trigrams(s: str) -> List[str]:
+    return [s[i:i + 3] for i in range(len(s) - 2)]
+
+
+class TokenSearchIndex:
+    def __init__(self, tokens: List[AlphaToken], version: int = 0) -> None:
+        self.tokens = tokens
+        self.version = version
+        self._exact: Dict[str, List[Tuple[int, str]]] = {}
+        pairs: List[Tuple[str, int, str]] = []
+        grams: Dict[str, set] = {}
+        self._gram_count: List[int] = []
+        for i, t in enumerate(tokens):
+            token_grams = set()
+            for field, attr in _FIELDS:
+                val = (getattr(t, attr) or "").strip().upper()
+                if not val:
+                    continue
+                self._exact.setdefault(val, []).append((i, field))
+                pairs.append((val, i, field))
+                if field != "alphaId":
+                    token_grams.update(_trigrams(val))
+            for g in token_grams:
+                grams.setdefault(g, set()).add(i)
+            self._gram_count.append(len(token_grams))
+        pairs.sort()
+        self._keys = [p[0] for p in pairs]
+        self._refs = [(p[1], p[2]) for p in pairs]
+        self._grams = {g: tuple(sorted(ids)) for g, ids in grams.items()}
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def _prefix(self, q: str, scores: Dict[int, float]) -> None:
+        lo = bisect.bisect_left(self._keys, q)
+        hi = bisect.bisect_left(self._keys, q + "\uffff")
+        for j in range(lo, hi):
+            i, field = self._refs[j]
+            # Shorter keys rank higher among prefix matches
+            score = _PREFIX[field] + len(q) / len(self._keys[j])
+            if score > scores.get(i, 0.0):
+                scores[i] = score
+
+    def _fuzzy(self, q: str, scores: Dict[int, float]) -> None:
+        q_grams = set(_trigrams(q))
+        if not q_grams:
+            return
+        hits: Dict[int, int] = {}
+        for g in q_grams:
+            for i in self._grams.get(g, ()):
+                hits[i] = hits.get(i, 0) + 1
+        n = len(q_grams)
+        for i, shared in hits.items():
+            # Dice coefficient over trigram sets
+            sim = 2.0 * shared / (n + self._gram_count[i])
+            if sim < _FUZZY_MIN_SIMILARITY:
+                continue
+            score = _FUZZY_MAX * sim
+            if score > scores.get(i, 0.0):
+                scores[i] = score
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        q = (query or "").strip().upper()
+        scores: Dict[int, float] = {}
+        if q:
+            for i, field in self._exact.get(q, ()):
+                scores[i] = max(scores.get(i, 0.0), _EXACT[field])
+            self._prefix(q, scores)
+            # Every page scores the same candidate set, so total and page boundaries are stable
+            self._fuzzy(q, scores)
+            # Only the requested page needs ordering: O(n log k) instead of a full sort
+            tokens = self.tokens
+            top = heapq.nsmallest(offset + limit, scores,
+                                  key=lambda i: (-scores[i], len(tokens[i].symbol), tokens[i].symbol))
+            page, total = top[offset:], len(scores)
+        else:
+            page, total = list(range(offset, min(offset + limit, len(self.tokens)))), len(self.tokens)
+        return {
+            "query": query,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "items": [{**self.tokens[i].to_dict(), "score": round(scores.get(i, 0.0), 3)} for i in page],
+        }
+
+
+_index: Optional[TokenSearchIndex] = None
+
+
+def rebuild_index(tokens: List[AlphaToken], version: int = 0) -> TokenSearchIndex:
+    global _index
+    _index = TokenSearchIndex(tokens, version)
+    return _index
+
+
+def on_snapshot(snap) -> None:
+    """Registry listener: rebuild only when the token list itself changed."""
+    idx = _index
+    if idx is not None and idx.tokens is snap.tokens:
+        idx.version = snap.version
+        return
+    rebuild_index(snap.tokens, snap.version)
+
+
+def get_index(tokens: List[AlphaToken], version: int) -> TokenSearchIndex:
+    """Index for the given snapshot's token list (built on demand if a refresh raced ahead)."""
+    idx = _index
+    if idx is None or idx.tokens is not tokens:
+        idx = rebuild_index(tokens, version)
+    return idx
@@ -0,0 +1,218 @@
+"""
+Per-symbol bounded trade windows with incremental last/avg/vwap.
+
+Each buffer keeps the newest `capacity` trades ordered by aggregate trade id.
+Inserts are deduplicated by id before any parsing, and the running sums
+(sum p, sum p*q, sum q) are updated as trades enter and fall out of the
+window, so metrics() is O(1) and only new trades get parsed.
+
+Trades are stored in TradeColumns (parallel int64 arrays: id, time, price, qty
+as fixed-point ints at one price scale and one quantity scale per buffer), so
+the running sums are exact and a window costs ~32 bytes per trade. Id lookups
+bisect the sorted id column instead of keeping a separate set.
+Results are identical to alpha_price_service._aggregate_prices_decimal over the
+same window: Decimal is only built for the final divisions, and whenever the
+reference's 36-digit sums would have rounded (or a value is negative) the
+buffer replays the reference loop over the window instead.
+"""
+from bisect import bisect_left
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+from backend.config import config
+from backend.core.fixed_point import fits_precision, pow10, to_decimal_exact
+from backend.core.precision import quantize
+from backend.services.binance_client import AggTrade, TradeColumns, trade_time
+
+_ZERO = Decimal("0")
+_INT64_MAX = 2 ** 63 - 1
+
+
+def _agg_id(trade: AggTrade) -> Optional[int]:
+    try:
+        agg_id = int(trade.agg_id)
+    except (TypeError, ValueError):
+        return None
+    return agg_id if -_INT64_MAX <= agg_id <= _INT64_MAX else None
+
+
+def _metrics(last_p: Decimal, count: int, sum_p: Decimal, sum_pq: Decimal, sum_q: Decimal) -> Dict[str, Decimal]:
+    avg = sum_p / Decimal(count)
+    vwap = (sum_pq / sum_q) if sum_q > 0 else last_p
+    return {
+        "last": quantize(last_p),
+        "avg": quantize(avg),
+        "vwap": quantize(vwap),
+    }
+
+
+def fixed_metrics(last_p: int, p_scale: int, count: int,
+                  sum_p: int, sum_pq: int, sum_q: int, q_scale: int) -> Dict[str, Decimal]:
+    """last/avg/vwap from exact fixed-point sums (sum_pq is at p_scale + q_scale)."""
+    return _metrics(
+        to_decimal_exact(last_p, p_scale),
+        count,
+        to_decimal_exact(sum_p, p_scale),
+        to_decimal_exact(sum_pq, p_scale + q_scale),
+        to_decimal_exact(sum_q, q_scale),
+    )
+
+
+class TradeRingBuffer:
+    __slots__ = ("capacity", "_cols", "_head", "_sum_p", "_sum_pq", "_sum_q", "_negatives", "_metrics")
+
+    def __init__(self, capacity: Optional[int] = None) -> None:
+        self.capacity = capacity or config.TRADE_BUFFER_CAPACITY
+        # Window rows are _cols[_head:], sorted by agg id; evicted rows are
+        # dropped from the arrays in bulk once they make up half of them.
+        self._cols = TradeColumns()
+        self._head = 0
+        self._sum_p = 0
+        self._sum_pq = 0
+        self._sum_q = 0
+        self._negatives = 0
+        self._metrics: Optional[Dict[str, Decimal]] = None
+
+    def __len__(self) -> int:
+        return len(self._cols) - self._head
+
+    @property
+    def last_id(self) -> Optional[int]:
+        return self._cols.agg_ids[-1] if len(self) else None
+
+    def trade_ids(self) -> List[int]:
+        return self._cols.agg_ids[self._head:].tolist()
+
+    def _contains(self, agg_id: int) -> bool:
+        ids = self._cols.agg_ids
+        if not len(self) or agg_id > ids[-1]:
+            return False  # the common case: a trade newer than the window
+        i = bisect_left(ids, agg_id, self._head)
+        return i < len(ids) and ids[i] == agg_id
+
+    def _rescale_sums(self, p_scale: int, q_scale: int) -> None:
+        fp = pow10(self._cols.price_scale - p_scale)
+        fq = pow10(self._cols.qty_scale - q_scale)
+        self._sum_p *= fp
+        self._sum_pq *= fp * fq
+        self._sum_q *= fq
+
+    def _evict(self) -> None:
+        cols, head = self._cols, self._head
+        old_p, old_q = cols.prices[head], cols.qtys[head]
+        self._sum_p -= old_p
+        self._sum_pq -= old_p * old_q
+        self._sum_q -= old_q
+        if old_p < 0 or old_q < 0:
+            self._negatives -= 1
+        head += 1
+        if head >= 32 and 2 * head >= len(cols):
+            cols.drop_front(head)
+            head = 0
+        self._head = head
+
+    def add(self, trades: Iterable[AggTrade]) -> int:
+        """Insert trades (any order); returns how many were new. Trades without an id are skipped."""
+        cols = self._cols
+        ids = cols.agg_ids
+        full = len(self) >= self.capacity
+        fresh: Dict[int, AggTrade] = {}
+        for t in trades:
+            agg_id = _agg_id(t)
+            if agg_id is None or agg_id in fresh or self._contains(agg_id):
+                continue
+            if full and agg_id < ids[self._head]:
+                continue  # older than the whole window
+            fresh[agg_id] = t
+        if not fresh:
+            return 0
+        # Only new trades are parsed, all at once
+        scales = (cols.price_scale, cols.qty_scale)
+        prices, qtys = cols.parse(list(fresh.values()))
+        if scales != (cols.price_scale, cols.qty_scale):
+            self._rescale_sums(*scales)
+        added = 0
+        for (agg_id, t), p, q in zip(fresh.items(), prices, qtys):
+            size = len(self)
+            ids = cols.agg_ids
+            if size >= self.capacity and agg_id < ids[self._head]:
+                continue  # the window moved past it during this batch
+            if not size or agg_id > ids[-1]:
+                cols.append(agg_id, trade_time(t), p, q)
+            else:
+                # Late trade: insert at its slot to keep ids sorted
+                cols.insert(bisect_left(ids, agg_id, self._head), agg_id, trade_time(t), p, q)
+            self._sum_p += p
+            self._sum_pq += p * q
+            self._sum_q += q
+            if p < 0 or q < 0:
+                self._negatives += 1
+            if size + 1 > self.capacity:
+                self._evict()
+            added += 1
+        if added:
+            self._metrics = None
+        return added
+
+    def _reference_metrics(self) -> Dict[str, Decimal]:
+        """The reference Decimal loop, in window order (its sums may round)."""
+        cols = self._cols
+        sum_p = sum_pq = sum_q = _ZERO
+        p = _ZERO
+        for _, _, pi, qi in cols.trades(self._head):
+            p = to_decimal_exact(pi, cols.price_scale)
+            q = to_decimal_exact(qi, cols.qty_scale)
+            sum_p += p
+            sum_pq += p * q
+            sum_q += q
+        return _metrics(p, len(self), sum_p, sum_pq, sum_q)
+
+    def metrics(self) -> Dict[str, Decimal]:
+        if not len(self):
+            raise ValueError("No trades available for aggregation")
+        if self._metrics is not None:
+            return self._metrics
+        # Non-negative terms: partial sums never exceed the totals checked here
+        exact = not self._negatives and fits_precision(self._sum_p) and \
+            fits_precision(self._sum_pq) and fits_precision(self._sum_q)
+        cols = self._cols
+        if exact:
+            self._metrics = fixed_metrics(cols.prices[-1], cols.price_scale, len(self),
+                                          self._sum_p, self._sum_pq, self._sum_q, cols.qty_scale)
+        else:
+            self._metrics = self._reference_metrics()
+        return self._metrics
+
+
+class TradeBufferRegistry:
+    """Symbol -> TradeRingBuffer, bounded by an LRU cap on the number of symbols."""
+
+    def __init__(self, capacity: Optional[int] = None, max_symbols: Optional[int] = None) -> None:
+        self.capacity = capacity or config.TRADE_BUFFER_CAPACITY
+        self.max_symbols = max_symbols or config.TRADE_BUFFER_MAX_SYMBOLS
+        self._buffers: "OrderedDict[str, TradeRingBuffer]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def get(self, symbol: str) -> Optional[TradeRingBuffer]:
+        buf = self._buffers.get(symbol)
+        if buf is not None:
+            self._buffers.move_to_end(symbol)
+        return buf
+
+    def ingest(self, symbol: str, trades: Iterable[AggTrade]) -> TradeRingBuffer:
+        buf = self.get(symbol)
+        if buf is None:
+            buf = self._buffers[symbol] = TradeRingBuffer(self.capacity)
+            while len(self._buffers) > self.max_symbols:
+                self._buffers.popitem(last=False)
+        buf.add(trades)
+        return buf
+
+    def drop(self, symbol: str) -> None:
+        self._buffers.pop(symbol, None)
+
+
+trade_buffers = TradeBufferRegistry()
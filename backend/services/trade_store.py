@@ -0,0 +1,588 @@
+"""
+On-disk trade history: per-symbol, time-partitioned columnar segments.
+
+Layout (one directory per symbol and partition of TRADE_STORE_SEGMENT_SECONDS):
+
+    <TRADE_STORE_DIR>/<SYMBOL>/<partition start ms>/
+        agg_id.i64  time.i64  price.i64  qty.i64   fixed-width int64 columns
+        index.i64                                  time of every _INDEX_STRIDE-th row
+        meta.json                                  price/qty scale, byte order
+
+Rows are appended in aggregate-id order (trades at or below the last stored id
+are dropped), so the time column is non-decreasing within a symbol. Prices and
+quantities are fixed-point ints at the segment's scales; a trade with more
+decimals widens the segment once (the price/qty files are rewritten).
+
+Writers buffer ingested trades per symbol and append them on flush (a
+background task, and before every query of that symbol). Several worker
+processes may share one store directory: appends to a symbol take an flock on
+<SYMBOL>/.lock and keep only trades newer than the last row on disk, so each
+trade is stored once and ids and times stay ordered. Readers mmap the
+columns: a range lookup bisects the small time index, then bisects only within
+one index block of the time column, and aggregates run over the mapped rows.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import mmap
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from decimal import Context, Decimal
+from operator import mul
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from backend.config import config
+from backend.core.fixed_point import pow10, to_decimal_exact
+from backend.core.precision import INTERMEDIATE_PREC, quantize
+from backend.services.binance_client import AggTrade, TradeColumns, trade_time
+
+logger = logging.getLogger("app.trade_store")
+
+DEFAULT_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "trades")
+COLUMNS = ("agg_id", "time", "price", "qty")
+_INDEX_STRIDE = 1024
+_INT64_MAX = 2 ** 63 - 1
+_SYMBOL_NAME = re.compile(r"[A-Z0-9_]+")
+# Queries may run in a worker thread, where getcontext() is not ours
+_CTX = Context(prec=INTERMEDIATE_PREC)
+
+
+def _read_meta(path: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_meta(path: str, meta: Dict[str, Any]) -> None:
+    tmp = os.path.join(path, "meta.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, "meta.json"))
+
+
+def _fits(*columns: List[int]) -> List[bool]:
+    return [all(-_INT64_MAX <= v <= _INT64_MAX for v in row) for row in zip(*columns)]
+
+
+class SegmentWriter:
+    """Append-only writer for one partition directory."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        meta = _read_meta(path)
+        if meta.get("byteorder", sys.byteorder) != sys.byteorder:
+            raise RuntimeError(f"segment {path} was written with {meta['byteorder']}-endian columns")
+        self.price_scale = meta.get("price_scale", 0)
+        self.qty_scale = meta.get("qty_scale", 0)
+        self._files = {name: open(os.path.join(path, f"{name}.i64"), "ab") for name in COLUMNS}
+        self._index = open(os.path.join(path, "index.i64"), "ab")
+        self.rows = min(os.path.getsize(os.path.join(path, f"{name}.i64")) for name in COLUMNS) // 8
+        self._repair()
+        if not meta:
+            self._save_meta()
+        self.key = SegmentReader._key(path)
+
+    def _repair(self) -> None:
+        """Cut columns back to their common length and rebuild the index if it disagrees
+        (a crash can interrupt an append between files)."""
+        for f in self._files.values():
+            f.truncate(self.rows * 8)
+        entries = -(-self.rows // _INDEX_STRIDE)
+        if os.path.getsize(os.path.join(self.path, "index.i64")) != entries * 8:
+            times = array("q")
+            with open(os.path.join(self.path, "time.i64"), "rb") as f:
+                times.frombytes(f.read(self.rows * 8))
+            self._index.truncate(0)
+            self._index.write(times[::_INDEX_STRIDE].tobytes())
+            self._index.flush()
+
+    def _save_meta(self) -> None:
+        _write_meta(self.path, {"price_scale": self.price_scale, "qty_scale": self.qty_scale,
+                                "byteorder": sys.byteorder, "index_stride": _INDEX_STRIDE})
+
+    def _widen(self, price_scale: int, qty_scale: int) -> None:
+        """Rewrite the price/qty columns at wider scales (rare)."""
+        for name, factor in (("price", pow10(price_scale - self.price_scale)),
+                             ("qty", pow10(qty_scale - self.qty_scale))):
+            if factor == 1:
+                continue
+            self._files[name].close()
+            target = os.path.join(self.path, f"{name}.i64")
+            col = array("q")
+            with open(target, "rb") as f:
+                col.frombytes(f.read(self.rows * 8))
+            values = [v * factor for v in col]
+            if not all(_fits(values)):
+                # Stored rows fit at the old scale but not at the new one: saturate them
+                logger.warning("trade store: %s values overflow at scale +%d in %s", name, factor, self.path)
+                values = [min(max(v, -_INT64_MAX), _INT64_MAX) for v in values]
+            widened = array("q", values)
+            with open(target + ".tmp", "wb") as f:
+                f.write(widened.tobytes())
+            os.replace(target + ".tmp", target)
+            self._files[name] = open(target, "ab")
+        self.price_scale, self.qty_scale = price_scale, qty_scale
+        self._save_meta()
+
+    def append(self, trades: List[AggTrade]) -> int:
+        """Append trades (already ordered by id); returns rows written."""
+        cols = TradeColumns()
+        cols.price_scale, cols.qty_scale = self.price_scale, self.qty_scale
+        prices, qtys = cols.parse(trades)
+        if (cols.price_scale, cols.qty_scale) != (self.price_scale, self.qty_scale):
+            self._widen(cols.price_scale, cols.qty_scale)
+        ids = [int(t.agg_id) for t in trades]
+        times = [trade_time(t) for t in trades]
+        try:
+            columns = [array("q", ids), array("q", times), array("q", prices), array("q", qtys)]
+        except OverflowError:
+            # Values beyond 64 bits can't be stored in this format; skip those rows
+            rows = [r for r, ok in zip(zip(ids, times, prices, qtys), _fits(prices, qtys)) if ok]
+            columns = [array("q", c) for c in zip(*rows)] if rows else [array("q") for _ in COLUMNS]
+        n = len(columns[0])
+        for name, col in zip(COLUMNS, columns):
+            self._files[name].write(col.tobytes())
+        first = -self.rows % _INDEX_STRIDE
+        index = columns[1][first::_INDEX_STRIDE]
+        if index:
+            self._index.write(index.tobytes())
+        self.rows += n
+        for f in self._files.values():
+            f.flush()
+        self._index.flush()
+        self.key = SegmentReader._key(self.path)
+        return n
+
+    def close(self) -> None:
+        for f in (*self._files.values(), self._index):
+            f.close()
+
+
+class SegmentReader:
+    """Memory-mapped, read-only view of a segment's columns."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        meta = _read_meta(path)
+        if meta.get("byteorder", sys.byteorder) != sys.byteorder:
+            raise RuntimeError(f"segment {path} was written with {meta['byteorder']}-endian columns")
+        self.price_scale = meta.get("price_scale", 0)
+        self.qty_scale = meta.get("qty_scale", 0)
+        self.stride = meta.get("index_stride", _INDEX_STRIDE)
+        self._maps: List[mmap.mmap] = []
+        self.key = self._key(path)
+        views = {name: self._map(os.path.join(path, f"{name}.i64")) for name in (*COLUMNS, "index")}
+        # A crash mid-append can leave columns of different lengths: use the common prefix
+        self.rows = min(len(views[name]) for name in COLUMNS)
+        self.agg_ids, self.times, self.prices, self.qtys = (views[name][:self.rows] for name in COLUMNS)
+        self.index = views["index"][:-(-self.rows // self.stride)]
+        self._totals: Optional[Tuple[int, ...]] = None
+
+    @staticmethod
+    def _key(path: str) -> Tuple[Any, ...]:
+        """Changes whenever a column was appended to or rewritten."""
+        stats = [os.stat(os.path.join(path, f"{name}.i64")) for name in COLUMNS]
+        return tuple((s.st_ino, s.st_size) for s in stats)
+
+    def _map(self, file: str) -> memoryview:
+        with open(file, "rb") as f:
+            size = os.fstat(f.fileno()).st_size // 8 * 8
+            if not size:
+                return memoryview(b"").cast("q")
+            m = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        self._maps.append(m)
+        return memoryview(m).cast("q")
+
+    def aggregate(self, lo: int, hi: int) -> Tuple[int, ...]:
+        """(count, sum_p, sum_q, sum_pq, high, low, open, close) of rows [lo, hi)."""
+        if lo == 0 and hi == self.rows:
+            # Whole segment (every segment but the edges of a long range): computed once per mapping
+            if self._totals is None:
+                self._totals = self._aggregate(0, self.rows)
+            return self._totals
+        return self._aggregate(lo, hi)
+
+    def _aggregate(self, lo: int, hi: int) -> Tuple[int, ...]:
+        if lo >= hi:
+            return (0, 0, 0, 0, 0, 0, 0, 0)
+        prices, qtys = self.prices[lo:hi], self.qtys[lo:hi]
+        return (hi - lo, sum(prices), sum(qtys), sum(map(mul, prices, qtys)),
+                max(prices), min(prices), prices[0], prices[-1])
+
+    def find(self, t: int) -> int:
+        """First row with time >= t: bisect the index, then one block of the time column."""
+        b = bisect_left(self.index, t)
+        lo = max(0, (b - 1) * self.stride)
+        hi = min(self.rows, b * self.stride) if b < len(self.index) else self.rows
+        return bisect_left(self.times, t, lo, hi)
+
+    def close(self) -> None:
+        self.agg_ids = self.times = self.prices = self.qtys = self.index = None
+        for m in self._maps:
+            try:
+                m.close()
+            except BufferError:
+                pass  # a view is still referenced; the map is released with it
+        self._maps = []
+
+
+class _RangeStats:
+    """Exact integer aggregates over rows of possibly differently scaled segments."""
+
+    __slots__ = ("count", "price_scale", "qty_scale", "sum_p", "sum_q", "sum_pq",
+                 "high", "low", "open", "close")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.price_scale = self.qty_scale = 0
+        self.sum_p = self.sum_q = self.sum_pq = 0
+        self.high = self.low = self.open = self.close = None
+
+    def _widen(self, ps: int, qs: int) -> None:
+        fp, fq = pow10(ps - self.price_scale), pow10(qs - self.qty_scale)
+        self.sum_p *= fp
+        self.sum_q *= fq
+        self.sum_pq *= fp * fq
+        self.high, self.low, self.open, self.close = (
+            None if v is None else v * fp for v in (self.high, self.low, self.open, self.close))
+        self.price_scale, self.qty_scale = ps, qs
+
+    def add(self, part: Tuple[int, ...], ps: int, qs: int) -> None:
+        """Merge (count, sum_p, sum_q, sum_pq, high, low, open, close) of later rows."""
+        count, sum_p, sum_q, sum_pq, high, low, first, last = part
+        if not count:
+            return
+        if ps > self.price_scale or qs > self.qty_scale:
+            self._widen(max(ps, self.price_scale), max(qs, self.qty_scale))
+        fp, fq = pow10(self.price_scale - ps), pow10(self.qty_scale - qs)
+        self.count += count
+        self.sum_p += sum_p * fp
+        self.sum_q += sum_q * fq
+        self.sum_pq += sum_pq * fp * fq
+        self.high = high * fp if self.high is None else max(self.high, high * fp)
+        self.low = low * fp if self.low is None else min(self.low, low * fp)
+        if self.open is None:
+            self.open = first * fp
+        self.close = last * fp
+
+    def result(self) -> Dict[str, Optional[Decimal]]:
+        if not self.count:
+            return {k: None for k in ("open", "high", "low", "close", "avg", "vwap", "volume")}
+        ps, qs = self.price_scale, self.qty_scale
+        sum_q = to_decimal_exact(self.sum_q, qs)
+        sum_p = to_decimal_exact(self.sum_p, ps)
+        close = to_decimal_exact(self.close, ps)
+        vwap = _CTX.divide(to_decimal_exact(self.sum_pq, ps + qs), sum_q) if self.sum_q > 0 else close
+        return {
+            "open": quantize(to_decimal_exact(self.open, ps)),
+            "high": quantize(to_decimal_exact(self.high, ps)),
+            "low": quantize(to_decimal_exact(self.low, ps)),
+            "close": quantize(close),
+            "avg": quantize(_CTX.divide(sum_p, Decimal(self.count))),
+            "vwap": quantize(vwap),
+            "volume": sum_q,
+        }
+
+
+class TradeStore:
+    def __init__(self, root: Optional[str] = None, segment_seconds: Optional[float] = None,
+                 max_open_segments: Optional[int] = None) -> None:
+        self.root = os.path.normpath(root or config.TRADE_STORE_DIR or DEFAULT_DIR)
+        self.segment_ms = int((segment_seconds or config.TRADE_STORE_SEGMENT_SECONDS) * 1000)
+        self.max_open = max_open_segments or config.TRADE_STORE_MAX_OPEN_SEGMENTS
+        self._pending: Dict[str, List[AggTrade]] = {}
+        self._last: Dict[str, Tuple[int, int]] = {}  # symbol -> (last agg id, its time)
+        # symbol -> (partition, writer); both caches are LRUs bounded by max_open
+        self._writers: "OrderedDict[str, Tuple[int, SegmentWriter]]" = OrderedDict()
+        self._readers: "OrderedDict[str, SegmentReader]" = OrderedDict()
+        # Ingest runs on the event loop, flushes and queries in worker threads:
+        # _pending_lock guards the buffers, _io_lock the files and mapped readers
+        self._pending_lock = threading.Lock()
+        self._io_lock = threading.RLock()
+        self.rows_written = 0
+        self.dropped = 0
+
+    # Ingest ---------------------------------------------------------------
+    def _symbol_dir(self, symbol: str) -> str:
+        name = symbol.upper()
+        if not _SYMBOL_NAME.fullmatch(name):
+            raise ValueError(f"invalid symbol: {symbol!r}")  # never a path outside the root
+        return os.path.join(self.root, name)
+
+    def partitions(self, symbol: str) -> List[int]:
+        try:
+            names = os.listdir(self._symbol_dir(symbol))
+        except FileNotFoundError:
+            return []
+        return sorted(int(n) for n in names if n.isdigit())
+
+    @contextmanager
+    def _symbol_lock(self, symbol: str) -> Iterator[None]:
+        """Exclusive across processes: other workers append to the same files."""
+        path = self._symbol_dir(symbol)
+        os.makedirs(path, exist_ok=True)
+        fd = os.open(os.path.join(path, ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)  # releases the flock
+
+    def _last_stored(self, symbol: str) -> Tuple[int, int]:
+        """(agg id, time) of the newest stored row, so restarts continue where they left off."""
+        with self._io_lock:
+            for partition in reversed(self.partitions(symbol)):
+                reader = self._reader(symbol, partition)
+                if reader.rows:
+                    return reader.agg_ids[-1], reader.times[-1]
+        return -1, 0
+
+    def append(self, symbol: str, trades: Iterable[AggTrade]) -> int:
+        """Buffer trades newer than anything buffered for the symbol; returns how many were kept.
+
+        Runs on the event loop, so it never touches the disk or _io_lock (a flush
+        may hold it while waiting on another process): trades already stored are
+        dropped by flush, which reads the last stored row under the symbol's flock.
+        """
+        sym = symbol.upper()
+        if not _SYMBOL_NAME.fullmatch(sym):
+            return 0
+        last_id, last_time = self._last.get(sym, (-1, 0))
+        fresh = []
+        for t in trades:
+            try:
+                agg_id = int(t.agg_id)
+            except (TypeError, ValueError):
+                continue
+            if agg_id > last_id and 0 <= agg_id <= _INT64_MAX:
+                fresh.append((agg_id, t))
+        if not fresh:
+            return 0
+        fresh.sort(key=lambda x: x[0])
+        kept = []
+        for agg_id, t in fresh:
+            ts = trade_time(t)
+            if agg_id == last_id or ts < last_time:
+                self.dropped += 1  # duplicate in the batch, or time going backwards
+                continue
+            kept.append(t)
+            last_id, last_time = agg_id, ts
+        self._last[sym] = (last_id, last_time)
+        if kept:
+            with self._pending_lock:
+                self._pending.setdefault(sym, []).extend(kept)
+        return len(kept)
+
+    def _writer(self, symbol: str, partition: int) -> SegmentWriter:
+        path = os.path.join(self._symbol_dir(symbol), str(partition))
+        current = self._writers.get(symbol)
+        if current is not None and current[0] == partition and current[1].key == SegmentReader._key(path):
+            self._writers.move_to_end(symbol)
+            return current[1]
+        if current is not None:
+            current[1].close()  # other partition, or another process wrote to this one
+        writer = SegmentWriter(path)
+        self._writers[symbol] = (partition, writer)
+        self._writers.move_to_end(symbol)
+        while len(self._writers) > self.max_open:
+            self._writers.popitem(last=False)[1][1].close()
+        return writer
+
+    def flush(self, symbol: Optional[str] = None) -> int:
+        """Write buffered trades (of one symbol, or all) to their segments."""
+        with self._io_lock:
+            with self._pending_lock:
+                if symbol:
+                    batches = [(symbol.upper(), self._pending.pop(symbol.upper(), None))]
+                else:
+                    batches, self._pending = list(self._pending.items()), {}
+            written = 0
+            seg = self.segment_ms
+            for sym, trades in batches:
+                if not trades:
+                    continue
+                with self._symbol_lock(sym):
+                    written += self._append_locked(sym, trades, seg)
+            self.rows_written += written
+        return written
+
+    def _append_locked(self, sym: str, trades: List[AggTrade], seg: int) -> int:
+        # Continue after whatever is on disk now, which may have been written by another worker
+        last_id, last_time = self._last_stored(sym)
+        trades = [t for t in trades if int(t.agg_id) > last_id and trade_time(t) >= last_time]
+        current = self._last.get(sym)
+        if current is None or last_id > current[0]:
+            self._last[sym] = (last_id, last_time)
+        written = start = 0
+        # Rows are time-ordered, so each partition is one contiguous run
+        for i in range(1, len(trades) + 1):
+            if i == len(trades) or trade_time(trades[i]) // seg != trade_time(trades[start]) // seg:
+                partition = trade_time(trades[start]) // seg * seg
+                written += self._writer(sym, partition).append(trades[start:i])
+                start = i
+        return written
+
+    def prune(self, retention_hours: Optional[float] = None) -> int:
+        """Delete partitions that ended before the retention horizon; returns how many."""
+        hours = config.TRADE_STORE_RETENTION_HOURS if retention_hours is None else retention_hours
+        if hours <= 0 or not os.path.isdir(self.root):
+            return 0
+        horizon = int(time.time() * 1000 - hours * 3_600_000)
+        with self._io_lock:
+            return self._prune_before(horizon)
+
+    def _prune_before(self, horizon: int) -> int:
+        removed = 0
+        for sym in os.listdir(self.root):
+            if not _SYMBOL_NAME.fullmatch(sym):
+                continue
+            with self._symbol_lock(sym):
+                removed += self._prune_symbol(sym, horizon)
+        return removed
+
+    def _prune_symbol(self, sym: str, horizon: int) -> int:
+        removed = 0
+        for partition in self.partitions(sym):
+            if partition + self.segment_ms > horizon:
+                break
+            current = self._writers.get(sym)
+            if current is not None and current[0] == partition:
+                current[1].close()
+                del self._writers[sym]
+            path = os.path.join(self._symbol_dir(sym), str(partition))
+            reader = self._readers.pop(path, None)
+            if reader is not None:
+                reader.close()
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        return removed
+
+    # Queries --------------------------------------------------------------
+    def _reader(self, symbol: str, partition: int) -> SegmentReader:
+        path = os.path.join(self._symbol_dir(symbol), str(partition))
+        reader = self._readers.get(path)
+        if reader is not None:
+            if reader.key == SegmentReader._key(path):
+                self._readers.move_to_end(path)
+                return reader
+            reader.close()  # appended to or rewritten since it was mapped
+        reader = self._readers[path] = SegmentReader(path)
+        while len(self._readers) > self.max_open:
+            self._readers.popitem(last=False)[1].close()
+        return reader
+
+    def query(self, symbol: str, start_ms: int, end_ms: int, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Trades with start_ms <= time < end_ms: aggregates over all of them and
+        up to `limit` rows, oldest first (default TRADE_STORE_MAX_ROWS)."""
+        sym = symbol.upper()
+        limit = config.TRADE_STORE_MAX_ROWS if limit is None else limit
+        with self._io_lock:
+            self.flush(sym)
+            return self._query(sym, start_ms, end_ms, limit)
+
+    def _query(self, sym: str, start_ms: int, end_ms: int, limit: int) -> Dict[str, Any]:
+        stats = _RangeStats()
+        rows: List[Dict[str, Any]] = []
+        for partition in self.partitions(sym):
+            if partition + self.segment_ms <= start_ms or partition >= end_ms:
+                continue
+            reader = self._reader(sym, partition)
+            lo, hi = reader.find(start_ms), reader.find(end_ms)
+            if lo >= hi:
+                continue
+            ps, qs = reader.price_scale, reader.qty_scale
+            stats.add(reader.aggregate(lo, hi), ps, qs)
+            take = min(hi, lo + limit - len(rows))
+            for i in range(lo, take):
+                rows.append({"a": reader.agg_ids[i], "T": reader.times[i],
+                             "p": to_decimal_exact(reader.prices[i], ps),
+                             "q": to_decimal_exact(reader.qtys[i], qs)})
+        return {"symbol": sym, "from": start_ms, "to": end_ms, "count": stats.count,
+                **stats.result(), "trades": rows, "truncated": stats.count > len(rows)}
+
+    def close(self) -> None:
+        self.flush()
+        with self._io_lock:
+            self._close_files()
+
+    def _close_files(self) -> None:
+        for _, writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+        for reader in self._readers.values():
+            reader.close()
+        self._readers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": True,
+            "dir": self.root,
+            "symbols": len(self._last),
+            "pending": sum(len(v) for v in self._pending.values()),
+            "rows_written": self.rows_written,
+            "dropped": self.dropped,
+            "open_segments": len(self._readers),
+        }
+
+
+# Process-wide store, started/stopped by the app lifespan when TRADE_STORE_ENABLED
+_store: Optional[TradeStore] = None
+_task: Optional[asyncio.Task] = None
+
+
+def get_trade_store() -> Optional[TradeStore]:
+    return _store
+
+
+def record_trades(symbol: str, trades: Iterable[AggTrade]) -> None:
+    """Ingest hook for the REST poller and the stream; a no-op when the store is off."""
+    store = _store
+    if store is not None and trades:
+        store.append(symbol, trades)
+
+
+async def _run(store: TradeStore) -> None:
+    last_prune = 0.0
+    while True:
+        await asyncio.sleep(config.TRADE_STORE_FLUSH_SECONDS)
+        try:
+            await asyncio.to_thread(store.flush)
+            if time.monotonic() - last_prune > 600:
+                last_prune = time.monotonic()
+                await asyncio.to_thread(store.prune)
+        except Exception as e:
+            logger.error("trade store flush failed: %s", e)
+
+
+async def start_trade_store(store: Optional[TradeStore] = None) -> Optional[TradeStore]:
+    global _store, _task
+    if store is None and not config.TRADE_STORE_ENABLED:
+        return None
+    _store = store or TradeStore()
+    _task = asyncio.create_task(_run(_store), name="trade-store")
+    return _store
+
+
+async def stop_trade_store() -> None:
+    global _store, _task
+    store, task, _store, _task = _store, _task, None, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    if store is not None:
+        store.close()
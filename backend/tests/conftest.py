@@ -0,0 +1,6 @@
+import os
+
+# Keep the test suite off the network: no remote token list, no proxies, no prefetching.
+os.environ.setdefault("ALPHA_TOKENS_API", "")
+os.environ.setdefault("USE_PROXY", "false")
+os.environ.setdefault("PREFETCH_ENABLED", "false")
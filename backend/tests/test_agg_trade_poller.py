@@ -0,0 +1,120 @@
+import asyncio
+
+import httpx
+
+from backend.services import alpha_price_service
+from backend.services.binance_client import AggTrade, AggTradePoller
+from backend.services.trade_buffer import trade_buffers
+
+T0 = 1_700_000_000_000
+
+
+class FakeUpstream:
+    """Trades one per second; answers limit / fromId like the agg-trades endpoint."""
+
+    def __init__(self, count):
+        self.trades = [AggTrade(100 + i, f"1.{i:04d}", "2", T0 + i * 1000) for i in range(count)]
+        self.calls = []
+
+    async def fetch(self, symbol, limit=None, from_id=None):
+        self.calls.append((limit, from_id))
+        if from_id is None:
+            return self.trades[-limit:]
+        return [t for t in self.trades if t.agg_id >= from_id][:limit]
+
+    def trade(self, n=1):
+        last = self.trades[-1]
+        for _ in range(n):
+            i = last.agg_id - 99
+            last = AggTrade(last.agg_id + 1, f"1.{i:04d}", "2", last.time + 1000)
+            self.trades.append(last)
+
+
+def _poller(clock):
+    return AggTradePoller(window=20, min_limit=3, idle_seconds=60, clock=lambda: clock[0])
+
+
+def test_incremental_poll_asks_only_for_new_trades():
+    clock = [0.0]
+    up, poller = FakeUpstream(30), _poller(clock)
+
+    async def run():
+        first = await poller.poll("AUSDT", None, up.fetch)
+        assert up.calls == [(20, None)] and first[-1].agg_id == 129
+        clock[0] = 2.0
+        up.trade(2)
+        new = await poller.poll("AUSDT", 129, up.fetch)
+        assert [t.agg_id for t in new] == [130, 131]
+        limit, from_id = up.calls[-1]
+        assert from_id == 130 and 3 <= limit < 20  # ~1 trade/s for 2 s, with headroom
+        clock[0] = 4.0
+        assert await poller.poll("AUSDT", 131, up.fetch) == []  # nothing traded: nothing sent
+
+    asyncio.run(run())
+    st = poller.stats()
+    assert st["full"] == 1 and st["incremental"] == 2 and st["gap_fallbacks"] == 0
+    assert st["symbols"]["AUSDT"]["last_id"] == 131
+
+
+def test_full_page_or_unknown_window_falls_back_to_full_fetch():
+    clock = [0.0]
+    up, poller = FakeUpstream(30), _poller(clock)
+
+    async def run():
+        await poller.poll("AUSDT", None, up.fetch)
+        clock[0] = 1.0
+        up.trade(15)  # burst: more than the incremental limit
+        got = await poller.poll("AUSDT", 129, up.fetch)
+        assert up.calls[-1] == (20, None) and got[-1].agg_id == 144
+        assert poller.stats()["gap_fallbacks"] == 1
+        assert poller.stats()["duplicates"] == 5  # window overlap with what was held
+        # A caller holding a different window (restart, eviction) gets the full window
+        clock[0] = 2.0
+        await poller.poll("AUSDT", 120, up.fetch)
+        assert up.calls[-1] == (20, None)
+        # So does an idle cursor
+        clock[0] = 100.0
+        await poller.poll("AUSDT", 144, up.fetch)
+        assert up.calls[-1] == (20, None)
+
+    asyncio.run(run())
+
+
+def test_rejected_incremental_request_falls_back_to_full_fetch():
+    clock = [0.0]
+    up, poller = FakeUpstream(30), _poller(clock)
+
+    async def rejecting(symbol, limit=None, from_id=None):
+        if from_id is not None:
+            request = httpx.Request("GET", "http://upstream.test/agg-trades")
+            raise httpx.HTTPStatusError("400", request=request, response=httpx.Response(400, request=request))
+        return await up.fetch(symbol, limit)
+
+    async def run():
+        await poller.poll("AUSDT", None, up.fetch)
+        clock[0] = 2.0
+        up.trade(2)
+        got = await poller.poll("AUSDT", 129, rejecting)
+        assert got[-1].agg_id == 131 and up.calls[-1] == (20, None)
+
+    asyncio.run(run())
+    assert poller.stats()["rejected"] == 1
+
+
+def test_price_service_snapshot_matches_full_window(monkeypatch):
+    up = FakeUpstream(80)
+    monkeypatch.setattr(alpha_price_service, "fetch_agg_trades", up.fetch)
+    trade_buffers.drop("POLLUSDT")
+    window = alpha_price_service.agg_trade_poller.window
+
+    async def run():
+        await alpha_price_service._fetch_upstream("POLLUSDT")
+        up.trade(3)
+        return await alpha_price_service._fetch_upstream("POLLUSDT")
+
+    snap = asyncio.run(run())
+    assert up.calls[-1][1] is not None  # second poll was incremental
+    full = alpha_price_service._aggregate_prices_decimal(up.trades[-window:])
+    assert (snap["price_now"], snap["price_avg"], snap["price_vwap"]) == (full["last"], full["avg"], full["vwap"])
+    trade_buffers.drop("POLLUSDT")
+    alpha_price_service.agg_trade_poller.forget("POLLUSDT")
@@ -1,13 +1,14 @@
 from decimal import Decimal
 
 from backend.services.alpha_price_service import _aggregate_prices
+from backend.services.binance_client import AggTrade
 
 
 def test_aggregate_prices_vwap_and_avg():
     trades = [
-        {"p": "1.00000000", "q": "2.0"},
-        {"p": "2.00000000", "q": "1.0"},
-        {"p": "1.50000000", "q": "3.0"},
+        AggTrade(None, "1.00000000", "2.0"),
+        AggTrade(None, "2.00000000", "1.0"),
+        AggTrade(None, "1.50000000", "3.0"),
     ]
     res = _aggregate_prices(trades)
     # last price is last trade's price
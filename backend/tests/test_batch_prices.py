@@ -0,0 +1,63 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.services import alpha_price_service
+from backend.services.binance_client import AggTrade
+
+
+def test_batch_prices_per_item_errors_and_bounded_concurrency(monkeypatch):
+    active = {"now": 0, "max": 0}
+
+    async def fake_fetch(symbol, limit=None, from_id=None):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+        if symbol == "BADUSDT":
+            return []
+        return [AggTrade(1, "1.5", "2")]
+
+    monkeypatch.setattr(alpha_price_service, "fetch_agg_trades", fake_fetch)
+    monkeypatch.setattr(alpha_price_service.config, "PRICE_BATCH_CONCURRENCY", 2)
+    alpha_price_service._price_cache.clear()
+    ids = ["BATCH1", "BAD", "BATCH2", "BATCH3", "BATCH1"]
+    with TestClient(app) as c:
+        resp = c.get("/api/alpha/prices", params={"alphaIds": ",".join(ids)})
+        body = resp.json()
+        post = c.post("/api/alpha/prices", json={"alphaIds": ["BATCH1", "BATCH2"]}).json()
+    assert resp.status_code == 200 and body["count"] == 4  # duplicate id collapsed
+    by_id = {r["alphaId"]: r for r in body["results"]}
+    assert by_id["BAD"]["ok"] is False and "No trades" in by_id["BAD"]["error"]
+    assert by_id["BATCH1"]["data"]["price_now"] == "1.50000000"
+    assert active["max"] <= 2
+    assert all(r["source"] == "hit" for r in post["results"])
+
+
+def test_batch_is_rate_limited_by_cost(monkeypatch):
+    async def fake_fetch(symbol, limit=None, from_id=None):
+        return [AggTrade(1, "1", "1")]
+
+    monkeypatch.setattr(alpha_price_service, "fetch_agg_trades", fake_fetch)
+    with TestClient(app) as c:
+        ids = ",".join(f"COST{i}" for i in range(10))
+        resp = c.get("/api/alpha/prices", params={"alphaIds": ids})
+    limit = int(resp.headers["X-RateLimit-Limit"])
+    assert int(resp.headers["X-RateLimit-Remaining"]) <= limit - 10
+
+
+def test_batch_larger_than_the_route_limit_is_rejected_up_front(monkeypatch):
+    calls = []
+
+    async def fake_fetch(symbol, limit=None, from_id=None):
+        calls.append(symbol)
+        return [AggTrade(1, "1", "1")]
+
+    monkeypatch.setattr(alpha_price_service, "fetch_agg_trades", fake_fetch)
+    with TestClient(app) as c:
+        limit = int(c.get("/api/alpha/prices", params={"alphaIds": "OVER0"}).headers["X-RateLimit-Limit"])
+        monkeypatch.setattr(alpha_price_service.config, "PRICE_BATCH_MAX_SYMBOLS", limit + 1)
+        resp = c.get("/api/alpha/prices", params={"alphaIds": ",".join(f"OVER{i}" for i in range(limit + 1))})
+    assert resp.status_code == 400 and f"allows {limit} per" in resp.json()["detail"]
+    assert calls == ["OVER0USDT"]
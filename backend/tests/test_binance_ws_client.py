@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+from websockets.asyncio.server import serve
+
+from backend.services import alpha_price_service, binance_ws_client
+from backend.services.binance_client import AggTrade
+from backend.services.binance_ws_client import BinanceWSClient
+
+
+def _trade(agg_id, price, qty="1"):
+    return {"e": "aggTrade", "s": "KOGEUSDT", "a": agg_id, "p": price, "q": qty, "T": agg_id}
+
+
+def _rest(*events):
+    return [AggTrade.from_dict(e) for e in events]
+
+
+class FakeUpstream:
+    """Local stand-in for the Binance stream: records frames, pushes trades on demand."""
+
+    def __init__(self):
+        self.frames = []
+        self.connections = []
+        self.subscribed = asyncio.Event()
+
+    async def handler(self, ws):
+        self.connections.append(ws)
+        async for raw in ws:
+            msg = json.loads(raw)
+            self.frames.append(msg)
+            await ws.send(json.dumps({"result": None, "id": msg["id"]}))
+            if msg["method"] == "SUBSCRIBE":
+                self.subscribed.set()
+
+    async def push(self, *trades):
+        ws = self.connections[-1]
+        for t in trades:
+            await ws.send(json.dumps({"stream": "kogeusdt@aggTrade", "data": t}))
+
+
+async def _wait_for(cond, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not cond():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met"
+        await asyncio.sleep(0.01)
+
+
+def test_stream_backfill_dedupe_and_reconnect(monkeypatch):
+    monkeypatch.setattr(binance_ws_client.config, "WS_RECONNECT_BACKOFF_BASE", 0.01)
+    calls = []
+
+    async def backfill(symbol, limit, from_id=None):
+        calls.append(from_id)
+        if from_id is None:
+            return _rest(_trade(1, "1.0"), _trade(2, "2.0"))
+        return _rest(_trade(from_id, "3.0"))
+
+    async def run():
+        upstream = FakeUpstream()
+        async with serve(upstream.handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            client = BinanceWSClient(f"ws://127.0.0.1:{port}", window=3, proxy=None, backfill=backfill)
+            await client.subscribe("kogeusdt")
+            client.start()
+            await upstream.subscribed.wait()
+            await _wait_for(lambda: client.is_live("KOGEUSDT"))
+            assert upstream.frames[0]["params"] == ["kogeusdt@aggTrade"]
+
+            # Overlapping trade id 2 is deduplicated; window keeps the newest 3
+            await upstream.push(_trade(2, "2.0"), _trade(3, "2.5"), _trade(4, "4.0"))
+            await _wait_for(lambda: client.stats()["symbols"]["KOGEUSDT"]["last_id"] == 4)
+            assert client.get_buffer("KOGEUSDT").trade_ids() == [2, 3, 4]
+
+            # Drop the connection: state goes non-live, then reconnect backfills from id 5
+            await upstream.connections[-1].close()
+            await _wait_for(lambda: len(upstream.connections) == 2 and client.is_live("KOGEUSDT"))
+            assert calls == [None, 5]
+            assert client.get_buffer("KOGEUSDT").trade_ids() == [3, 4, 5]
+            await client.stop()
+
+    asyncio.run(run())
+
+
+def test_refcounted_unsubscribe():
+    async def backfill(symbol, limit, from_id=None):
+        return _rest(_trade(1, "1.0"))
+
+    async def run():
+        upstream = FakeUpstream()
+        async with serve(upstream.handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            client = BinanceWSClient(f"ws://127.0.0.1:{port}", proxy=None, backfill=backfill)
+            client.start()
+            await _wait_for(lambda: client.connected)
+            await client.subscribe("KOGEUSDT")
+            await client.subscribe("KOGEUSDT")
+            await client.unsubscribe("KOGEUSDT")
+            assert client.is_live("KOGEUSDT")
+            await client.unsubscribe("KOGEUSDT")
+            assert client.get_buffer("KOGEUSDT") is None
+            await _wait_for(lambda: len(upstream.frames) == 2)
+            assert [f["method"] for f in upstream.frames] == ["SUBSCRIBE", "UNSUBSCRIBE"]
+            await client.stop()
+
+    asyncio.run(run())
+
+
+def test_fetch_alpha_price_prefers_live_stream(monkeypatch):
+    async def rest_must_not_be_called(symbol, limit=None, from_id=None):
+        raise AssertionError("REST fallback used while stream is live")
+
+    async def backfill(symbol, limit, from_id=None):
+        return _rest(_trade(1, "1.0", "2.0"), _trade(2, "2.0", "1.0"))
+
+    async def run():
+        upstream = FakeUpstream()
+        async with serve(upstream.handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            client = BinanceWSClient(f"ws://127.0.0.1:{port}", proxy=None, backfill=backfill)
+            await binance_ws_client.start_stream_client(client)
+            try:
+                async with binance_ws_client.stream_subscription("KOGEUSDT"):
+                    await _wait_for(lambda: client.is_live("KOGEUSDT"))
+                    monkeypatch.setattr(alpha_price_service, "fetch_agg_trades", rest_must_not_be_called)
+                    res = await alpha_price_service.fetch_alpha_price("KOGE")
+                    assert str(res["price_now"]) == "2.00000000"
+                    assert str(res["price_vwap"]) == "1.33333333"
+            finally:
+                await binance_ws_client.stop_stream_client()
+
+    asyncio.run(run())
@@ -0,0 +1,88 @@
+import json
+import random
+import threading
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+
+from backend.config import config
+from backend.core import middleware
+from backend.core.rate_limit import MemoryRateLimitStore
+from backend.main import app
+from backend.services.calculation_service import compute_diff_range, compute_diff_range_batch
+
+
+def _random_decimal(rng: random.Random) -> Decimal:
+    return Decimal(rng.randint(0, 10 ** rng.randint(1, 12))).scaleb(-rng.randint(0, 18))
+
+
+def _scalar(row):
+    try:
+        res = compute_diff_range(*row)
+    except Exception:
+        return None
+    return str(res["diff_lower"]), str(res["diff_upper"])
+
+
+def test_batch_matches_scalar_on_random_corpus():
+    rng = random.Random(11)
+    rows = [(_random_decimal(rng) + Decimal("0.0001"), _random_decimal(rng) + 1,
+             _random_decimal(rng), _random_decimal(rng), _random_decimal(rng) / 100) for _ in range(3000)]
+    rows += [
+        (Decimal(1), Decimal(100), Decimal("0.000000005"), Decimal(5), Decimal(0)),  # half-way tie
+        (Decimal(3), Decimal(1), Decimal(1), Decimal(2), Decimal(1)),  # fee above per_volume
+        (Decimal(1), Decimal(2), Decimal("-0"), Decimal(0), Decimal(3)),  # signed zeros
+        (Decimal(1), Decimal(1), Decimal(1), Decimal(2), Decimal(1)),  # zero token amount
+        (Decimal(0), Decimal(2), Decimal(1), Decimal(1), Decimal(0)),
+    ]
+    expected = [_scalar(r) for r in rows]
+
+    # Batches run in the threadpool, where the decimal context is not the main thread's
+    got = []
+    worker = threading.Thread(target=lambda: got.extend(compute_diff_range_batch(rows)))
+    worker.start()
+    worker.join()
+    for want, (lo, up, err) in zip(expected, got):
+        assert (None if err else (str(lo), str(up))) == want
+
+
+def test_grid_streams_ndjson_and_columnar_reports_row_errors():
+    grid = {
+        "price_now": "1",
+        "per_volume": {"start": "100", "stop": "102", "step": "1"},
+        "waste_lower": ["3", "4"],
+        "waste_upper": "5",
+        "fee_amount_token": "2",
+    }
+    with TestClient(app) as c:
+        resp = c.post("/api/calc/price-range/batch", json={"grid": grid})
+        lines = [json.loads(line) for line in resp.text.splitlines()]
+        cols = c.post("/api/calc/price-range/batch", json={"format": "columnar", "scenarios": [
+            {"price_now": "1", "per_volume": "100", "waste_lower": "3", "waste_upper": "5", "fee_amount_token": "2"},
+            {"price_now": "1", "per_volume": "2", "waste_lower": "3", "waste_upper": "5", "fee_amount_token": "2"},
+        ]}).json()
+        bad = c.post("/api/calc/price-range/batch", json={"grid": {**grid, "price_now": "0"}})
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    assert len(lines) == 6 and [r["i"] for r in lines] == list(range(6))
+    single = compute_diff_range(1, 102, 3, 5, 2)
+    assert lines[4]["per_volume"] == "102" and lines[4]["waste_lower"] == "3"
+    assert lines[4]["diff_lower"] == str(single["diff_lower"])
+    assert cols["count"] == 2
+    assert cols["columns"]["diff_upper"][0] == "0.05102041"
+    assert cols["columns"]["diff_lower"][1] is None and "non-zero" in cols["columns"]["error"][1]
+    assert bad.status_code == 400
+
+
+def test_batch_at_the_configured_maximum_fits_the_rate_limit(monkeypatch):
+    grid = {
+        "price_now": "1",
+        "per_volume": {"start": "1", "stop": str(config.CALC_BATCH_MAX_SCENARIOS), "step": "1"},
+        "waste_lower": "3",
+        "waste_upper": "5",
+        "fee_amount_token": "2",
+    }
+    with TestClient(app) as c:
+        c.get("/api/stats/rate-limit")  # builds the middleware stack
+        monkeypatch.setattr(middleware._rate_limiter, "store", MemoryRateLimitStore())  # fresh budget
+        resp = c.post("/api/calc/price-range/batch", json={"format": "columnar", "grid": grid})
+    assert resp.status_code == 200 and resp.headers["X-Scenario-Count"] == str(config.CALC_BATCH_MAX_SCENARIOS)
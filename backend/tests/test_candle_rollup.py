@@ -0,0 +1,119 @@
+import random
+from collections import defaultdict
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+
+from backend.core.precision import quantize
+from backend.main import app
+from backend.services import alpha_price_service
+from backend.services.binance_client import AggTrade
+from backend.services.candle_rollup import CandleRegistry, SymbolRollup, candle_rollups, parse_interval
+
+T0 = 1_700_000_000_000
+INTERVALS = {"1s": 1000, "1m": 60_000, "5m": 300_000}
+
+
+def _reference(trades, width):
+    buckets = defaultdict(list)
+    for t in sorted(trades, key=lambda t: t.agg_id):
+        buckets[t.time - t.time % width].append(t)
+    out = []
+    for start in sorted(buckets):
+        rows = buckets[start]
+        prices = [Decimal(t.price) for t in rows]
+        volume = sum((Decimal(t.qty) for t in rows), Decimal(0))
+        quote = sum((Decimal(t.price) * Decimal(t.qty) for t in rows), Decimal(0))
+        out.append({
+            "open_time": start, "close_time": start + width - 1,
+            "open": quantize(prices[0]), "high": quantize(max(prices)), "low": quantize(min(prices)),
+            "close": quantize(prices[-1]), "volume": volume, "quote_volume": quote,
+            "vwap": quantize(quote / volume), "count": len(rows), "complete": True,
+        })
+    return out
+
+
+def test_out_of_order_and_overlapping_batches_match_reference():
+    rng = random.Random(5)
+    trades, t = [], T0
+    for i in range(3000):
+        t += rng.randint(0, 400)
+        price = str(Decimal(rng.randint(1, 10 ** 7)).scaleb(-rng.randint(2, 8)))
+        trades.append(AggTrade(1000 + i, price, f"{rng.randint(1, 10 ** 5)}.{rng.randint(0, 99)}", t))
+    reg = CandleRegistry(INTERVALS, history=3000)
+    # Overlapping polls, shuffled, with some trades delivered only in a later batch
+    held = []
+    for i in range(0, len(trades), 40):
+        batch = trades[max(0, i - 25):i + 40]
+        rng.shuffle(batch)
+        keep = [x for x in batch if rng.random() > 0.1]
+        held.extend(x for x in batch if x not in keep)
+        reg.ingest("koge", keep)
+        if len(held) > 50:
+            reg.ingest("KOGE", held)
+            held = []
+    reg.ingest("KOGE", held)
+    for name, width in INTERVALS.items():
+        assert reg.candles("KOGE", name, 3000) == _reference(trades, width)
+    stats = reg.stats()
+    assert stats["trades"] == len(trades) and stats["late"] > 0 and stats["duplicates"] > 0
+
+
+def test_late_trades_beyond_span_or_ring_are_dropped():
+    rollup = SymbolRollup((1000,), history=4, late_span=10)
+    assert rollup.add([AggTrade(100, "1", "1", T0), AggTrade(120, "2", "1", T0 + 5000)]) == 2
+    assert rollup.add([AggTrade(105, "9", "1", T0)]) == 0  # more than late_span ids behind
+    assert rollup.add([AggTrade(119, "3", "1", T0 + 4000)]) == 1  # late, reuses T0's slot
+    assert rollup.add([AggTrade(115, "5", "1", T0 + 500)]) == 1  # its bucket was recycled: not counted
+    assert rollup.add([AggTrade(118, "4", "1", T0 + 3100), AggTrade(118, "4", "1", T0 + 3100)]) == 1
+    assert rollup.add([AggTrade(118, "4", "1", T0 + 3100)]) == 0
+    assert [(c.open_time, c.count) for c in rollup.candles(1000, 10)] == \
+        [(T0 + 3000, 1), (T0 + 4000, 1), (T0 + 5000, 1)]
+    assert (rollup.dropped, rollup.late, rollup.duplicates) == (1, 3, 2)
+
+
+def test_buckets_overlapping_an_agg_id_gap_are_incomplete():
+    rollup = SymbolRollup((1000,), history=10, late_span=10)
+    rollup.add([AggTrade(100, "1", "1", T0 + 200), AggTrade(104, "1", "1", T0 + 1500),
+                AggTrade(105, "1", "1", T0 + 3000)])
+    flags = lambda: [(d["open_time"], d["complete"]) for d in rollup.to_dicts(1000, 10)]
+    assert flags() == [(T0, False), (T0 + 1000, False), (T0 + 3000, True)]
+    assert rollup.missing == 3
+    rollup.add([AggTrade(101, "1", "1", T0 + 900), AggTrade(102, "1", "1", T0 + 1000)])
+    assert flags() == [(T0, False), (T0 + 1000, False), (T0 + 3000, True)]  # 103 still missing
+    rollup.add([AggTrade(103, "1", "1", T0 + 1200)])
+    assert flags() == [(T0, True), (T0 + 1000, True), (T0 + 3000, True)] and rollup.missing == 0
+    # 106-107 are already more than late_span ids behind: they can't be filled any more
+    rollup.add([AggTrade(108, "1", "1", T0 + 4200), AggTrade(118, "1", "1", T0 + 5000)])
+    assert rollup.missing == 9
+    rollup.add([AggTrade(i, "1", "1", T0 + 4500) for i in range(109, 118)])
+    assert rollup.missing == 0
+    assert flags()[-3:] == [(T0 + 3000, False), (T0 + 4000, False), (T0 + 5000, True)]
+
+
+def test_parse_interval():
+    assert parse_interval("1s") == 1000 and parse_interval("5M") == 300_000 and parse_interval("2h") == 7_200_000
+    for bad in ("", "0s", "1d", "m"):
+        try:
+            parse_interval(bad)
+        except ValueError:
+            continue
+        raise AssertionError(bad)
+
+
+def test_candles_endpoint(monkeypatch):
+    async def fake_fetch(symbol, limit=None, from_id=None):
+        return [AggTrade(1, "1.5", "2", T0 + 100), AggTrade(2, "2.5", "2", T0 + 1100)]
+
+    monkeypatch.setattr(alpha_price_service, "fetch_agg_trades", fake_fetch)
+    alpha_price_service._price_cache.clear()
+    candle_rollups._rollups.pop("CANDLEUSDT", None)
+    c = TestClient(app)
+    body = c.get("/api/alpha/candles", params={"alphaId": "CANDLE", "interval": "1m"}).json()
+    assert body["symbol"] == "CANDLEUSDT" and len(body["candles"]) == 1
+    candle = body["candles"][0]
+    assert candle["open"] == "1.50000000" and candle["close"] == "2.50000000"
+    assert candle["vwap"] == "2.00000000" and candle["volume"] == "4" and candle["count"] == 2
+    assert candle["complete"] is True
+    assert len(c.get("/api/alpha/candles", params={"alphaId": "CANDLE", "interval": "1s", "limit": 1}).json()["candles"]) == 1
+    assert c.get("/api/alpha/candles", params={"alphaId": "CANDLE", "interval": "7m"}).status_code == 400
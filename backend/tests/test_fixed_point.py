@@ -0,0 +1,71 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from backend.core.fixed_point import parse_fixed, parse_fixed_column, to_decimal_exact
+from backend.core.precision import quantize
+from backend.services.alpha_price_service import _aggregate_prices, _aggregate_prices_decimal
+from backend.services.binance_client import AggTrade
+from backend.services.trade_buffer import TradeRingBuffer
+
+
+def _value(rng: random.Random):
+    """Upstream-like values plus the odd shapes the parser must still get right."""
+    n = rng.randint(0, 10 ** rng.choice([1, 4, 8, 12, 20]))
+    kind = rng.random()
+    if kind < 0.6:
+        return f"{Decimal(n).scaleb(-8):.8f}"  # fixed 8 decimals, as upstream sends
+    if kind < 0.75:
+        return str(Decimal(n).scaleb(-rng.randint(0, 25)))  # any scale, may use exponents
+    if kind < 0.85:
+        return f"{n}.{'0' * rng.randint(0, 3)}"  # trailing dot / zeros
+    if kind < 0.95:
+        return n  # JSON number
+    return float(rng.randint(0, 10 ** 6)) / 64
+
+
+def _same(a, b):
+    return {k: str(v) for k, v in a.items()} == {k: str(v) for k, v in b.items()}
+
+
+def test_parse_fixed_matches_decimal():
+    for raw in ["0.01234500", "12", "5.", ".5", "1E-7", "-2.50", 7, 0.1, "١.٥", "000.10"]:
+        n, scale = parse_fixed(raw)
+        assert to_decimal_exact(n, scale) == Decimal(str(raw))
+    with pytest.raises(ValueError):
+        parse_fixed("abc")
+    assert parse_fixed_column(["1.50", "0.25", "10.00"]) == ([150, 25, 1000], 2)
+    # Mixed scales, signs, exponents, two dots or a missing dot all need the per-value path
+    for bad in (["1.5", "1.25"], ["-1.5", "1.5"], ["1e-5"], ["1.2.3", "45"], ["12"], ["."], [1.5]):
+        assert parse_fixed_column(bad) is None
+
+
+def test_fixed_aggregation_is_bit_identical_to_decimal_reference():
+    rng = random.Random(12)
+    for _ in range(400):
+        size = rng.randint(1, 60)
+        if rng.random() < 0.5:
+            trades = [AggTrade(None, f"{rng.randint(1, 10 ** 9) / 10 ** 8:.8f}", f"{rng.randint(0, 10 ** 6) / 100:.2f}")
+                      for _ in range(size)]
+        else:
+            trades = [AggTrade(None, _value(rng), _value(rng)) for _ in range(size)]
+        assert _same(_aggregate_prices(trades), _aggregate_prices_decimal(trades))
+
+
+def test_zero_volume_and_rounding_edges():
+    trades = [AggTrade(None, "0.000000005", "0"), AggTrade(None, "0.000000015", "0.00")]
+    assert _same(_aggregate_prices(trades), _aggregate_prices_decimal(trades))
+    huge = [AggTrade(None, "9" * 25 + ".5", "9" * 20), AggTrade(None, "1.000000001", "3")]
+    assert _same(_aggregate_prices(huge), _aggregate_prices_decimal(huge))
+    assert str(quantize(Decimal("0.123456785"))) == "0.12345679"
+
+
+def test_buffer_with_widening_scales_matches_reference():
+    rng = random.Random(5)
+    buf = TradeRingBuffer(20)
+    history = []
+    for i in range(300):
+        history.append(AggTrade(i, _value(rng), _value(rng)))
+        buf.add(history[-3:])
+        assert _same(buf.metrics(), _aggregate_prices_decimal(history[-20:]))
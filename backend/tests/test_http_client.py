@@ -0,0 +1,30 @@
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+
+from backend.core import http_client
+from backend.main import app
+
+
+def test_shared_client_is_reused_and_counts_requests():
+    async def run():
+        transport = httpx.MockTransport(lambda req: httpx.Response(200, json={"data": []}))
+        client = await http_client.init_http_client(transport=transport)
+        assert http_client.get_shared_client() is client
+        before = http_client.pool_stats()["requests"]
+        for _ in range(3):
+            await http_client.request_with_retries(client, "GET", "http://upstream.test/x")
+        stats = http_client.pool_stats()
+        assert stats["open"] is True
+        assert stats["requests"] == before + 3
+        await http_client.close_http_client()
+        assert http_client.pool_stats()["open"] is False
+
+    asyncio.run(run())
+
+
+def test_lifespan_opens_and_closes_shared_client():
+    with TestClient(app) as c:
+        assert c.get("/api/stats/http-pool").json()["open"] is True
+    assert http_client.pool_stats()["open"] is False
@@ -0,0 +1,70 @@
+import json
+from decimal import Decimal
+
+import pytest
+from pydantic import BaseModel
+
+from backend.core import json_codec
+from backend.services.alpha_token_service import _TOKEN_FIELDS, _token_from_fields
+from backend.services.binance_client import AGG_TRADE_FIELDS, AggTrade
+from backend.services.token_registry import AlphaToken
+
+
+def _codecs():
+    out = [json_codec.StdlibCodec()]
+    for name in ("orjson", "msgspec"):
+        try:
+            out.append(json_codec._CODECS[name]())
+        except ImportError:
+            pass
+    return out
+
+
+CODECS = _codecs()
+IDS = [c.name for c in CODECS]
+
+
+@pytest.mark.parametrize("codec", CODECS, ids=IDS)
+def test_decode_list_keeps_only_named_fields(codec):
+    body = json.dumps({"code": "000000", "data": [
+        {"a": 7, "p": "1.50000000", "q": "2.0", "f": 1, "l": 3, "T": 1700000000000, "m": True},
+        {"a": 8, "p": "1.6", "T": 1700000000001},
+    ]}).encode()
+    trades = codec.decode_list(body, AGG_TRADE_FIELDS, AggTrade, key="data")
+    assert trades == [AggTrade(7, "1.50000000", "2.0", 1700000000000), AggTrade(8, "1.6", "0", 1700000000001)]
+    assert codec.decode_list(b'{"code": "000000", "data": null}', AGG_TRADE_FIELDS, AggTrade, key="data") is None
+    assert codec.decode_list(b'{"msg": "x"}', AGG_TRADE_FIELDS, AggTrade, key="data") is None
+    # Non-object items are skipped; a bare array is accepted where an envelope was expected
+    assert codec.decode_list(b'[1, {"a": 1, "p": "2", "q": "3"}]', AGG_TRADE_FIELDS, AggTrade, key="data") \
+        == [AggTrade(1, "2", "3")]
+    with pytest.raises(ValueError):
+        codec.decode_list(b'{"data": [', AGG_TRADE_FIELDS, AggTrade, key="data")
+
+
+@pytest.mark.parametrize("codec", CODECS, ids=IDS)
+def test_token_fields_decode_to_the_registry_shape(codec):
+    body = json.dumps({"data": [
+        {"tokenId": "x", "chainId": "56", "symbol": "KOGE", "name": "KOGE Token", "alphaId": "ALPHA_1", "price": "1"},
+        {"baseSymbol": "ZKJ", "id": "ALPHA_2"},
+        {"name": ""},
+    ]}).encode()
+    tokens = [t for t in codec.decode_list(body, _TOKEN_FIELDS, _token_from_fields, key="data") if t is not None]
+    assert tokens == [AlphaToken("KOGE", "ALPHA_1", "KOGE Token"), AlphaToken("ZKJ", "ALPHA_2")]
+
+
+@pytest.mark.parametrize("codec", CODECS, ids=IDS)
+def test_dumps_encodes_decimal_like_pydantic(codec):
+    class M(BaseModel):
+        x: Decimal
+
+    for raw in ("1.50000000", "0.00000001", "-0", "1E+3", "123456789012345678901234567890.123456789"):
+        d = Decimal(raw)
+        assert codec.dumps({"x": d}) == M(x=d).model_dump_json().encode()
+    assert json.loads(codec.dumps({"s": "ä€", "n": [1, None, True]})) == {"s": "ä€", "n": [1, None, True]}
+    with pytest.raises(TypeError):
+        codec.dumps({"x": object()})
+
+
+def test_get_codec_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        json_codec.get_codec("yaml")
@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+import httpx
+
+from backend.benchmarks.bench_load import run_level, scenarios
+from backend.benchmarks.fake_upstream import AGG_TRADES_PATH, FakeBinance, FakeServer, load_recording
+from backend.config import config
+from backend.core.http_client import close_http_client
+from backend.main import app
+from backend.services import alpha_price_service
+
+
+def test_fake_upstream_replays_and_injects_faults(tmp_path):
+    recording = tmp_path / "trades.jsonl"
+    bodies = [{"data": [{"a": i, "p": "1", "q": "1", "T": 1}]} for i in (1, 2)]
+    recording.write_text("\n".join(json.dumps(b) for b in bodies))
+    fake = FakeBinance(load_recording(str(recording)))
+    with FakeServer(fake) as server:
+        got = [httpx.get(server.base_url + AGG_TRADES_PATH).json()["data"][0]["a"] for _ in range(3)]
+        assert got == [1, 2, 1]  # round-robin replay
+        fake.rate_429 = 1.0
+        resp = httpx.get(server.base_url + AGG_TRADES_PATH)
+        assert resp.status_code == 429 and resp.headers["retry-after"] == "1.0"
+    assert fake.counters["requests"] == 4 and fake.counters["throttled"] == 1
+
+
+def test_load_levels_against_fake_upstream(monkeypatch):
+    fake = FakeBinance(latency=0.005)
+    makers = scenarios(symbols=5)
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            try:
+                return [await run_level(client, makers[name], 4, 20) for name in ("price", "calc")]
+            finally:
+                await close_http_client()  # its connections belong to this loop
+
+    with FakeServer(fake) as server:
+        monkeypatch.setattr(config, "BINANCE_REST_BASE", server.base_url)
+        alpha_price_service._price_cache.clear()
+        price, calc = asyncio.run(main())
+    for result in (price, calc):
+        assert result["requests"] == 20 and result["errors"] == 0 and result["status"] == {"200": 20}
+        assert result["throughput_rps"] > 0 and 0 < result["p50_ms"] <= result["p99_ms"]
+    assert 5 <= fake.counters["agg_trades"] <= 20  # one miss per symbol, then cache hits
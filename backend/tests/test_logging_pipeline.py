@@ -0,0 +1,63 @@
+import io
+import json
+import logging
+import queue
+
+from backend.core import alerts
+from backend.core.alerts import AlertLimiter, alert_error
+from backend.core.logging import NonBlockingQueueHandler, setup_logging, stop_logging
+
+
+def test_records_are_written_as_json_by_the_listener():
+    out = io.StringIO()
+    setup_logging("INFO", stream=out)
+    try:
+        log = logging.getLogger("app.test")
+        log.info("hello %s", "world", extra={"fields": {"symbol": "KOGEUSDT", "n": 3}})
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError as e:
+            log.error("failed", exc_info=e)
+    finally:
+        stop_logging()  # drains the queue
+        setup_logging()
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    first, second = lines[-2:]
+    assert first["msg"] == "hello world" and first["symbol"] == "KOGEUSDT" and first["n"] == 3
+    assert first["level"] == "INFO" and first["logger"] == "app.test"
+    assert second["msg"] == "failed" and "RuntimeError: boom" in second["exc"]
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    for i in range(3):
+        handler.handle(logging.LogRecord("app", logging.INFO, __file__, 1, "m%d", (i,), None))
+    assert handler.dropped == 2
+    assert handler.queue.get_nowait().msg == "m0"
+
+
+def test_repeated_alerts_are_deduplicated_and_rate_limited(monkeypatch, caplog):
+    clock = [0.0]
+    monkeypatch.setattr(alerts, "limiter", AlertLimiter(60, 2, clock=lambda: clock[0]))
+
+    def fail():
+        raise ConnectionError("upstream down")
+
+    caplog.set_level(logging.ERROR, logger="alerts")
+    for _ in range(1000):
+        try:
+            fail()
+        except ConnectionError as e:
+            alert_error("Unhandled exception", e)
+    assert len(caplog.records) == 1
+    clock[0] = 61.0
+    try:
+        fail()
+    except ConnectionError as e:
+        alert_error("Unhandled exception", e)
+    assert len(caplog.records) == 2 and "repeated 999 more times" in caplog.records[-1].getMessage()
+    # Distinct alerts share the budget of 2 per minute
+    for i in range(5):
+        alert_error(f"other {i}")
+    assert len(caplog.records) == 3
+    assert alerts.limiter.stats()["suppressed"] == 999 + 4
@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+
+from backend.core import http_client, metrics
+from backend.core.metrics import Histogram, Registry
+from backend.main import app
+from backend.services import alpha_price_service
+from backend.services.binance_client import AggTrade
+
+
+def test_histogram_buckets_and_text_format(monkeypatch):
+    monkeypatch.setattr(metrics, "REGISTRY", Registry())
+    hist = Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+    child = hist.labels('/a"b')
+    for v in (0.05, 0.1, 0.5, 3.0):
+        child.observe(v)
+    assert child.counts == [2, 1, 1]  # le is inclusive; the last bucket is +Inf
+    lines = metrics.REGISTRY.render().splitlines()
+    assert lines[:2] == ["# HELP demo_seconds Demo.", "# TYPE demo_seconds histogram"]
+    assert lines[2:] == [
+        'demo_seconds_bucket{route="/a\\"b",le="0.1"} 2',
+        'demo_seconds_bucket{route="/a\\"b",le="1.0"} 3',
+        'demo_seconds_bucket{route="/a\\"b",le="+Inf"} 4',
+        'demo_seconds_sum{route="/a\\"b"} 3.65',
+        'demo_seconds_count{route="/a\\"b"} 4',
+    ]
+    assert hist.labels('/a"b') is child  # children are created once
+
+
+def test_disabled_instruments_are_noops(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    child = metrics.http_request_seconds.labels("/never")
+    child.observe(1.0)
+    assert child is metrics._NOOP and ("/never",) not in metrics.http_request_seconds._children
+
+
+def test_metrics_endpoint(monkeypatch):
+    async def handler(request):
+        return httpx.Response(200, json={"code": "000000", "data": [
+            {"a": 1, "p": "1.5", "q": "2", "T": 1700000000000}]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr("backend.services.binance_client.get_shared_client", lambda: client)
+    alpha_price_service._price_cache.clear()
+    c = TestClient(app)
+    assert c.get("/api/alpha/price", params={"alphaId": "METRIC"}).status_code == 200
+    assert c.get("/api/alpha/price", params={"alphaId": "METRIC"}).headers["X-Cache"] == "HIT"
+    c.get("/no/such/path")
+    resp = c.get("/metrics")
+    assert resp.status_code == 200 and resp.headers["content-type"].startswith("text/plain")
+    text = resp.text
+    assert 'http_requests_total{route="/api/alpha/price",status="200"}' in text
+    assert 'http_requests_total{route="<unmatched>",status="404"}' in text
+    assert 'upstream_responses_total{endpoint="/bapi/defi/v1/public/alpha-trade/agg-trades",status="200"}' in text
+    assert 'price_aggregate_duration_seconds_count{path="window"}' in text
+    for name in ("price_cache_hit_ratio", "rate_limit_rejected_total", "event_loop_lag_seconds",
+                 "upstream_governor_events_total"):
+        assert f"# TYPE {name} " in text
+    asyncio.run(client.aclose())
@@ -0,0 +1,67 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from backend.core.middleware import RateLimitMiddleware, RequestLoggingMiddleware, charge_up_front
+from backend.core.rate_limit import MemoryRateLimitStore, RateLimiter, RateRule
+
+
+def _app(limit=3, work=None):
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/batch")
+    async def batch(request: Request):
+        request.state.rate_limit_cost = 2
+        return {"ok": True}
+
+    @app.get("/fanout")
+    async def fanout(request: Request):
+        await charge_up_front(request, 3)
+        work.append(1)
+        return {"ok": True}
+
+    limiter = RateLimiter(MemoryRateLimitStore(), default=RateRule(limit, 60.0), routes={})
+    app.add_middleware(RequestLoggingMiddleware)
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    return app
+
+
+def test_request_id_is_propagated_or_generated():
+    with TestClient(_app()) as c:
+        assert c.get("/ping", headers={"X-Request-ID": "req-1"}).headers["X-Request-ID"] == "req-1"
+        assert len(c.get("/ping").headers["X-Request-ID"]) == 36
+
+
+def test_rate_limit_headers_cost_and_rejection():
+    with TestClient(_app(limit=4)) as c:
+        first = c.get("/ping")
+        assert first.headers["X-RateLimit-Limit"] == "4"
+        assert first.headers["X-RateLimit-Remaining"] == "3"
+        # Limits are per (client, path); the batch route costs 2 units per call
+        assert c.get("/batch").headers["X-RateLimit-Remaining"] == "2"
+        assert c.get("/batch").headers["X-RateLimit-Remaining"] == "0"
+        rejected = c.get("/batch")
+        assert rejected.status_code == 429
+        assert rejected.text == "Too Many Requests"
+        assert int(rejected.headers["Retry-After"]) >= 1
+        assert rejected.headers["X-RateLimit-Remaining"] == "0"
+
+
+def test_batch_cost_is_charged_before_the_work():
+    work = []
+    with TestClient(_app(limit=4, work=work)) as c:
+        assert c.get("/fanout").headers["X-RateLimit-Remaining"] == "1"
+        rejected = c.get("/fanout")  # 1 unit left, the batch needs 3
+        assert rejected.status_code == 429 and int(rejected.headers["Retry-After"]) >= 1
+        assert work == [1]
+
+
+def test_batch_costing_more_than_the_whole_limit_is_a_400():
+    work = []
+    with TestClient(_app(limit=2, work=work)) as c:
+        resp = c.get("/fanout")  # 3 units can never fit in 2 per window: waiting wouldn't help
+        assert resp.status_code == 400 and "Retry-After" not in resp.headers
+        assert work == []
@@ -0,0 +1,101 @@
+import asyncio
+
+from backend.services import alpha_price_service, prefetch_scheduler
+from backend.services.binance_client import AggTrade
+from backend.services.prefetch_scheduler import PrefetchScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+async def _noop(symbol):
+    return None
+
+
+def test_hot_set_pacing_and_aging_out():
+    clock = FakeClock()
+    ages = {}
+    sched = PrefetchScheduler(_noop, ages.get, top_k=3, max_rps=2, concurrency=10, half_life=10,
+                              min_score=2, ttl=1.0, clock=clock)
+    for sym, n in (("A", 5), ("B", 4), ("C", 3), ("D", 2), ("E", 1)):
+        for _ in range(n):
+            sched.touch(sym)
+    sched.plan(clock.now)
+    assert sched.stats()["hot"] == ["A", "B", "C"]
+    assert sched.interval == 1.5  # 3 hot symbols at 2 calls/s outweighs the TTL
+
+    # Due together, but paced one every 1 / max_rps seconds
+    fired = []
+    for _ in range(3):
+        fire, wait = sched.due(clock.now)
+        fired += fire
+        assert len(fire) == 1 and (wait is None or abs(wait - 0.5) < 1e-9)
+        clock.now += 0.5
+    assert sorted(fired) == ["A", "B", "C"]
+    assert sched.stats()["queue_depth"] == 0 and sched.max_lag == 1.0
+
+    # Data refreshed by someone else is skipped without spending budget
+    sched._running.clear()
+    for sym in "ABC":
+        sched._schedule(sym, clock.now)
+    ages["A"] = 0.1
+    fire, _ = sched.due(clock.now)
+    assert fire == ["B"] and sched.skipped == 1 and abs(sched._due["A"] - (clock.now + 1.4)) < 1e-9
+
+    # Without new requests everything cools down and is forgotten
+    clock.now += 200
+    sched.plan(clock.now)
+    assert sched.stats()["hot"] == [] and sched.stats()["tracked"] == 0
+
+
+def test_touch_evicts_in_constant_time_once_full(monkeypatch):
+    clock = FakeClock()
+    sched = PrefetchScheduler(_noop, lambda s: None, top_k=3, half_life=10, min_score=1, ttl=1.0, clock=clock)
+    monkeypatch.setattr(prefetch_scheduler, "_MAX_TRACKED", 3)
+
+    def no_plan(now):
+        raise AssertionError("touch must not plan")
+
+    monkeypatch.setattr(sched, "plan", no_plan)
+    for sym in ("A", "B", "A", "C", "D", "E"):
+        clock.now += 1
+        sched.touch(sym)
+    assert sorted(sched._scores) == ["C", "D", "E"]  # the least recently touched went first
+
+
+def test_hot_symbol_is_served_from_cache(monkeypatch):
+    calls = []
+
+    async def fake_fetch(symbol, limit=None, from_id=None):
+        calls.append(symbol)
+        await asyncio.sleep(0.01)
+        return [AggTrade(len(calls), "1.5", "2", 1700000000000)]
+
+    monkeypatch.setattr(alpha_price_service, "fetch_agg_trades", fake_fetch)
+    monkeypatch.setattr(alpha_price_service._price_cache, "ttl", 0.3)
+    monkeypatch.setattr(alpha_price_service.config, "PREFETCH_ENABLED", True)
+    alpha_price_service._price_cache.clear()
+    sched = PrefetchScheduler(alpha_price_service._prefetch, alpha_price_service._data_age,
+                              top_k=5, max_rps=50, min_score=2, ttl=0.3)
+    monkeypatch.setattr(alpha_price_service, "prefetcher", sched)
+
+    async def main():
+        sources = [(await alpha_price_service.fetch_alpha_price_with_source("HOT"))[1] for _ in range(3)]
+        assert sources == ["miss", "hit", "hit"]
+        await sched.start()
+        try:
+            await asyncio.sleep(1.2)
+            late = [(await alpha_price_service.fetch_alpha_price_with_source("HOT"))[1] for _ in range(3)]
+        finally:
+            await sched.stop()
+        return late
+
+    assert asyncio.run(main()) == ["hit", "hit", "hit"]
+    stats = sched.stats()
+    # Refreshed ahead of the 0.3s TTL: several upstream calls, none from the request path
+    assert stats["refreshes"] >= 3 and stats["errors"] == 0 and len(calls) == 1 + stats["refreshes"]
@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.services import alpha_price_service, price_broadcaster
+from backend.services.binance_client import AggTrade
+from backend.services.price_broadcaster import PriceBroadcaster, Subscriber
+
+
+def test_many_subscribers_share_one_upstream_loop(monkeypatch):
+    calls = []
+    prices = iter(["1.0", "1.0", "2.0"] + ["2.0"] * 100)
+
+    async def fake_fetch(symbol, limit=None, from_id=None):
+        calls.append(symbol)
+        return [AggTrade(len(calls), next(prices), "1")]
+
+    monkeypatch.setattr(alpha_price_service, "fetch_agg_trades", fake_fetch)
+    monkeypatch.setattr(alpha_price_service._price_cache, "ttl", 0.0)
+    alpha_price_service._price_cache.clear()
+
+    async def run():
+        b = PriceBroadcaster(interval=0.01, queue_size=8, policy="drop_oldest")
+        subs = [b.subscribe("FANOUT") for _ in range(200)]
+        first = [json.loads(await s.get(timeout=1)) for s in subs]
+        assert {m["price_now"] for m in first} == {"1.00000000"}
+        second = json.loads(await subs[0].get(timeout=1))
+        assert second["price_now"] == "2.00000000"
+        assert len(b.stats()["topics"]) == 1
+        for s in subs:
+            b.unsubscribe(s)
+        assert b.stats()["subscribers"] == 0 and b.stats()["topics"] == {}
+        polls = len(calls)
+        await asyncio.sleep(0.05)
+        assert len(calls) == polls  # loop stopped with the last subscriber
+        await b.close()
+
+    asyncio.run(run())
+
+
+def test_slow_consumer_policies():
+    async def run():
+        drop = Subscriber("X", queue_size=2, policy="drop_oldest")
+        conflate = Subscriber("X", queue_size=2, policy="conflate")
+        for i in range(5):
+            drop.put(str(i))
+            conflate.put(str(i))
+        assert [await drop.get(0), await drop.get(0)] == ["3", "4"] and drop.dropped == 3
+        assert await conflate.get(0) == "4" and conflate.dropped == 4
+        assert await conflate.get(0.01) is None
+
+    asyncio.run(run())
+
+
+def test_websocket_stream_endpoint(monkeypatch):
+    async def fake_fetch(symbol, limit=None, from_id=None):
+        return [AggTrade(1, "3.25", "1")]
+
+    monkeypatch.setattr(alpha_price_service, "fetch_agg_trades", fake_fetch)
+    alpha_price_service._price_cache.clear()
+    with TestClient(app) as c:
+        with c.websocket_connect("/api/alpha/stream/ws?alphaId=WSPUSH") as ws:
+            msg = json.loads(ws.receive_text())
+        assert msg["type"] == "price" and msg["price_now"] == "3.25000000"
+        assert msg["symbol"] == "WSPUSHUSDT"
@@ -0,0 +1,89 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from backend.core.cache import SingleFlight, TTLCache
+from backend.main import app
+from backend.services import alpha_price_service
+from backend.services.binance_client import AggTrade
+
+
+def _trades():
+    return [AggTrade(1, "1.0", "2.0"), AggTrade(2, "2.0", "1.0")]
+
+
+def test_concurrent_requests_share_one_upstream_fetch(monkeypatch):
+    calls = []
+
+    async def fake_fetch(symbol, limit=None, from_id=None):
+        calls.append(symbol)
+        await asyncio.sleep(0.05)
+        return _trades()
+
+    monkeypatch.setattr(alpha_price_service, "fetch_agg_trades", fake_fetch)
+    alpha_price_service._price_cache.clear()
+
+    async def run():
+        results = await asyncio.gather(*(
+            alpha_price_service.fetch_alpha_price_with_source("SFTEST") for _ in range(20)
+        ))
+        sources = sorted(r[1] for r in results)
+        assert calls == ["SFTESTUSDT"]
+        assert sources.count("miss") == 1 and sources.count("coalesced") == 19
+        # Within the TTL the snapshot is served from cache
+        snap, source, age = await alpha_price_service.fetch_alpha_price_with_source("SFTEST")
+        assert source == "hit" and age >= 0 and str(snap["price_now"]) == "2.00000000"
+        assert calls == ["SFTESTUSDT"]
+
+    asyncio.run(run())
+
+
+def test_price_route_exposes_cache_headers(monkeypatch):
+    async def fake_fetch(symbol, limit=None, from_id=None):
+        return _trades()
+
+    monkeypatch.setattr(alpha_price_service, "fetch_agg_trades", fake_fetch)
+    alpha_price_service._price_cache.clear()
+    with TestClient(app) as c:
+        first = c.get("/api/alpha/price", params={"alphaId": "HDRTEST"})
+        second = c.get("/api/alpha/price", params={"alphaId": "HDRTEST"})
+        stats = c.get("/api/stats/price-cache").json()
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert "Age" in second.headers and "X-Cache-Age-Ms" in second.headers
+    assert stats["hits"] >= 1 and stats["misses"] >= 1
+
+
+def test_ttl_cache_expiry_and_lru_eviction():
+    now = [0.0]
+    cache = TTLCache(ttl=1.0, maxsize=2, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.evictions == 1
+    now[0] = 0.5
+    assert cache.get("a") == (1, 0.5)
+    now[0] = 2.0
+    assert cache.get("a") is None
+
+
+def test_single_flight_survives_leader_cancellation():
+    async def run():
+        sf = SingleFlight()
+        gate = asyncio.Event()
+
+        async def work():
+            await gate.wait()
+            return 42
+
+        leader = asyncio.create_task(sf.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(sf.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        gate.set()
+        assert await follower == (42, True)
+        assert len(sf) == 0
+
+    asyncio.run(run())
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from backend.core import profiling
+from backend.core.middleware import RequestLoggingMiddleware
+from backend.core.profiling import SamplingProfiler, SlowRequestLog, collapsed, phase
+from backend.main import app
+
+
+def test_phase_is_a_noop_without_a_trace():
+    assert profiling.current_trace() is None
+    with phase("decode"):
+        pass
+    token = profiling.start_trace()
+    try:
+        with phase("decode"):
+            time.sleep(0.01)
+        with phase("decode"):
+            pass
+        breakdown = profiling.current_trace().breakdown()
+    finally:
+        profiling.end_trace(token)
+    assert breakdown["decode"]["count"] == 2 and breakdown["decode"]["ms"] >= 10
+
+
+def test_sampling_profiler_returns_collapsed_stacks():
+    stop = threading.Event()
+
+    def busy_worker():
+        while not stop.is_set():
+            sum(range(1000))
+
+    t = threading.Thread(target=busy_worker, name="busy")
+    t.start()
+    try:
+        stacks = SamplingProfiler().run(0.2, 0.005, [t.ident])
+    finally:
+        stop.set()
+        t.join()
+    text = collapsed(stacks)
+    assert text and all(line.startswith("busy;") for line in text.splitlines())
+    assert "test_profiling:test_sampling_profiler_returns_collapsed_stacks.<locals>.busy_worker" in text
+
+
+def test_slow_requests_are_captured_with_phases(monkeypatch):
+    ring = SlowRequestLog(threshold_ms=20, size=2)
+    monkeypatch.setattr(profiling, "slow_requests", ring)
+
+    async def inner(scope, receive, send):
+        with phase("upstream_request"):
+            await asyncio.sleep(0.03 if scope["path"] == "/slow" else 0)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    c = TestClient(RequestLoggingMiddleware(inner))  # no lifespan
+    c.get("/fast")
+    for _ in range(3):
+        c.get("/slow")
+    got = ring.recent(10)
+    assert ring.captured == 3 and len(got) == 2  # bounded ring
+    assert got[0]["path"] == "/slow" and got[0]["phases"]["upstream_request"]["ms"] >= 20
+    assert "send" in got[0]["phases"]
+
+
+def test_admin_profile_endpoint_is_opt_in(monkeypatch):
+    with TestClient(app) as c:
+        monkeypatch.setattr(profiling.config, "PROFILING_ENABLED", True)
+        assert c.get("/api/admin/profile", params={"seconds": 0.1}).status_code == 403  # no ADMIN_TOKEN: closed
+        monkeypatch.setattr(profiling.config, "ADMIN_TOKEN", "s3cret")
+        assert c.get("/api/admin/profile", params={"seconds": 0.1}).status_code == 403
+        monkeypatch.setattr(profiling.config, "PROFILING_ENABLED", False)
+        disabled = c.get("/api/admin/profile", params={"seconds": 0.1}, headers={"X-Admin-Token": "s3cret"})
+        assert disabled.status_code == 503
+        monkeypatch.setattr(profiling.config, "PROFILING_ENABLED", True)
+        resp = c.get("/api/admin/profile", params={"seconds": 0.1}, headers={"X-Admin-Token": "s3cret"})
+        assert resp.status_code == 200 and "attachment" in resp.headers["content-disposition"]
+        assert int(resp.headers["x-profile-samples"]) > 0
+        assert c.get("/api/admin/slow-requests", headers={"X-Admin-Token": "s3cret"}).json()["enabled"] is False
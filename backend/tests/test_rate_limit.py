@@ -0,0 +1,100 @@
+import asyncio
+import ipaddress
+
+from backend.core.rate_limit import (
+    MemoryRateLimitStore, RateLimiter, RateRule, RedisRateLimitStore, client_ip, gcra, parse_route_rules,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_gcra_burst_then_steady_rate():
+    async def run():
+        clock = Clock()
+        limiter = RateLimiter(MemoryRateLimitStore(clock=clock), default=RateRule(3, 60.0), routes={})
+        results = [(await limiter.acquire("1.1.1.1", "/x")) for _ in range(4)]
+        assert [d.allowed for d in results] == [True, True, True, False]
+        assert [d.remaining for d in results[:3]] == [2, 1, 0]
+        assert 19.9 < results[3].retry_after <= 20.0
+        clock.now += 20.0  # one interval later exactly one unit is back
+        assert (await limiter.acquire("1.1.1.1", "/x")).allowed
+        assert not (await limiter.acquire("1.1.1.1", "/x")).allowed
+        assert limiter.rejected == 2
+
+    asyncio.run(run())
+
+
+def test_route_rules_and_post_charged_cost():
+    rules = parse_route_rules("/api/alpha/prices=10/60, /api/alpha/stream=5/30:2")
+    assert rules["/api/alpha/stream"] == RateRule(5, 30.0, 2)
+
+    async def run():
+        limiter = RateLimiter(MemoryRateLimitStore(clock=Clock()), default=RateRule(60, 60.0), routes=rules)
+        d = await limiter.acquire("c", "/api/alpha/stream")
+        assert d.remaining == 3  # cost 2 of 5
+        await limiter.acquire("c", "/api/alpha/prices")
+        d = await limiter.charge("c", "/api/alpha/prices", 8)
+        assert d.allowed and d.remaining == 1
+        assert (await limiter.acquire("c", "/api/alpha/prices")).allowed
+        assert not (await limiter.acquire("c", "/api/alpha/prices")).allowed
+
+    asyncio.run(run())
+
+
+def test_memory_store_is_bounded_and_sweeps_idle_keys():
+    async def run():
+        clock = Clock()
+        store = MemoryRateLimitStore(max_keys=100, clock=clock)
+        rule = RateRule(10, 1.0)
+        for i in range(1000):
+            await store.acquire(f"ip{i}", rule, 1)
+        assert len(store) == 100 and store.evicted == 900
+        clock.now += 5.0
+        for _ in range(20):
+            await store.acquire("fresh", rule, 1)
+        assert len(store) < 100 and store.swept > 0
+
+    asyncio.run(run())
+
+
+def test_forwarded_for_only_from_trusted_proxies():
+    trusted = [ipaddress.ip_network("10.0.0.0/8")]
+    assert client_ip("203.0.113.9", "1.2.3.4", trusted) == "203.0.113.9"
+    assert client_ip("10.0.0.2", "1.2.3.4, 10.0.0.7", trusted) == "1.2.3.4"
+    assert client_ip("10.0.0.2", "6.6.6.6, 1.2.3.4", trusted) == "1.2.3.4"  # spoofed left hop ignored
+    assert client_ip("10.0.0.2", "1.2.3.4", []) == "10.0.0.2"
+
+
+class FakeSharedRedis:
+    """Stand-in for a shared Redis: one key space, the Lua GCRA step emulated in Python."""
+
+    def __init__(self, clock):
+        self.data = {}
+        self.clock = clock
+
+    def register_script(self, _lua):
+        async def script(keys, args):
+            interval, window, cost, force = float(args[0]), float(args[1]), int(args[2]), args[3] == "1"
+            rule = RateRule(max(1, round(window / interval)), window)
+            decision, new_tat = gcra(self.data.get(keys[0]), self.clock(), rule, cost, force)
+            if new_tat is not None:
+                self.data[keys[0]] = new_tat
+            return [int(decision.allowed), decision.remaining, int(decision.retry_after * 1000)]
+        return script
+
+
+def test_shared_store_limits_across_workers():
+    async def run():
+        shared = FakeSharedRedis(Clock())
+        rule = RateRule(4, 60.0)
+        workers = [RateLimiter(RedisRateLimitStore(shared), default=rule, routes={}) for _ in range(2)]
+        allowed = [(await workers[i % 2].acquire("ip", "/x")).allowed for i in range(6)]
+        assert allowed == [True, True, True, True, False, False]
+
+    asyncio.run(run())
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from decimal import Decimal
+
+from backend.core.http_client import UpstreamUnavailable
+from backend.services import alpha_price_service, shared_price_cache
+from backend.services.shared_price_cache import SharedPriceCache, SharedPriceStore, _SEQ
+
+
+def _snap(symbol, price, ts=1700000000000):
+    return {"symbol": symbol, "price_now": Decimal(price), "price_avg": Decimal(price),
+            "price_vwap": Decimal(price), "timestamp": ts}
+
+
+def test_one_writer_and_exact_round_trip(tmp_path):
+    path = str(tmp_path / "prices")
+    a, b = SharedPriceStore(path, slots=8), SharedPriceStore(path, slots=8)  # two "workers"
+    assert a.try_become_writer() and not b.try_become_writer()
+    assert b.read("KOGEUSDT") is None
+    assert a.publish(_snap("KOGEUSDT", "48.12345678"))
+    snap, age = b.read("KOGEUSDT")
+    assert snap["price_now"] == Decimal("48.12345678") and str(snap["price_vwap"]) == "48.12345678"
+    assert snap["timestamp"] == 1700000000000 and 0 <= age < 1
+    assert not a.publish(_snap("HUGE", "1e20"))  # doesn't fit int64 at 8 places
+
+    # Probing wraps around, and a full table refuses new symbols
+    for i in range(7):
+        assert a.publish(_snap(f"S{i}", "1"))
+    assert b.used() == 8 and not a.publish(_snap("ONE_TOO_MANY", "1"))
+    assert all(b.read(f"S{i}")[0]["symbol"] == f"S{i}" for i in range(7))
+
+    # The lock dies with its holder: another worker takes over
+    a.close()
+    assert b.try_become_writer()
+    b.close()
+
+
+def test_reader_never_sees_a_write_in_progress(tmp_path, monkeypatch):
+    path = str(tmp_path / "prices")
+    writer, reader = SharedPriceStore(path, slots=4), SharedPriceStore(path, slots=4)
+    writer.try_become_writer()
+    writer.publish(_snap("X", "1.5"))
+    off = reader._slot("X", claim=False)
+    seq = _SEQ.unpack_from(reader._mm, off)[0]
+    _SEQ.pack_into(writer._mm, off, seq + 1)  # writer stopped half way
+    monkeypatch.setattr(shared_price_cache, "_READ_RETRIES", 3)
+    assert reader.read("X") is None
+    writer.publish(_snap("X", "2.5"))  # the next publish repairs the sequence
+    assert reader.read("X")[0]["price_now"] == Decimal("2.5")
+    writer.close()
+    reader.close()
+
+
+def test_follower_waits_for_the_writer(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_price_cache.config, "SHARED_CACHE_ENABLED", True)
+    calls = []
+
+    async def refresh(symbol):
+        calls.append(symbol)
+        await asyncio.sleep(0.01)
+        writer.publish(_snap(symbol, "3.25"))
+
+    path = str(tmp_path / "prices")
+    writer = SharedPriceCache(refresh, path=path, ttl=0.2, wait=2.0)
+    follower = SharedPriceCache(refresh, path=path, ttl=0.2, wait=2.0)
+
+    async def main():
+        await writer.start()
+        await follower.start()
+        try:
+            assert writer.store.is_writer and follower.following
+            assert follower.get("ABC") is None
+            snap, age = await follower.wait("ABC")  # the writer's loop sees it wanted
+            assert snap["price_now"] == Decimal("3.25") and age < 0.2
+            await asyncio.sleep(0.5)
+            assert follower.get("ABC") is not None  # kept fresh ahead of the TTL
+        finally:
+            await follower.stop()
+            await writer.stop()
+
+    asyncio.run(main())
+    assert calls.count("ABC") >= 2 and set(calls) == {"ABC"}
+
+
+def test_follower_stops_waiting_on_writer_failure_and_serves_its_last_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_price_cache.config, "SHARED_CACHE_ENABLED", True)
+    fail = [False]
+
+    async def refresh(symbol):
+        if fail[0]:
+            raise UpstreamUnavailable("breaker open")
+        writer.publish(_snap(symbol, "4.5"))
+
+    async def unavailable(symbol):
+        raise UpstreamUnavailable("breaker open")
+
+    path = str(tmp_path / "prices")
+    writer = SharedPriceCache(refresh, path=path, ttl=0.1, wait=2.0)
+    follower = SharedPriceCache(refresh, path=path, ttl=0.1, wait=2.0)
+    monkeypatch.setattr(alpha_price_service, "shared_prices", follower)
+    monkeypatch.setattr(alpha_price_service, "_fetch_upstream", unavailable)
+
+    async def main():
+        await writer.start()
+        await follower.start()
+        try:
+            assert (await follower.wait("DOWNUSDT"))[0]["price_now"] == Decimal("4.5")
+            fail[0] = True
+            await asyncio.sleep(0.2)  # expired, and the writer's refreshes now fail
+            started = time.monotonic()
+            assert await follower.wait("DOWNUSDT") is None
+            assert time.monotonic() - started < 1.0 and follower.counters["wait_failures"] == 1
+            return await alpha_price_service.fetch_alpha_price_with_source("DOWNUSDT")
+        finally:
+            await follower.stop()
+            await writer.stop()
+
+    snap, source, age = asyncio.run(main())
+    assert source == "stale" and snap["price_now"] == Decimal("4.5") and age >= 0.2
+
+
+def test_writer_drains_wanted_slots_from_the_ring(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_price_cache.config, "SHARED_CACHE_ENABLED", True)
+    path = str(tmp_path / "prices")
+
+    async def refresh(symbol):
+        writer.publish(_snap(symbol, "1.25"))
+
+    writer = SharedPriceCache(refresh, path=path, ttl=0.1, wait=2.0)
+    follower = SharedPriceCache(refresh, path=path, ttl=0.1, wait=2.0)
+
+    async def main():
+        await writer.start()
+        await follower.start()
+        try:
+            for sym in ("R1", "R2"):
+                assert (await follower.wait(sym))[0]["price_now"] == Decimal("1.25")
+            await asyncio.sleep(0.3)
+            assert follower.get("R2") is not None  # still kept fresh
+            st = writer.stats()
+            assert st["full_scans"] == 1 and st["wanted"] == 2  # only at election
+
+            # A ring that wrapped before being drained falls back to one full scan
+            store = follower.store
+            cursor = store.ring_head()
+            off = store._slot("R1", claim=False)
+            for _ in range(shared_price_cache._RING_SIZE + 1):
+                store._push(off)
+            assert store.drain(cursor)[1] is None
+            assert store.drain(store.ring_head() - 1)[1] == [off]
+        finally:
+            await follower.stop()
+            await writer.stop()
+
+    asyncio.run(main())
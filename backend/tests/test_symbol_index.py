@@ -0,0 +1,108 @@
+import asyncio
+
+import httpx
+import pytest
+
+from backend.core.http_client import UpstreamUnavailable
+from backend.services import alpha_price_service, binance_client
+from backend.services.alpha_token_service import token_registry
+from backend.services.binance_client import SymbolNotFound
+from backend.services.symbol_mapping import SymbolIndex, resolve_symbol, symbol_index
+from backend.services.token_registry import AlphaToken, RemoteTokenList, TokenSnapshot
+
+
+def test_listed_symbols_pass_and_unlisted_are_rejected_locally():
+    idx = SymbolIndex(negative_ttl=60)
+    idx.check("ANYTHINGUSDT")  # no token list yet: not authoritative
+    idx.rebuild(TokenSnapshot(RemoteTokenList([AlphaToken("KOGE", "ALPHA_118")]), {"ALPHA_22": "FOO"}, 1))
+    for symbol in ("KOGEUSDT", "ALPHA_118USDT", "FOOUSDT"):
+        idx.check(symbol)
+    with pytest.raises(SymbolNotFound):
+        idx.check("KOGGEUSDT")
+    # Upstream "not found" sticks until the token list starts listing the symbol
+    idx.not_found("KOGEUSDT")
+    with pytest.raises(SymbolNotFound):
+        idx.check("KOGEUSDT")
+    idx.rebuild(TokenSnapshot(RemoteTokenList([AlphaToken("KOGE", "ALPHA_118"), AlphaToken("NEW", "ALPHA_7")]), {}, 2))
+    idx.check("NEWUSDT")
+    with pytest.raises(SymbolNotFound):
+        idx.check("KOGEUSDT")
+    st = idx.stats()
+    assert st["rejected_unlisted"] == 1 and st["rejected_not_found"] == 2 and st["upstream_calls_avoided"] == 3
+
+
+def test_local_file_list_does_not_reject_manual_symbols():
+    idx = SymbolIndex(negative_ttl=60)
+    # What the registry holds when the remote list is unavailable and the local file is used
+    idx.rebuild(TokenSnapshot([AlphaToken("KOGE", "ALPHA_118")], {"ALPHA_118": "KOGE"}, 1))
+    idx.check("BNBUSDT")
+    assert idx.stats()["authoritative"] is False
+    idx.not_found("BNBUSDT")  # the upstream negative cache still applies
+    with pytest.raises(SymbolNotFound):
+        idx.check("BNBUSDT")
+
+
+def test_resolve_memo_is_invalidated_when_the_mapping_changes():
+    snap = token_registry.snapshot
+    assert resolve_symbol("ALPHA_9") == "ALPHA_9USDT"
+    token_registry._swap(snap.tokens, {**snap.local_map, "ALPHA_9": "NINE"})
+    try:
+        assert resolve_symbol("ALPHA_9") == "NINEUSDT"
+    finally:
+        token_registry._swap(snap.tokens, snap.local_map)
+    assert resolve_symbol("ALPHA_9") == "ALPHA_9USDT"
+
+
+def test_upstream_not_found_goes_to_negative_cache(monkeypatch):
+    calls = []
+
+    async def fake_fetch(symbol, limit=None, from_id=None):
+        calls.append(symbol)
+        raise SymbolNotFound(f"Unknown symbol: {symbol}")  # the upstream said so explicitly
+
+    monkeypatch.setattr(alpha_price_service, "fetch_agg_trades", fake_fetch)
+    before = symbol_index.stats()["upstream_calls_avoided"]
+
+    async def run():
+        for _ in range(3):
+            with pytest.raises(SymbolNotFound):
+                await alpha_price_service.fetch_alpha_price_with_source("NOPE")
+
+    try:
+        asyncio.run(run())
+    finally:
+        symbol_index._negative.pop("NOPEUSDT")
+    assert calls == ["NOPEUSDT"]
+    assert symbol_index.stats()["upstream_calls_avoided"] - before == 2
+
+
+def test_only_an_explicit_unknown_symbol_answer_is_not_found(monkeypatch):
+    answers = {
+        "GONEUSDT": (400, {"code": -1121, "msg": "Invalid symbol."}),
+        "BADIDUSDT": (400, {"code": -1100, "msg": "Illegal characters found in parameter 'fromId'."}),
+        "EMPTYUSDT": (200, {"code": "000000", "data": None, "success": True}),
+    }
+
+    def handler(request):
+        status, body = answers[request.url.params["symbol"]]
+        return httpx.Response(status, json=body)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(binance_client, "get_shared_client", lambda: client)
+
+    async def run():
+        with pytest.raises(SymbolNotFound):
+            await binance_client.fetch_agg_trades("GONEUSDT")
+        with pytest.raises(httpx.HTTPStatusError):
+            await binance_client.fetch_agg_trades("BADIDUSDT", 5, from_id=10)
+        assert await binance_client.fetch_agg_trades("EMPTYUSDT") is None
+        with pytest.raises(UpstreamUnavailable):  # no data, no reason: transient
+            await alpha_price_service.fetch_alpha_price_with_source("EMPTYUSDT")
+        await client.aclose()
+
+    try:
+        asyncio.run(run())
+        symbol_index.check("BADIDUSDT")
+        symbol_index.check("EMPTYUSDT")  # not negative-cached
+    finally:
+        alpha_price_service.agg_trade_poller.forget("EMPTYUSDT")
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import os
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.services import alpha_token_service
+from backend.services.token_registry import AlphaToken, TokenRegistry
+
+
+def _registry(tmp_path, tokens):
+    calls = []
+
+    async def loader(raise_on_error=False):
+        calls.append(raise_on_error)
+        if isinstance(tokens, Exception):
+            raise tokens
+        return list(tokens)
+
+    return TokenRegistry(loader, str(tmp_path / "alpha_tokens.json")), calls
+
+
+def test_indexes_and_atomic_refresh(tmp_path):
+    reg, calls = _registry(tmp_path, [AlphaToken("KOGE", "ALPHA_118")])
+
+    async def run():
+        snap = await reg.get_snapshot()
+        assert snap.by_alpha_id["ALPHA_118"].symbol == "KOGE"
+        assert snap.by_base["KOGE"].alpha_id == "ALPHA_118"
+        assert snap.by_symbol["KOGEUSDT"].alpha_id == "ALPHA_118"
+        # Loaded once: later reads don't hit the source
+        await reg.get_snapshot()
+        assert calls == [False]
+        # A failing refresh keeps the previous list
+        async def broken(raise_on_error=False):
+            raise RuntimeError("upstream down")
+        reg._loader = broken
+        snap2 = await reg.refresh()
+        assert snap2.tokens == snap.tokens and snap2.etag == snap.etag
+        assert reg.refresh_errors == 1
+
+    asyncio.run(run())
+
+
+def test_local_mapping_reloads_on_mtime_change(tmp_path):
+    reg, _ = _registry(tmp_path, [])
+    assert reg.snapshot.local_map == {}
+    path = tmp_path / "alpha_tokens.json"
+    path.write_text(json.dumps({"alpha_1": "abc"}))
+    assert reg.reload_local_if_changed() is True
+    assert reg.snapshot.local_map == {"ALPHA_1": "ABC"}
+    assert reg.reload_local_if_changed() is False
+    path.write_text(json.dumps({"ALPHA_1": "XYZ"}))
+    os.utime(path, (1, 1))
+    assert reg.reload_local_if_changed() is True
+    assert reg.snapshot.local_map["ALPHA_1"] == "XYZ"
+
+
+def test_tokens_route_supports_etag(monkeypatch, tmp_path):
+    reg, _ = _registry(tmp_path, [AlphaToken("KOGE", "ALPHA_118")])
+    monkeypatch.setattr(alpha_token_service, "token_registry", reg)
+    with TestClient(app) as c:
+        first = c.get("/api/alpha/tokens")
+        assert first.status_code == 200
+        assert first.json() == [{"symbol": "KOGE", "alphaId": "ALPHA_118"}]
+        etag = first.headers["ETag"]
+        second = c.get("/api/alpha/tokens", headers={"If-None-Match": etag})
+        assert second.status_code == 304 and second.content == b""
+        third = c.get("/api/alpha/tokens", headers={"If-None-Match": '"stale"'})
+        assert third.status_code == 200
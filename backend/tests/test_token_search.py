@@ -0,0 +1,52 @@
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.services import alpha_token_service
+from backend.services.token_registry import AlphaToken, TokenRegistry
+from backend.services.token_search import TokenSearchIndex
+
+TOKENS = [
+    AlphaToken("KOGE", "ALPHA_118", "BNB48 Club Token"),
+    AlphaToken("KOGECOIN", "ALPHA_200", "Koge Coin"),
+    AlphaToken("ZKJ", "ALPHA_22", "Polyhedra Network"),
+    AlphaToken("B2", "ALPHA_3", "BSquared Network"),
+]
+
+
+def test_exact_beats_prefix_and_pagination():
+    idx = TokenSearchIndex(TOKENS)
+    res = idx.search("koge", limit=1)
+    assert res["total"] == 2
+    assert [t["symbol"] for t in res["items"]] == ["KOGE"]
+    page2 = idx.search("koge", limit=1, offset=1)
+    assert [t["symbol"] for t in page2["items"]] == ["KOGECOIN"]
+
+
+def test_total_and_pages_do_not_depend_on_the_page_size():
+    idx = TokenSearchIndex([AlphaToken("KOGE", "ALPHA_1"), AlphaToken("KOGECOIN", "ALPHA_2"),
+                            AlphaToken("XKOGEX", "ALPHA_3", "Xkogex")])
+    pages = [idx.search("koge", limit=n) for n in (1, 2, 3)]
+    assert [p["total"] for p in pages] == [3, 3, 3]
+    assert [t["symbol"] for t in pages[2]["items"]] == ["KOGE", "KOGECOIN", "XKOGEX"]
+    paged = [t["symbol"] for off in range(3) for t in idx.search("koge", limit=1, offset=off)["items"]]
+    assert paged == ["KOGE", "KOGECOIN", "XKOGEX"]
+
+
+def test_alpha_id_prefix_and_fuzzy_name():
+    idx = TokenSearchIndex(TOKENS)
+    assert [t["alphaId"] for t in idx.search("alpha_11")["items"]] == ["ALPHA_118"]
+    # Typo in the name still finds the token through trigram overlap
+    fuzzy = idx.search("polyhedro")
+    assert fuzzy["items"] and fuzzy["items"][0]["symbol"] == "ZKJ"
+    assert idx.search("qqqq")["total"] == 0
+
+
+def test_search_route_uses_registry_index(monkeypatch, tmp_path):
+    async def loader(raise_on_error=False):
+        return list(TOKENS)
+
+    reg = TokenRegistry(loader, str(tmp_path / "missing.json"))
+    monkeypatch.setattr(alpha_token_service, "token_registry", reg)
+    with TestClient(app) as c:
+        body = c.get("/api/alpha/tokens/search", params={"q": "zk", "limit": 5}).json()
+    assert body["items"][0]["alphaId"] == "ALPHA_22"
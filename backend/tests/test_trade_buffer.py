@@ -0,0 +1,86 @@
+import random
+from decimal import Decimal
+
+from backend.services.alpha_price_service import _aggregate_prices_decimal as _aggregate_prices
+from backend.services.binance_client import AggTrade, TradeColumns
+from backend.services.trade_buffer import TradeBufferRegistry, TradeRingBuffer
+
+
+def _trade(agg_id, p, q):
+    return AggTrade(agg_id, p, q)
+
+
+def _random_price(rng):
+    return str(Decimal(rng.randint(1, 10**12)).scaleb(-rng.randint(0, 10)))
+
+
+def test_incremental_metrics_match_reference_exactly():
+    rng = random.Random(7)
+    window = 50
+    buf = TradeRingBuffer(window)
+    history = []
+    next_id = 1
+    for _ in range(200):
+        # Overlapping polls: re-send part of the previous window plus a few new trades
+        new = [_trade(next_id + i, _random_price(rng), _random_price(rng)) for i in range(rng.randint(0, 7))]
+        next_id += len(new)
+        history.extend(new)
+        poll = history[-window:]
+        rng.shuffle(poll)
+        buf.add(poll)
+        if history:
+            assert buf.metrics() == _aggregate_prices(history[-window:])
+            assert {k: str(v) for k, v in buf.metrics().items()} == \
+                {k: str(v) for k, v in _aggregate_prices(history[-window:]).items()}
+
+
+def test_inexact_sums_fall_back_to_reference_order():
+    buf = TradeRingBuffer(3)
+    trades = [
+        _trade(1, "123456789012345678.123456789", "98765432109876543.21"),
+        _trade(2, "0.000000000000000001", "3"),
+        _trade(3, "7.5", "0.000000000000000000001"),
+        _trade(4, "1.1", "2.2"),
+    ]
+    for t in trades:
+        buf.add([t])
+    assert buf.metrics() == _aggregate_prices(trades[-3:])
+
+
+def test_dedupe_and_late_trades():
+    buf = TradeRingBuffer(3)
+    assert buf.add([_trade(1, "1", "1"), _trade(3, "3", "1")]) == 2
+    assert buf.add([_trade(3, "3", "1"), _trade(2, "2", "1")]) == 1
+    assert buf.trade_ids() == [1, 2, 3]
+    assert buf.add([_trade(4, "4", "1"), _trade(0, "9", "9")]) == 1  # id 0 is older than the window
+    assert buf.trade_ids() == [2, 3, 4]
+    assert str(buf.metrics()["last"]) == "4.00000000"
+
+
+def test_long_window_compacts_and_keeps_newest_trades():
+    buf = TradeRingBuffer(100)
+    trades = [_trade(i, f"{i}.5", "2") for i in range(1, 1001)]
+    for i in range(0, len(trades), 7):
+        buf.add(trades[i:i + 7])
+    assert buf.trade_ids() == list(range(901, 1001))
+    assert len(buf._cols) < 200  # evicted rows were dropped from the arrays
+    assert buf.metrics() == _aggregate_prices(trades[-100:])
+
+
+def test_columns_switch_to_python_ints_instead_of_overflowing():
+    cols = TradeColumns.from_trades([_trade(1, "1.5", "2"), _trade(2, "2.25", "3")])
+    assert (cols.prices.tolist(), cols.price_scale) == ([150, 225], 2)
+    cols.extend([_trade(3, "9" * 20, "1"), _trade(4, "0.001", "1")])
+    assert isinstance(cols.prices, list) and cols.price_scale == 3
+    assert cols.prices == [1500, 2250, int("9" * 20) * 1000, 1]
+    assert cols.agg_ids.tolist() == [1, 2, 3, 4] and len(cols.times) == 4
+
+
+def test_registry_evicts_least_recently_used_symbol():
+    reg = TradeBufferRegistry(capacity=5, max_symbols=2)
+    reg.ingest("AUSDT", [_trade(1, "1", "1")])
+    reg.ingest("BUSDT", [_trade(1, "1", "1")])
+    reg.get("AUSDT")
+    reg.ingest("CUSDT", [_trade(1, "1", "1")])
+    assert reg.get("BUSDT") is None
+    assert reg.get("AUSDT") is not None and len(reg) == 2
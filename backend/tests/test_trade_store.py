@@ -0,0 +1,191 @@
+import os
+import random
+import threading
+import time
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+
+from backend.core.precision import quantize
+from backend.main import app
+from backend.services import trade_store
+from backend.services.binance_client import AggTrade
+from backend.services.trade_store import TradeStore
+
+T0 = 1_700_000_000_000
+HOUR = 3_600_000
+
+
+def _trades(n, rng, start_id=1, start_time=T0, step=1000):
+    out, t = [], start_time
+    for i in range(n):
+        t += rng.randint(0, step)
+        # Mixed decimals, so segments get widened along the way
+        price = str(Decimal(rng.randint(1, 10 ** 9)).scaleb(-rng.randint(2, 8)))
+        qty = str(Decimal(rng.randint(1, 10 ** 6)).scaleb(-rng.randint(0, 3)))
+        out.append(AggTrade(start_id + i, price, qty, t))
+    return out
+
+
+def _reference(trades, start, end):
+    rows = [t for t in trades if start <= t.time < end]
+    prices = [Decimal(t.price) for t in rows]
+    qtys = [Decimal(t.qty) for t in rows]
+    volume = sum(qtys, Decimal(0))
+    return {
+        "count": len(rows),
+        "open": quantize(prices[0]), "close": quantize(prices[-1]),
+        "high": quantize(max(prices)), "low": quantize(min(prices)),
+        "avg": quantize(sum(prices, Decimal(0)) / len(prices)),
+        "vwap": quantize(sum(p * q for p, q in zip(prices, qtys)) / volume),
+        "volume": volume,
+        "ids": [t.agg_id for t in rows],
+    }
+
+
+def test_range_queries_match_reference_across_segments(tmp_path):
+    rng = random.Random(11)
+    trades = _trades(5000, rng, step=5000)  # ~3.5 hours over 15-minute segments
+    store = TradeStore(str(tmp_path), segment_seconds=900, max_open_segments=3)
+    for i in range(0, len(trades), 137):
+        batch = trades[i:i + 137]
+        rng.shuffle(batch)
+        store.append("koge", batch)
+        if rng.random() < 0.3:
+            store.flush()
+    assert len(store.partitions("KOGE")) > 10
+    for _ in range(20):
+        a, b = sorted(rng.randint(T0, trades[-1].time + 1) for _ in range(2))
+        if not any(a <= t.time < b for t in trades):
+            continue
+        got = store.query("KOGE", a, b, limit=50)
+        ref = _reference(trades, a, b)
+        assert got["count"] == ref["count"]
+        assert [got[k] for k in ("open", "close", "high", "low", "avg", "vwap", "volume")] == \
+            [ref[k] for k in ("open", "close", "high", "low", "avg", "vwap", "volume")]
+        assert [r["a"] for r in got["trades"]] == ref["ids"][:50]
+        assert got["truncated"] == (ref["count"] > 50)
+        first = got["trades"][0]
+        assert first["p"] == Decimal(trades[first["a"] - 1].price)
+    store.close()
+
+    # Reopened from disk: data is kept and ingestion continues after the last stored id
+    reopened = TradeStore(str(tmp_path), segment_seconds=900)
+    reopened.append("KOGE", trades[-10:])  # buffered: the flush drops what is already on disk
+    more = _trades(3, rng, start_id=len(trades) + 1, start_time=trades[-1].time)
+    assert reopened.append("KOGE", more) == 3
+    assert reopened.flush() == 3
+    assert reopened.query("KOGE", T0, more[-1].time + 1)["count"] == len(trades) + 3
+    reopened.close()
+
+
+def test_append_never_waits_for_the_io_lock(tmp_path):
+    store = TradeStore(str(tmp_path), segment_seconds=900)
+    store.append("KOGE", [AggTrade(1, "1", "1", T0)])
+    store.flush()
+    store.close()
+    reopened = TradeStore(str(tmp_path), segment_seconds=900)  # first sight of KOGE in this process
+    held, release = threading.Event(), threading.Event()
+
+    def stuck_flush():  # e.g. waiting on another process's flock
+        with reopened._io_lock:
+            held.set()
+            release.wait(5)
+
+    t = threading.Thread(target=stuck_flush)
+    t.start()
+    held.wait(5)
+    try:
+        started = time.monotonic()
+        assert reopened.append("KOGE", [AggTrade(1, "1", "1", T0), AggTrade(2, "1", "1", T0 + 1)]) == 2
+        assert time.monotonic() - started < 1
+    finally:
+        release.set()
+        t.join()
+    assert reopened.flush() == 1  # id 1 was already stored
+    reopened.close()
+
+
+def test_duplicates_and_backwards_times_are_dropped(tmp_path):
+    store = TradeStore(str(tmp_path), segment_seconds=3600)
+    assert store.append("X", [AggTrade(2, "1", "1", T0 + 10), AggTrade(1, "1", "1", T0)]) == 2
+    assert store.append("X", [AggTrade(2, "5", "1", T0 + 10), AggTrade(3, "2", "1", T0 + 5)]) == 0
+    assert store.append("X", [AggTrade(4, "3", "2", T0 + 20), AggTrade(4, "3", "2", T0 + 20)]) == 1
+    got = store.query("X", T0, T0 + 100)
+    assert [r["a"] for r in got["trades"]] == [1, 2, 4]
+    assert got["vwap"] == Decimal("2.00000000") and got["volume"] == Decimal(4)
+    assert store.stats()["dropped"] == 2
+    store.close()
+
+
+def test_torn_append_is_repaired_on_reopen(tmp_path):
+    store = TradeStore(str(tmp_path), segment_seconds=3600)
+    store.append("X", _trades(3000, random.Random(3), step=1))
+    store.close()
+    segment = os.path.join(str(tmp_path), "X", str(T0 // HOUR * HOUR))
+    # Simulate a crash between column writes: one column and the index are short
+    with open(os.path.join(segment, "qty.i64"), "r+b") as f:
+        f.truncate(2500 * 8 + 3)
+    with open(os.path.join(segment, "index.i64"), "r+b") as f:
+        f.truncate(8)
+
+    store = TradeStore(str(tmp_path), segment_seconds=3600)
+    assert store.query("X", T0, T0 + HOUR)["count"] == 2500
+    store.append("X", [AggTrade(5000, "1", "1", T0 + 4000)])
+    got = store.query("X", T0 + 3999, T0 + HOUR)
+    assert [r["a"] for r in got["trades"]] == [5000]
+    assert os.path.getsize(os.path.join(segment, "index.i64")) == 3 * 8
+    store.close()
+
+
+def test_prune_removes_segments_past_retention(tmp_path):
+    now = int(time.time() * 1000)
+    store = TradeStore(str(tmp_path), segment_seconds=3600)
+    store.append("X", [AggTrade(1, "1", "1", now - 10 * HOUR), AggTrade(2, "1", "1", now)])
+    store.query("X", 0, now + 1)  # maps the old segment too
+    assert len(store.partitions("X")) == 2
+    assert store.prune(retention_hours=5) == 1
+    assert store.partitions("X") == [now // HOUR * HOUR]
+    assert store.query("X", 0, now + 1)["count"] == 1
+    assert store.prune(retention_hours=0) == 0
+    store.close()
+
+
+def test_history_endpoint(tmp_path, monkeypatch):
+    c = TestClient(app)
+    assert c.get("/api/alpha/history", params={"alphaId": "KOGE", "from": T0}).status_code == 503
+
+    store = TradeStore(str(tmp_path))
+    monkeypatch.setattr(trade_store, "_store", store)
+    trade_store.record_trades("KOGEUSDT", [AggTrade(1, "1.5", "2", T0), AggTrade(2, "2.5", "2", T0 + 1)])
+    resp = c.get("/api/alpha/history", params={"alphaId": "KOGE", "from": T0, "to": T0 + 2, "limit": 1})
+    body = resp.json()
+    assert resp.status_code == 200
+    assert body["symbol"] == "KOGEUSDT" and body["count"] == 2 and body["truncated"] is True
+    assert body["vwap"] == "2.00000000" and body["volume"] == "4"
+    assert body["trades"] == [{"a": 1, "T": T0, "p": "1.5", "q": "2"}]
+    assert c.get("/api/alpha/history", params={"alphaId": "KOGE", "from": T0, "to": T0}).status_code == 400
+    # Symbols become directory names: nothing outside the store root is reachable
+    for bad in ("../../x", "..\\X", "A/B"):
+        assert c.get("/api/alpha/history", params={"alphaId": bad, "from": T0}).status_code == 400
+    assert c.get("/api/stats/trade-store").json()["rows_written"] == 2
+    store.close()
+
+
+def test_two_workers_on_one_directory_store_each_trade_once(tmp_path):
+    trades = _trades(100, random.Random(5), step=1000)
+    a = TradeStore(str(tmp_path), segment_seconds=3600)
+    b = TradeStore(str(tmp_path), segment_seconds=3600)  # a second worker process
+    a.append("X", trades[:60])
+    a.flush()
+    b.append("X", trades[:60])
+    b.append("X", trades[60:])
+    b.flush()
+    a.append("X", trades[60:])
+    a.flush()
+    got = a.query("X", T0, trades[-1].time + 1, limit=1000)
+    assert got["count"] == 100
+    assert [r["a"] for r in got["trades"]] == [t.agg_id for t in trades]
+    assert got == b.query("X", T0, trades[-1].time + 1, limit=1000)
+    a.close()
+    b.close()
@@ -0,0 +1,161 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.core import http_client
+from backend.core.http_client import (PRIORITY_BACKGROUND, UpstreamGovernor, UpstreamUnavailable,
+                                      request_with_retries, upstream_priority)
+from backend.main import app
+from backend.services import alpha_price_service, binance_client
+
+URL = "http://upstream.test/bapi/defi/v1/public/alpha-trade/agg-trades"
+
+
+class FakeUpstream:
+    """Local stand-in for Binance: scripted statuses, injected latency, request log."""
+
+    def __init__(self, script=(), latency=0.0):
+        self.script = list(script)  # (status, headers) per request, then 200s
+        self.latency = latency
+        self.times = []
+
+    async def handler(self, request):
+        self.times.append(time.monotonic())
+        await asyncio.sleep(self.latency)
+        status, headers = self.script.pop(0) if self.script else (200, {})
+        body = {"code": "000000", "data": [{"a": len(self.times), "p": "1.5", "q": "2", "T": 1700000000000}]}
+        return httpx.Response(status, json=body, headers=headers)
+
+    def client(self):
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+@pytest.fixture
+def governor(monkeypatch):
+    gov = UpstreamGovernor(weight_per_minute=600, burst=5)  # 10 weight/s
+    monkeypatch.setattr(http_client, "upstream", gov)
+    monkeypatch.setattr(http_client.config, "RETRY_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(http_client.config, "BREAKER_RESET_SECONDS", 0.3)
+    return gov
+
+
+def test_budget_is_shared_and_interactive_goes_first(governor):
+    order = []
+
+    async def call(name):
+        await governor.acquire(1)
+        order.append(name)
+
+    async def main():
+        t0 = time.monotonic()
+        await asyncio.gather(*(call(f"warm{i}") for i in range(5)))  # the burst
+        with upstream_priority(PRIORITY_BACKGROUND):
+            background = [asyncio.create_task(call(f"bg{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        await asyncio.gather(asyncio.create_task(call("user")), *background)
+        return time.monotonic() - t0
+
+    elapsed = asyncio.run(main())
+    assert order[5:] == ["user", "bg0", "bg1", "bg2"]  # queued after the background calls, served first
+    assert elapsed >= 0.35  # 4 tokens past the burst at 10/s
+
+
+def test_429_retry_after_pauses_every_caller(governor):
+    fake = FakeUpstream([(429, {"Retry-After": "0.3"})], latency=0.02)
+
+    async def main():
+        async with fake.client() as client:
+            return await asyncio.gather(*(request_with_retries(client, "GET", URL) for _ in range(3)))
+
+    responses = asyncio.run(main())
+    assert [r.status_code for r in responses] == [200, 200, 200]
+    first_429, later = fake.times[0], fake.times[1:]
+    # Calls already in flight are unaffected; everything sent after the 429 waits out Retry-After
+    assert sum(1 for t in later if t - first_429 >= 0.3) >= 1
+    assert all(t - first_429 < 0.1 or t - first_429 >= 0.3 for t in later)
+    assert governor.counters["throttled"] == 1
+
+
+def test_long_retry_after_and_ban_fail_without_retrying(governor):
+    fake = FakeUpstream([(418, {"Retry-After": "120"})])
+
+    async def main():
+        async with fake.client() as client:
+            with pytest.raises(UpstreamUnavailable) as exc:
+                await request_with_retries(client, "GET", URL)
+            assert exc.value.retry_after == 120
+            # The whole budget is paused: queued callers give up instead of piling up
+            with pytest.raises(UpstreamUnavailable):
+                await governor.acquire(1, timeout=0.05)
+
+    asyncio.run(main())
+    assert len(fake.times) == 1 and governor.counters["banned"] == 1
+
+
+def test_workers_sharing_a_budget_file_spend_one_budget(tmp_path):
+    path = str(tmp_path / "budget")
+    a = UpstreamGovernor(weight_per_minute=6, burst=5)  # 0.1 weight/s: no refill to speak of
+    b = UpstreamGovernor(weight_per_minute=6, burst=5)
+    a.share(path)
+    b.share(path)
+
+    async def main():
+        for _ in range(3):
+            await a.acquire(1)
+        await b.acquire(2)  # what a left
+        with pytest.raises(UpstreamUnavailable):
+            await b.acquire(1, timeout=0.05)
+        b.block(60)  # a Retry-After seen by b pauses a too
+        assert a.stats()["blocked_for_s"] > 59
+        with pytest.raises(UpstreamUnavailable) as exc:
+            await a.acquire(1, timeout=0.05)
+        assert exc.value.retry_after > 59
+
+    try:
+        asyncio.run(main())
+    finally:
+        a.unshare()
+        b.unshare()
+
+
+def test_breaker_opens_serves_stale_and_recovers(governor, monkeypatch):
+    fake = FakeUpstream([(500, {})] * 15, latency=0.01)
+    client = fake.client()
+    monkeypatch.setattr(binance_client, "get_shared_client", lambda: client)
+    monkeypatch.setattr(alpha_price_service._price_cache, "ttl", 0.0)
+    alpha_price_service._price_cache.clear()
+    alpha_price_service._last_good.clear()
+    c = TestClient(app, raise_server_exceptions=False)
+
+    fake.script = []  # healthy: prime the last good snapshot
+    assert c.get("/api/alpha/price", params={"alphaId": "STALE"}).headers["X-Cache"] == "MISS"
+    fake.script = [(500, {})] * 15
+    for _ in range(2):  # 3 attempts each: 6 consecutive failures open the breaker
+        resp = c.get("/api/alpha/price", params={"alphaId": "STALE"})
+        assert resp.status_code in (200, 500)
+    breaker = governor.breaker(httpx.URL(URL).path)
+    assert breaker.state == "open"
+    sent = len(fake.times)
+    resp = c.get("/api/alpha/price", params={"alphaId": "STALE"})
+    assert resp.status_code == 200 and resp.headers["X-Cache"] == "STALE"
+    assert resp.json()["price_now"] == "1.50000000" and len(fake.times) == sent  # no upstream call
+    other = c.get("/api/alpha/price", params={"alphaId": "NOSTALE"})
+    assert other.status_code == 503 and "Retry-After" in other.headers
+
+    time.sleep(0.35)  # reset window: one trial request closes the breaker again
+    fake.script = []
+    assert c.get("/api/alpha/price", params={"alphaId": "STALE"}).headers["X-Cache"] == "MISS"
+    assert breaker.state == "closed"
+    assert c.get("/api/stats/upstream").json()["breakers"][httpx.URL(URL).path]["opens"] == 1
+    asyncio.run(client.aclose())
+
+
+def test_retry_after_parsing():
+    assert http_client._retry_after(httpx.Response(429, headers={"Retry-After": "7"})) == 7
+    assert http_client._retry_after(httpx.Response(429, headers={"Retry-After": "soon"})) is None
+    date = httpx.Response(429, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    assert http_client._retry_after(date) == 0  # in the past
+    assert http_client._retry_after(httpx.Response(429)) is None